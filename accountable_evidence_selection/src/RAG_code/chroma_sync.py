@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Content-hash chunk IDs and incremental sync of the Chroma collection.
+
+Every chunk gets an ID derived from its source file name and its text, so
+the same chunk always has the same ID, whichever run or export it comes
+from. With stable IDs the vector store can be synced instead of rebuilt:
+
+- chunks whose ID is not in the collection are embedded and added
+- IDs of the synced corpus that it no longer produces are deleted (an
+  edited chunk is a new ID plus a vanished one)
+- chunks already present are not re-embedded; if only their metadata changed
+  (e.g. a new OPID), the metadata is updated in place
+
+Adding one guideline therefore embeds only that guideline's chunks.
+
+The collection holds several corpora, so only chunks of the corpus being
+synced are deleted: those whose 'source' (or 'corpus' tag) appears in the
+input. Chunks of other corpora are left alone; --prune deletes every ID the
+input does not produce, and also removes guidelines dropped from the corpus.
+
+Usage:
+    python chroma_sync.py [corpus folder, zip or chunk .jsonl] [--dry-run] [--prune]
+"""
+
+import os
+import hashlib
+import argparse
+
+from corpus_loader import chunk_creation
+from zip_corpus import GUIDELINE_ZIP
+
+# Collection used by create_deepseek_rag_qa in the MAIN_CODE notebook
+COLLECTION_NAME = "geriatric_rag_test"
+PERSIST_DIRECTORY = "./chroma_dbs/"
+EMBEDDING_MODEL = "qwen3-embedding:latest"
+
+# Collection metadata key naming the embeddings a collection was built with
+EMBEDDER_KEY = "embedder"
+
+# Chunks embedded and written per add_documents call (large enough for
+# OllamaEmbeddingPool to keep every endpoint busy)
+SYNC_BATCH_SIZE = 512
+
+def chunk_id(source, content):
+    """
+    Stable ID of a chunk: SHA-256 of its source file name and text.
+
+    Args:
+        source (str): Source file name ('source' metadata)
+        content (str): Chunk text
+
+    Returns:
+        str: 32 hex characters
+    """
+    return hashlib.sha256(f"{source}\0{content}".encode('utf-8')).hexdigest()[:32]
+
+def assign_chunk_ids(chunks):
+    """
+    Set Document.id on every chunk from its source and content.
+
+    A source that yields the same text more than once (repeated boilerplate)
+    gets "-2", "-3", ... suffixes in chunk order, so IDs stay unique.
+
+    Args:
+        chunks (list): Chunk Documents with 'source' metadata
+
+    Returns:
+        list: The same chunks
+    """
+    seen = {}
+    for chunk in chunks:
+        base_id = chunk_id(chunk.metadata.get('source', ''), chunk.page_content)
+        seen[base_id] = seen.get(base_id, 0) + 1
+        chunk.id = base_id if seen[base_id] == 1 else f"{base_id}-{seen[base_id]}"
+    return chunks
+
+def load_chunks_jsonl(jsonl_path):
+    """
+    Load an exported chunk corpus (one serialized Document per line).
+
+    Goes through ingest_pipeline.ChunkStream, so sync and the streaming
+    ingest see the same chunks, IDs and metadata for a file: exported chunks
+    are taken as they are, those without an ID ("id": null) get their
+    content-hash ID, and every chunk gets the file's 'corpus' tag.
+
+    Returns:
+        list: Chunk Documents with IDs
+    """
+    from ingest_pipeline import ChunkStream
+    return [chunk for chunk, _, _ in ChunkStream(jsonl_path).iter_chunks()]
+
+def load_corpus_chunks(corpus_path, workers=None):
+    """
+    Chunks of a corpus folder or zip (via chunk_creation) or of an exported .jsonl, with IDs.
+    """
+    if corpus_path.endswith('.jsonl'):
+        return load_chunks_jsonl(corpus_path)
+    return assign_chunk_ids(chunk_creation(corpus_path, workers=workers))
+
+def plan_sync(existing, chunks, prune=False):
+    """
+    Compare the collection with the corpus.
+
+    Args:
+        existing (dict): ID -> metadata of what the collection holds
+        chunks (list): Chunk Documents with IDs
+        prune (bool): Delete every ID the corpus does not produce, not only
+            those of its own sources/corpus tags
+
+    Returns:
+        dict: 'add' (chunks to embed), 'update' (chunks whose metadata changed),
+            'delete' (IDs no longer produced) and 'unchanged' (count)
+    """
+    wanted = {chunk.id: chunk for chunk in chunks}
+    plan = {'add': [], 'update': [], 'delete': [], 'unchanged': 0}
+    for chunk_key, chunk in wanted.items():
+        if chunk_key not in existing:
+            plan['add'].append(chunk)
+        elif existing[chunk_key] != chunk.metadata:
+            plan['update'].append(chunk)
+        else:
+            plan['unchanged'] += 1
+    sources = {chunk.metadata.get('source') for chunk in chunks}
+    corpora = {chunk.metadata.get('corpus') for chunk in chunks} - {None}
+
+    def belongs_to_corpus(metadata):
+        metadata = metadata or {}
+        return metadata.get('source') in sources or metadata.get('corpus') in corpora
+
+    plan['delete'] = [chunk_key for chunk_key, metadata in existing.items()
+                      if chunk_key not in wanted and (prune or belongs_to_corpus(metadata))]
+    return plan
+
+def sync_collection(vector_store, chunks, batch_size=SYNC_BATCH_SIZE, dry_run=False, prune=False):
+    """
+    Bring a corpus's chunks in a Chroma collection up to date, embedding only new ones.
+
+    Args:
+        vector_store: langchain_chroma.Chroma store
+        chunks (list): Chunk Documents (IDs are assigned if missing)
+        batch_size (int): Chunks embedded per add_documents call
+        dry_run (bool): Only report what would change
+        prune (bool): Also delete chunks of other corpora (the collection then
+            holds exactly the given chunks)
+
+    Returns:
+        dict: Counts of 'added', 'updated', 'deleted' and 'unchanged' chunks
+    """
+    if any(chunk.id is None for chunk in chunks):
+        assign_chunk_ids(chunks)
+
+    stored = vector_store.get(include=['metadatas'])
+    existing = dict(zip(stored['ids'], stored['metadatas']))
+    plan = plan_sync(existing, chunks, prune)
+    counts = {'added': len(plan['add']), 'updated': len(plan['update']),
+              'deleted': len(plan['delete']), 'unchanged': plan['unchanged']}
+    if dry_run:
+        return counts
+
+    # Delete first, so an interrupted run never leaves old and new versions side by side
+    for start in range(0, len(plan['delete']), batch_size):
+        vector_store.delete(ids=plan['delete'][start:start + batch_size])
+
+    for start in range(0, len(plan['update']), batch_size):
+        batch = plan['update'][start:start + batch_size]
+        # Same text, same embedding: only the metadata is rewritten
+        vector_store._collection.update(ids=[chunk.id for chunk in batch],
+                                        metadatas=[chunk.metadata for chunk in batch])
+
+    for start in range(0, len(plan['add']), batch_size):
+        batch = plan['add'][start:start + batch_size]
+        vector_store.add_documents(documents=batch, ids=[chunk.id for chunk in batch])
+        print(f"   🔄 Embedded {min(start + batch_size, len(plan['add']))}/{len(plan['add'])} new chunks")
+
+    return counts
+
+def get_embeddings(embedding_model=EMBEDDING_MODEL, endpoints=None):
+    """Ollama embeddings (a pool over endpoints if given) through the embedding cache."""
+    from embedding_cache import CachedEmbeddings
+    if endpoints:
+        from embedding_client import OllamaEmbeddingPool
+        return CachedEmbeddings(OllamaEmbeddingPool(embedding_model, endpoints))
+    from langchain_community.embeddings import OllamaEmbeddings
+    return CachedEmbeddings(OllamaEmbeddings(model=embedding_model))
+
+def embedder_id(embeddings):
+    """Name of an embedding backend and model, e.g. 'OllamaEmbeddings:qwen3-embedding:latest'."""
+    namespace = getattr(embeddings, 'namespace', None)  # CachedEmbeddings
+    if namespace:
+        return namespace
+    return f"{type(embeddings).__name__}:{getattr(embeddings, 'model', '')}"
+
+def open_vector_store(collection_name=COLLECTION_NAME, persist_directory=PERSIST_DIRECTORY,
+                      embedding_model=EMBEDDING_MODEL, endpoints=None):
+    """
+    The notebook's Chroma store (Ollama embeddings, through the embedding cache).
+
+    With endpoints, embeddings come from an OllamaEmbeddingPool over those
+    servers instead of OllamaEmbeddings. Its vectors are not comparable with
+    OllamaEmbeddings' (no "passage: "/"query: " prefix, normalized), so a
+    collection records the embeddings it was created with under EMBEDDER_KEY,
+    and opening it with different ones raises ValueError. Collections
+    without that entry were built by the notebook, with OllamaEmbeddings.
+    """
+    import chromadb
+    from langchain_chroma import Chroma
+    embeddings = get_embeddings(embedding_model, endpoints)
+    embedder = embedder_id(embeddings)
+    client = chromadb.PersistentClient(path=persist_directory)
+
+    # list_collections returns names in recent chromadb, Collection objects before
+    if collection_name in [getattr(c, 'name', c) for c in client.list_collections()]:
+        metadata = client.get_collection(collection_name).metadata or {}
+        stored_embedder = metadata.get(EMBEDDER_KEY, f"OllamaEmbeddings:{embedding_model}")
+        if stored_embedder != embedder:
+            raise ValueError(f"Collection '{collection_name}' was built with {stored_embedder}, not {embedder}; "
+                             f"use a separate collection for {embedder}")
+        collection_metadata = None  # leave the existing collection's metadata alone
+    else:
+        collection_metadata = {EMBEDDER_KEY: embedder}
+
+    return Chroma(
+        collection_name=collection_name,
+        embedding_function=embeddings,
+        client=client,
+        collection_metadata=collection_metadata
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync the Chroma collection with a chunk corpus')
+    parser.add_argument('corpus', nargs='?', default=GUIDELINE_ZIP,
+                        help='Guideline folder, corpus zip or exported chunk .jsonl')
+    parser.add_argument('--collection', default=COLLECTION_NAME, help='Chroma collection name')
+    parser.add_argument('--persist-directory', default=PERSIST_DIRECTORY, help='Chroma directory')
+    parser.add_argument('--model', default=EMBEDDING_MODEL, help='Ollama embedding model')
+    parser.add_argument('--endpoints', nargs='+',
+                        help='Ollama servers for batched concurrent embedding (OllamaEmbeddingPool); '
+                             'only for collections built with the pool')
+    parser.add_argument('--workers', type=int, help='Loader worker processes')
+    parser.add_argument('--dry-run', action='store_true', help='Report changes without writing')
+    parser.add_argument('--prune', action='store_true',
+                        help='Delete every chunk the corpus does not produce, including other corpora')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.corpus):
+        print(f"❌ Corpus not found: {args.corpus}")
+        exit(1)
+
+    try:
+        vector_store = open_vector_store(args.collection, args.persist_directory, args.model, args.endpoints)
+    except ValueError as e:
+        print(f"❌ {e}")
+        exit(1)
+    chunks = load_corpus_chunks(args.corpus, args.workers)
+    counts = sync_collection(vector_store, chunks, dry_run=args.dry_run, prune=args.prune)
+
+    prefix = "🔍 Would sync" if args.dry_run else "✅ Synced"
+    print(f"{prefix} '{args.collection}': {counts['added']} added, {counts['updated']} metadata updates, "
+          f"{counts['deleted']} deleted, {counts['unchanged']} unchanged")
+
+if __name__ == "__main__":
+    main()
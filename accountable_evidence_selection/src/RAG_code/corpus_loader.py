@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Parallel replacement for the notebook's chunk_creation.
+
+Loads the guideline corpus (an extracted folder or a corpus zip, see
+zip_corpus.py), parses every document and splits it into chunks with the
+notebook's RecursiveCharacterTextSplitter settings. Each document is parsed
+and chunked in its own worker process.
+
+OPIDs are assigned before any work is submitted, so a document always gets
+the same OPID however the workers finish, and the chunks come back in OPID
+order. The 12 shipped guidelines keep the OPIDs they have in
+results/pdf_guidelines_chunks_rag_retrieval_corpus.jsonl (GUIDELINE_OPIDS),
+which the notebook's leave-one-out filters refer to; any other file gets the
+next free OPID after them, in file-name order.
+
+Usage (notebook):
+    from corpus_loader import chunk_creation
+    chunks = chunk_creation("../../../RAG_code_guideline_input.zip")
+"""
+
+import os
+import time
+import zipfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from zip_corpus import MEMBER_PARSERS, GUIDELINE_ZIP, list_corpus_members
+
+# Splitter settings and first OPID used by the notebook
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+FIRST_OPID = 50000
+
+# OPIDs of the shipped guideline corpus (pdf_guidelines_chunks_rag_retrieval_corpus.jsonl)
+GUIDELINE_OPIDS = {
+    "J American Geriatrics Society - 2025 - Bittner - Managing Hypercholesterolemia in Adults Older Than 75 years Without a.grobid.tei.xml": 50000,
+    "J American Geriatrics Society - 2025 -  - Alternative Treatments to Selected Medications in the 2023 American Geriatrics.grobid.tei.xml": 50001,
+    "surgery-and-opioids-2021_4.grobid.tei.xml": 50002,
+    "AGS-GERI-ED-GUIDE-1-1.grobid.tei.xml": 50003,
+    "Boxer_et_al-2019-Journal_of_the_American_Geriatrics_Society.grobid.tei.xml": 50004,
+    "perioperative-care-in-adults-pdf-66142014963397.grobid.tei.xml": 50005,
+    "AGS_PostOp_Delirium_Final_.txt": 50006,
+    "cdc-guidelines-2022-opiods-for-pain.grobid.tei.xml": 50007,
+    "ACS_NSQIP_Geriatric_2015_Guidelines.txt": 50008,
+    "J American Geriatrics Society - 2025 - Holliday - American Geriatrics Society Position Statement  Telehealth Policy for.grobid.tei.xml": 50009,
+    "Ethnogeriatrics_statement_JAGS_January_2016.grobid.tei.xml": 50010,
+    "jgs_13281_Rev_EV.grobid.tei.xml": 50011,
+}
+
+_splitters = {}
+
+def get_splitter(chunk_size, chunk_overlap):
+    """One RecursiveCharacterTextSplitter per settings and process."""
+    key = (chunk_size, chunk_overlap)
+    if key not in _splitters:
+        _splitters[key] = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+            is_separator_regex=False
+        )
+    return _splitters[key]
+
+def list_corpus_files(corpus_path):
+    """
+    Documents of a corpus, sorted by file name.
+
+    Args:
+        corpus_path (str): Folder of .xml/.txt files, or a corpus zip
+
+    Returns:
+        list: (source file name, location) pairs; location is a file path for
+            folders and a member name for zips
+    """
+    if zipfile.is_zipfile(corpus_path):
+        entries = [(os.path.basename(member), member) for member in list_corpus_members(corpus_path)]
+    else:
+        entries = [(filename, os.path.join(corpus_path, filename)) for filename in os.listdir(corpus_path)
+                   if os.path.splitext(filename)[1].lower() in MEMBER_PARSERS]
+    return sorted(entries)
+
+def assign_opids(sources, first_opid=FIRST_OPID, known_opids=GUIDELINE_OPIDS):
+    """
+    OPID of every document: its entry in known_opids, or else the next free
+    OPID after them (in the given order, i.e. file-name order).
+
+    Args:
+        sources (list): Source file names
+        first_opid (int): Lowest OPID given to an unknown file
+        known_opids (dict): Source file name -> fixed OPID
+
+    Returns:
+        dict: Source file name -> OPID
+    """
+    opids = {source: known_opids[source] for source in sources if source in known_opids}
+    next_opid = max([first_opid - 1] + list(known_opids.values())) + 1
+    for source in sources:
+        if source not in opids:
+            opids[source] = next_opid
+            next_opid += 1
+    return opids
+
+def load_and_chunk(corpus_path, source, location, opid, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """
+    Parse one document and split it into chunks (runs in a worker process).
+
+    Args:
+        corpus_path (str): Corpus folder or zip
+        source (str): File name, stored as 'source' metadata
+        location (str): File path or zip member name (see list_corpus_files)
+        opid (int): OPID of the document
+
+    Returns:
+        list: Chunk Documents with 'source' and 'OPID' metadata
+    """
+    if zipfile.is_zipfile(corpus_path):
+        with zipfile.ZipFile(corpus_path) as archive:
+            data = archive.read(location)
+    else:
+        with open(location, 'rb') as f:
+            data = f.read()
+    text = MEMBER_PARSERS[os.path.splitext(source)[1].lower()](data)
+    if not text:
+        print(f"⚠️  No text extracted from {source}")
+
+    doc = Document(page_content=text, metadata={"source": source, "OPID": opid})
+    return get_splitter(chunk_size, chunk_overlap).transform_documents([doc])
+
+def chunk_creation(geriatric_care_dir=GUIDELINE_ZIP, workers=None, chunk_size=CHUNK_SIZE,
+                   chunk_overlap=CHUNK_OVERLAP, first_opid=FIRST_OPID):
+    """
+    Load, parse and chunk the guideline corpus in parallel.
+
+    Args:
+        geriatric_care_dir (str): Folder of .xml/.txt guidelines, or a corpus zip
+        workers (int): Worker processes (default: one per core); 1 runs in this process
+        chunk_size (int): Splitter chunk size
+        chunk_overlap (int): Splitter chunk overlap
+        first_opid (int): Lowest OPID given to a file not in GUIDELINE_OPIDS
+
+    Returns:
+        list: Chunk Documents, grouped by document in OPID order
+    """
+    workers = workers or os.cpu_count() or 1
+    files = list_corpus_files(geriatric_care_dir)
+    opids = assign_opids([source for source, _ in files], first_opid)
+    tasks = [(geriatric_care_dir, source, location, opids[source], chunk_size, chunk_overlap)
+             for source, location in files]
+    tasks.sort(key=lambda task: task[3])
+
+    print(f"Loading and chunking {len(files)} guidelines with {workers} worker(s)...")
+    chunks = []
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            chunks.extend(load_and_chunk(*task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map() returns results in submission (OPID) order
+            for document_chunks in executor.map(load_and_chunk, *zip(*tasks)):
+                chunks.extend(document_chunks)
+
+    print(f"Split {len(files)} documents into {len(chunks)} chunks.")
+    return chunks
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse and chunk the guideline corpus in parallel')
+    parser.add_argument('corpus', nargs='?', default=GUIDELINE_ZIP, help='Guideline folder or corpus zip')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per core)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    chunks = chunk_creation(args.corpus, workers=args.workers)
+    opids = sorted({chunk.metadata['OPID'] for chunk in chunks})
+    print(f"✅ {len(chunks)} chunks, OPIDs {opids[0]}-{opids[-1]}" if opids else "❌ No chunks")
+    print(f"⏱️  {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
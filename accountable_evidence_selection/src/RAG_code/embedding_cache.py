@@ -0,0 +1,236 @@
+"""
+Persistent embedding cache shared by the RAG notebooks and the analysis scripts.
+
+Embedding the same chunk texts again on every index rebuild and every
+evaluation run is the slowest step on a CPU-only machine. This cache keeps
+every vector in a SQLite database keyed by (namespace, SHA-256 of the text),
+where the namespace names the embedding backend and model, e.g.
+"OllamaEmbeddings:qwen3-embedding:latest" or "ollama.embed:qwen3-embedding:latest".
+The text that is hashed is exactly the string sent to the model (including
+OllamaEmbeddings' "passage: " / "query: " instruction), so a cached vector
+is always the one the model returned for that input.
+
+The database is bounded: once it holds more than max_entries vectors, the
+least recently used ones are evicted. Several processes may share the
+database (the notebook and analysis/embedded_similarity.py), so the entry
+count is always read from it. Hit, miss and eviction counters are kept per
+cache object (see `stats`).
+
+The cache lives in ~/.cache/rag_embeddings/embeddings.sqlite by default; set
+RAG_EMBEDDING_CACHE to move it. Deleting the file is always safe.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_CACHE_PATH = os.environ.get(
+    "RAG_EMBEDDING_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "rag_embeddings", "embeddings.sqlite"),
+)
+
+# About 6.5 GB of 4096-dimension vectors (qwen3-embedding)
+DEFAULT_MAX_ENTRIES = 200_000
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH = 500
+
+def text_key(text):
+    """SHA-256 digest of the exact input text."""
+    return hashlib.sha256(text.encode('utf-8')).digest()
+
+class EmbeddingCache:
+    """SQLite store of embedding vectors with LRU eviction and hit/miss counters."""
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # One connection shared by the threads of this process, guarded by a lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " namespace TEXT NOT NULL,"
+                " text_hash BLOB NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (namespace, text_hash)) WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, namespace, texts):
+        """
+        Look up the vectors of several texts.
+
+        Args:
+            namespace (str): Embedding backend and model
+            texts (list): Input strings
+
+        Returns:
+            list: For each text, its vector (list of floats) or None when not cached
+        """
+        keys = [text_key(text) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_BATCH):
+                batch = keys[start:start + LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE namespace = ? AND text_hash IN ({placeholders})",
+                    [namespace, *batch],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE namespace = ? AND text_hash = ?",
+                        [(now, namespace, key) for key in found],
+                    )
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+
+        vectors = []
+        for key in keys:
+            blob = found.get(key)
+            vectors.append(array('d', blob).tolist() if blob is not None else None)
+        return vectors
+
+    def put_many(self, namespace, texts, vectors):
+        """
+        Store vectors, then evict the least recently used entries beyond max_entries.
+
+        Args:
+            namespace (str): Embedding backend and model
+            texts (list): Input strings
+            vectors (list): Their embeddings (sequences of floats)
+        """
+        now = time.time()
+        rows = [(namespace, text_key(text), array('d', vector).tobytes(), now)
+                for text, vector in zip(texts, vectors)]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (namespace, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            if self.max_entries:
+                # Counted inside the write transaction, so other processes' inserts are included
+                excess = self._count() - self.max_entries
+                if excess > 0:
+                    deleted = self._conn.execute(
+                        "DELETE FROM embeddings WHERE (namespace, text_hash) IN "
+                        "(SELECT namespace, text_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+                        (excess,),
+                    ).rowcount
+                    self.evictions += deleted
+
+    def _count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self):
+        """
+        Returns:
+            dict: 'hits', 'misses', 'evictions', 'entries' and 'hit_rate'
+        """
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._count()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': entries,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_default_caches = {}
+
+def get_default_cache(path=EMBEDDING_CACHE_PATH):
+    """One EmbeddingCache per database path and process."""
+    if path not in _default_caches:
+        _default_caches[path] = EmbeddingCache(path)
+    return _default_caches[path]
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain Embeddings wrapper that serves repeated texts from an EmbeddingCache.
+
+    Usage:
+        embeddings = CachedEmbeddings(OllamaEmbeddings(model="qwen3-embedding:latest"))
+    """
+
+    def __init__(self, embeddings, cache=None, namespace=None):
+        self.embeddings = embeddings
+        self.cache = cache or get_default_cache()
+        model = getattr(embeddings, 'model', None) or getattr(embeddings, 'model_name', 'unknown')
+        self.namespace = namespace or f"{type(embeddings).__name__}:{model}"
+        # OllamaEmbeddings prepends these before embedding; they are part of the key
+        self.embed_instruction = getattr(embeddings, 'embed_instruction', '')
+        self.query_instruction = getattr(embeddings, 'query_instruction', '')
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        keyed = [f"{self.embed_instruction}{text}" for text in texts]
+        vectors = self.cache.get_many(self.namespace, keyed)
+
+        # Embed each missing text once, even if it repeats in this batch
+        missing = {}
+        for position, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(keyed[position], []).append(position)
+        if missing:
+            first_positions = [positions[0] for positions in missing.values()]
+            new_vectors = self.embeddings.embed_documents([texts[p] for p in first_positions])
+            self.cache.put_many(self.namespace, list(missing), new_vectors)
+            for positions, vector in zip(missing.values(), new_vectors):
+                for position in positions:
+                    vectors[position] = list(vector)
+        return vectors
+
+    def embed_query(self, text):
+        keyed = f"{self.query_instruction}{text}"
+        vector = self.cache.get_many(self.namespace, [keyed])[0]
+        if vector is None:
+            vector = list(self.embeddings.embed_query(text))
+            self.cache.put_many(self.namespace, [keyed], [vector])
+        return vector
+
+def cached_ollama_embed(texts, model, cache=None):
+    """
+    ollama.embed(model=model, input=texts).embeddings, served from the cache where possible.
+
+    Args:
+        texts (list): Input strings
+        model (str): Ollama model name
+        cache (EmbeddingCache): Defaults to the shared on-disk cache
+
+    Returns:
+        list: One vector (list of floats) per text
+    """
+    cache = cache or get_default_cache()
+    namespace = f"ollama.embed:{model}"
+    vectors = cache.get_many(namespace, texts)
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+    if missing:
+        import ollama
+        new_vectors = ollama.embed(model=model, input=missing).embeddings
+        cache.put_many(namespace, missing, new_vectors)
+        by_text = dict(zip(missing, new_vectors))
+        vectors = [vector if vector is not None else list(by_text[text]) for text, vector in zip(texts, vectors)]
+    return vectors
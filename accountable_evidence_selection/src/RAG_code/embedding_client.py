@@ -0,0 +1,180 @@
+"""
+Batched, concurrent Ollama embedding client for indexing.
+
+OllamaEmbeddings sends every text in its own request to a single server.
+OllamaEmbeddingPool instead splits the texts into large `input` batches for
+Ollama's /api/embed endpoint and sends them concurrently to a pool of
+servers:
+
+- each endpoint has at most max_in_flight requests running; a batch goes to
+  the healthy endpoint with the fewest requests in flight
+- an endpoint that fails a request is marked unhealthy and skipped until it
+  answers a health check again (checked every HEALTH_RETRY_SECONDS)
+- a failed batch is retried on another endpoint, with exponential backoff,
+  up to max_retries times
+
+Results keep the order of the input texts. Endpoints come from the
+`endpoints` argument or from OLLAMA_EMBED_ENDPOINTS (comma-separated URLs),
+defaulting to the local server.
+
+/api/embed returns normalized vectors and adds no "passage: "/"query: "
+instruction, so vectors differ from OllamaEmbeddings': a collection has to
+be built and queried with the same client. chroma_sync.open_vector_store
+records the client in the collection metadata and refuses the other one.
+
+Usage:
+    embeddings = CachedEmbeddings(OllamaEmbeddingPool("qwen3-embedding:latest",
+                                                      ["http://box1:11434", "http://box2:11434"]))
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_ENDPOINTS = os.environ.get("OLLAMA_EMBED_ENDPOINTS", "http://localhost:11434")
+
+# Texts per /api/embed request
+EMBED_BATCH_SIZE = 32
+# Concurrent requests per endpoint
+MAX_IN_FLIGHT = 2
+MAX_RETRIES = 4
+RETRY_BACKOFF_SECONDS = 1.0
+# How long an endpoint that failed is skipped before it is checked again
+HEALTH_RETRY_SECONDS = 30.0
+REQUEST_TIMEOUT = 600
+
+class OllamaEndpoint:
+    """One Ollama server with its health and in-flight count."""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.healthy = True
+        self.checked_at = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+
+    def check_health(self, timeout=5):
+        """Ask the server whether it is up (GET /api/version)."""
+        try:
+            response = requests.get(f"{self.url}/api/version", timeout=timeout)
+            self.healthy = response.status_code == 200
+        except requests.exceptions.RequestException:
+            self.healthy = False
+        self.checked_at = time.monotonic()
+        return self.healthy
+
+class OllamaEmbeddingPool(Embeddings):
+    """LangChain Embeddings that spreads batched /api/embed requests over several Ollama servers."""
+
+    def __init__(self, model, endpoints=None, batch_size=EMBED_BATCH_SIZE, max_in_flight=MAX_IN_FLIGHT,
+                 max_retries=MAX_RETRIES, timeout=REQUEST_TIMEOUT):
+        if endpoints is None:
+            endpoints = DEFAULT_ENDPOINTS.split(',')
+        if isinstance(endpoints, str):
+            endpoints = endpoints.split(',')
+        self.model = model
+        self.endpoints = [OllamaEndpoint(url.strip()) for url in endpoints if url.strip()]
+        if not self.endpoints:
+            raise ValueError("At least one Ollama endpoint is required")
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._condition = threading.Condition()
+
+    def check_endpoints(self):
+        """
+        Health-check every endpoint.
+
+        Returns:
+            list: URLs of the healthy endpoints
+        """
+        return [endpoint.url for endpoint in self.endpoints if endpoint.check_health()]
+
+    def _acquire_endpoint(self):
+        """Wait for a healthy endpoint with a free slot and reserve the slot."""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                for endpoint in self.endpoints:
+                    # Give failed endpoints another chance once in a while
+                    if not endpoint.healthy and now - endpoint.checked_at >= HEALTH_RETRY_SECONDS:
+                        endpoint.checked_at = now
+                        endpoint.healthy = None  # being re-checked
+                candidates = [e for e in self.endpoints if e.healthy is not False and e.in_flight < self.max_in_flight]
+                if candidates:
+                    endpoint = min(candidates, key=lambda e: e.in_flight)
+                    endpoint.in_flight += 1
+                    return endpoint
+                if all(e.healthy is False for e in self.endpoints):
+                    retry_at = min(e.checked_at for e in self.endpoints) + HEALTH_RETRY_SECONDS
+                    self._condition.wait(timeout=max(0.1, retry_at - now))
+                else:
+                    self._condition.wait(timeout=1.0)
+
+    def _release_endpoint(self, endpoint, ok):
+        with self._condition:
+            endpoint.in_flight -= 1
+            endpoint.requests += 1
+            if ok:
+                endpoint.healthy = True
+            else:
+                endpoint.failures += 1
+                endpoint.healthy = False
+                endpoint.checked_at = time.monotonic()
+            self._condition.notify_all()
+
+    def _embed_batch(self, texts):
+        """Embed one batch, retrying on other endpoints; returns a list of vectors."""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            endpoint = self._acquire_endpoint()
+            if endpoint.healthy is None and not endpoint.check_health():
+                self._release_endpoint(endpoint, ok=False)
+                continue
+            try:
+                response = self._session.post(f"{endpoint.url}/api/embed",
+                                              json={'model': self.model, 'input': texts},
+                                              timeout=self.timeout)
+                response.raise_for_status()
+                embeddings = response.json()['embeddings']
+                if len(embeddings) != len(texts):
+                    raise ValueError(f"{endpoint.url} returned {len(embeddings)} embeddings for {len(texts)} texts")
+            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                last_error = e
+                self._release_endpoint(endpoint, ok=False)
+                continue
+            self._release_endpoint(endpoint, ok=True)
+            return embeddings
+        raise RuntimeError(f"Embedding batch failed after {self.max_retries + 1} attempts: {last_error}")
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) <= 1:
+            return self._embed_batch(batches[0]) if batches else []
+
+        workers = min(len(batches), len(self.endpoints) * self.max_in_flight)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map() keeps the batches in input order
+            results = executor.map(self._embed_batch, batches)
+            return [vector for batch in results for vector in batch]
+
+    def embed_query(self, text):
+        return self._embed_batch([text])[0]
+
+    def stats(self):
+        """
+        Returns:
+            dict: URL -> {'healthy', 'requests', 'failures'}
+        """
+        return {e.url: {'healthy': e.healthy, 'requests': e.requests, 'failures': e.failures}
+                for e in self.endpoints}
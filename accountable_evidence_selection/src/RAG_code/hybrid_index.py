@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Hybrid BM25 + dense retrieval over the memory-mapped vector index.
+
+Dense retrieval alone misses exact lexical matches such as drug names and
+dosages ("buprenorphine", "0.5 mg/kg"). rank_bm25's BM25Okapi scores every
+chunk per query term in Python; BM25Index instead stores an inverted index
+next to the vector index (results/vector_index):
+
+- bm25_vocab.json   term -> term id, the BM25 parameters, and the row count
+                    and a hash of the chunk IDs it was built from
+- bm25.npz          per term, a slice of the posting arrays: row ids and
+                    precomputed per-posting weights
+                    idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+
+so a query costs one scatter-add per query term over that term's postings.
+Posting rows are row positions in the vector index, so loading checks them
+against the index's chunk IDs: after a new `mmap_index.py export`, the BM25
+index has to be rebuilt (`hybrid_index.py build`) before it can be used.
+Scores are BM25Okapi's (same idf with epsilon floor, same k1/b, repeated
+query terms counted again).
+
+HybridRetriever takes the top fetch_k rows from the dense index and from
+BM25 (with the same metadata filter) and fuses the two rankings with
+reciprocal-rank fusion: score = sum over rankings of 1 / (rrf_k + rank).
+It is a LangChain retriever, so it drops into RetrievalQA.
+
+Usage:
+    python hybrid_index.py build [--index-dir DIR]
+    python hybrid_index.py query "buprenorphine dose" [--k 10]
+"""
+
+import os
+import re
+import json
+import math
+import hashlib
+import time
+import argparse
+
+import numpy as np
+from langchain_core.retrievers import BaseRetriever
+
+from mmap_index import INDEX_DIR, MmapVectorStore
+
+# Keeps dosages and compound terms together: "0.5", "mg/kg", "covid-19"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[./\-][a-z0-9]+)*")
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+BM25_EPSILON = 0.25
+# Standard reciprocal-rank-fusion constant
+RRF_K = 60
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+def ids_digest(ids):
+    """SHA-256 of the chunk IDs of an index, in row order."""
+    return hashlib.sha256("\n".join(ids).encode('utf-8')).hexdigest()
+
+class BM25Index:
+    """Persisted inverted index with precomputed BM25Okapi posting weights."""
+
+    def __init__(self, vocabulary, offsets, rows, weights, n_rows, params, ids_sha256=None):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.rows = rows
+        self.weights = weights
+        self.n_rows = n_rows
+        self.params = params
+        self.ids_sha256 = ids_sha256
+
+    @classmethod
+    def build(cls, texts, ids=None, k1=BM25_K1, b=BM25_B, epsilon=BM25_EPSILON):
+        """
+        Index chunk texts (row i of the index is texts[i]).
+
+        Args:
+            texts (list): Chunk texts, in vector index row order
+            ids (list): Chunk IDs of those rows, recorded to check the index
+                against the vector index when it is loaded
+
+        Returns:
+            BM25Index
+        """
+        postings = {}
+        doc_lengths = []
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            frequencies = {}
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + 1
+            for token, frequency in frequencies.items():
+                postings.setdefault(token, []).append((row, frequency))
+
+        n_rows = len(doc_lengths)
+        doc_lengths = np.array(doc_lengths, dtype=np.float64)
+        average_length = doc_lengths.mean() if n_rows and doc_lengths.sum() else 1.0
+
+        # BM25Okapi idf, with negative values floored at epsilon * average idf
+        terms = sorted(postings)
+        idf = np.array([math.log(n_rows - len(postings[t]) + 0.5) - math.log(len(postings[t]) + 0.5)
+                        for t in terms])
+        if len(idf):
+            idf[idf < 0] = epsilon * idf.mean()
+        length_norm = k1 * (1 - b + b * doc_lengths / average_length)
+
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        all_rows, all_weights = [], []
+        for term_id, term in enumerate(terms):
+            term_rows = np.array([row for row, _ in postings[term]], dtype=np.int32)
+            frequency = np.array([f for _, f in postings[term]], dtype=np.float64)
+            all_rows.append(term_rows)
+            all_weights.append(idf[term_id] * frequency * (k1 + 1) / (frequency + length_norm[term_rows]))
+            offsets[term_id + 1] = offsets[term_id] + len(term_rows)
+
+        rows = np.concatenate(all_rows) if all_rows else np.empty(0, dtype=np.int32)
+        weights = np.concatenate(all_weights).astype(np.float32) if all_weights else np.empty(0, dtype=np.float32)
+        params = {'k1': k1, 'b': b, 'epsilon': epsilon, 'average_length': float(average_length)}
+        return cls({term: i for i, term in enumerate(terms)}, offsets, rows, weights, n_rows, params,
+                   ids_digest(ids) if ids is not None else None)
+
+    def save(self, index_dir=INDEX_DIR):
+        os.makedirs(index_dir, exist_ok=True)
+        np.savez(os.path.join(index_dir, "bm25.npz"), offsets=self.offsets, rows=self.rows, weights=self.weights)
+        with open(os.path.join(index_dir, "bm25_vocab.json"), 'w', encoding='utf-8') as f:
+            json.dump({'n_rows': self.n_rows, 'ids_sha256': self.ids_sha256, 'params': self.params,
+                       'vocabulary': self.vocabulary}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, index_dir=INDEX_DIR, ids=None):
+        """
+        Load a saved index.
+
+        Args:
+            index_dir (str): Directory holding bm25.npz and bm25_vocab.json
+            ids (list): Chunk IDs of the vector index the rows refer to; if
+                given, the index must have been built from exactly these rows
+
+        Returns:
+            BM25Index
+        """
+        with open(os.path.join(index_dir, "bm25_vocab.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = np.load(os.path.join(index_dir, "bm25.npz"))
+        index = cls(meta['vocabulary'], arrays['offsets'], arrays['rows'], arrays['weights'],
+                    meta['n_rows'], meta['params'], meta.get('ids_sha256'))
+        if ids is not None:
+            index.check_rows(ids)
+        return index
+
+    def check_rows(self, ids):
+        """Raise ValueError unless the index was built from rows with exactly these chunk IDs."""
+        if self.n_rows != len(ids) or self.ids_sha256 != ids_digest(ids):
+            raise ValueError(f"BM25 index ({self.n_rows} rows) does not match the vector index ({len(ids)} rows); "
+                             "rebuild it with `python hybrid_index.py build`")
+
+    def scores(self, query):
+        """
+        BM25 score of every row for a query (posting-list traversal).
+
+        Returns:
+            numpy.ndarray: float32, one score per row
+        """
+        scores = np.zeros(self.n_rows, dtype=np.float32)
+        for token in tokenize(query):
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                continue
+            start, stop = self.offsets[term_id], self.offsets[term_id + 1]
+            # Rows are unique within a posting list, so fancy-index add is exact
+            scores[self.rows[start:stop]] += self.weights[start:stop]
+        return scores
+
+    def top_rows(self, query, k, mask=None):
+        """
+        Rows with the k best BM25 scores (rows without any query term are left out).
+
+        Returns:
+            list: Row indices, best first
+        """
+        scores = self.scores(query)
+        candidates = scores > 0
+        if mask is not None:
+            candidates &= mask
+        rows = np.flatnonzero(candidates)
+        if len(rows) > k:
+            rows = rows[np.argpartition(-scores[rows], k - 1)[:k]]
+        return rows[np.argsort(-scores[rows], kind='stable')].tolist()
+
+class HybridRetriever(BaseRetriever):
+    """Dense + BM25 retriever fused with reciprocal-rank fusion."""
+
+    vector_store: MmapVectorStore
+    bm25: BM25Index
+    k: int = 10
+    fetch_k: int = 50
+    rrf_k: int = RRF_K
+    filter: dict = None
+
+    model_config = {'arbitrary_types_allowed': True}
+
+    def model_post_init(self, __context):
+        # Posting rows are vector index rows: refuse a BM25 index built from another export
+        self.bm25.check_rows(self.vector_store.ids)
+
+    @classmethod
+    def from_index_dir(cls, index_dir=INDEX_DIR, embedding=None, **kwargs):
+        vector_store = MmapVectorStore(index_dir, embedding)
+        return cls(vector_store=vector_store, bm25=BM25Index.load(index_dir, vector_store.ids), **kwargs)
+
+    def fused_rows(self, query):
+        """
+        Returns:
+            list: (row, fused score) of the top k rows, best first
+        """
+        query_vector = self.vector_store.embedding.embed_query(query)
+        dense = [row for row, _ in self.vector_store.search_vectors([query_vector], self.fetch_k, self.filter)[0]]
+        sparse = self.bm25.top_rows(query, self.fetch_k, self.vector_store.metadata_index.mask(self.filter))
+
+        fused = {}
+        for ranking in (dense, sparse):
+            for rank, row in enumerate(ranking, 1):
+                fused[row] = fused.get(row, 0.0) + 1.0 / (self.rrf_k + rank)
+        # Ties keep the dense order first
+        order = {row: position for position, row in enumerate(dense + sparse)}
+        best = sorted(fused.items(), key=lambda item: (-item[1], order[item[0]]))
+        return best[:self.k]
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return [self.vector_store._document(row) for row, _ in self.fused_rows(query)]
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query the BM25 index next to the vector index')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help='Index the chunk texts of the vector index')
+    query = subparsers.add_parser('query', help='Hybrid search')
+    query.add_argument('question', help='Question text')
+    query.add_argument('--k', type=int, default=10, help='Results')
+    query.add_argument('--model', default="qwen3-embedding:latest", help='Ollama embedding model')
+    for sub in (build, query):
+        sub.add_argument('--index-dir', default=INDEX_DIR, help='Index directory (see mmap_index.py export)')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        vector_store = MmapVectorStore(args.index_dir)
+        index = BM25Index.build(vector_store.texts, vector_store.ids)
+        index.save(args.index_dir)
+        print(f"✅ Indexed {index.n_rows} chunks, {len(index.vocabulary)} terms, {len(index.rows)} postings "
+              f"in {time.perf_counter() - start:.2f}s")
+        return
+
+    from langchain_community.embeddings import OllamaEmbeddings
+    from embedding_cache import CachedEmbeddings
+    retriever = HybridRetriever.from_index_dir(args.index_dir, CachedEmbeddings(OllamaEmbeddings(model=args.model)),
+                                               k=args.k)
+    for rank, (row, score) in enumerate(retriever.fused_rows(args.question), 1):
+        doc = retriever.vector_store._document(row)
+        print(f"{rank:>2}. {score:.4f}  {doc.metadata.get('source', '')}: {doc.page_content[:80]!r}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Streaming ingest: chunk JSONL -> chunk -> embed -> upsert into Chroma.
+
+load_jsonl_data loads a whole corpus with JSONLoader(...).load(), and the
+chunks are then embedded and added in one go. This pipeline streams instead:
+
+1. records are read from the JSONL file one line at a time (exported chunk
+   Documents, or records with a 'guid_text' field as load_jsonl_data expects)
+2. exported chunk records are taken as they are; 'guid_text' records are
+   split with the notebook's splitter as they are read. Every chunk gets the
+   content-hash ID of chroma_sync.chunk_id (or keeps the ID it was exported
+   with), plus a 'corpus' metadata field (the file name without .jsonl) for
+   per-corpus filters. chroma_sync.load_chunks_jsonl goes through the same
+   ChunkStream, so both tools produce the same chunks and IDs for a file
+3. chunks are grouped into embedding batches; at most max_pending batches
+   are being embedded at once, and the reader waits while that many are
+   pending (backpressure), so memory stays bounded by
+   max_pending * batch_size chunks whatever the corpus size
+4. finished batches are upserted in input order, and a checkpoint with the
+   byte offset of the first record not yet fully stored is written after
+   each one
+
+An interrupted run resumes from the checkpoint (<file>.ingest.json). At most
+the batches that were in flight are embedded again, and since IDs are
+stable the repeated upserts overwrite rather than duplicate. Records
+appended to a finished file are picked up by the next run; a file that was
+rewritten needs --restart.
+
+Usage:
+    python ingest_pipeline.py ../../results/*_chunks.jsonl [--endpoints URL ...] [--restart]
+"""
+
+import os
+import json
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.documents import Document
+
+from chroma_sync import chunk_id, open_vector_store, COLLECTION_NAME, PERSIST_DIRECTORY, EMBEDDING_MODEL
+from corpus_loader import get_splitter, CHUNK_SIZE, CHUNK_OVERLAP
+
+EMBED_BATCH_SIZE = 64
+# Embedding batches in flight before the reader waits
+MAX_PENDING_BATCHES = 4
+
+# Metadata fields kept from 'guid_text' records (as the notebook's metadata_func)
+RECORD_METADATA_FIELDS = ("source", "title", "url", "OPID", "doc_id", "word_count")
+
+def checkpoint_path_for(jsonl_path, collection_name):
+    return f"{jsonl_path}.{collection_name}.ingest.json"
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_checkpoint(path, checkpoint):
+    """Write then rename, so a crash never leaves a truncated checkpoint."""
+    partial_path = f"{path}.{os.getpid()}.part"
+    with open(partial_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(partial_path, path)
+
+def iter_jsonl_records(jsonl_path, offset=0):
+    """
+    Read a JSONL file one record at a time.
+
+    Args:
+        jsonl_path (str): Input file
+        offset (int): Byte offset to start from (a record boundary)
+
+    Yields:
+        tuple: (byte offset of the record, byte offset after it, record dict)
+    """
+    with open(jsonl_path, 'rb') as f:
+        f.seek(offset)
+        for raw_line in f:
+            start = offset
+            offset += len(raw_line)
+            if raw_line.strip():
+                yield start, offset, json.loads(raw_line)
+
+def record_to_document(record, content_key='guid_text'):
+    """
+    Document for one JSONL record: an exported chunk (page_content/metadata)
+    or a load_jsonl_data record (content_key plus metadata fields).
+    """
+    if 'page_content' in record:
+        return Document(page_content=record['page_content'], metadata=dict(record.get('metadata') or {}))
+    metadata = {field: record.get(field) for field in RECORD_METADATA_FIELDS}
+    return Document(page_content=record.get(content_key) or '', metadata=metadata)
+
+def chroma_metadata(metadata):
+    """Chroma only stores str/int/float/bool values; drop the rest (e.g. None)."""
+    return {key: value for key, value in metadata.items() if isinstance(value, (str, int, float, bool))}
+
+class ChunkStream:
+    """
+    Chunks of a JSONL file with stable IDs, one record at a time.
+
+    An exported chunk record (page_content/metadata) is one chunk and is not
+    split again; a 'guid_text' record is a whole document and is split.
+
+    Repeated text within one source gets "-2", "-3", ... ID suffixes like
+    chroma_sync.assign_chunk_ids. Repeats are counted within each run of
+    consecutive records of the same source (the whole source in the exported
+    corpora), so only the current source's IDs are held in memory.
+    """
+
+    def __init__(self, jsonl_path, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, content_key='guid_text'):
+        self.jsonl_path = jsonl_path
+        self.splitter = get_splitter(chunk_size, chunk_overlap)
+        self.content_key = content_key
+        self.corpus = os.path.splitext(os.path.basename(jsonl_path))[0]
+        self.source = None
+        self.source_offset = 0
+        self._seen = {}
+
+    def _chunks_of(self, offset, record):
+        document = record_to_document(record, self.content_key)
+        document.metadata.setdefault('corpus', self.corpus)
+        source = document.metadata.get('source', '')
+        if source != self.source:
+            self.source, self.source_offset, self._seen = source, offset, {}
+        if 'page_content' in record:
+            chunks = [document]
+        else:
+            chunks = self.splitter.split_documents([document]) if document.page_content else []
+        for chunk in chunks:
+            base_id = chunk_id(source, chunk.page_content)
+            self._seen[base_id] = self._seen.get(base_id, 0) + 1
+            chunk.id = base_id if self._seen[base_id] == 1 else f"{base_id}-{self._seen[base_id]}"
+        if record.get('id') is not None and 'page_content' in record:
+            # Chunks exported with an ID keep it
+            chunks[0].id = record['id']
+        return chunks
+
+    def iter_chunks(self, offset=0, source_offset=None):
+        """
+        Yields:
+            tuple: (chunk Document, byte offset of its record, byte offset after its record)
+        """
+        if source_offset is not None and source_offset < offset:
+            # Replay the current source's earlier records (split only, no
+            # embedding) so duplicate suffixes continue where they stopped
+            for start, end, record in iter_jsonl_records(self.jsonl_path, source_offset):
+                if start >= offset:
+                    break
+                self._chunks_of(start, record)
+        for start, end, record in iter_jsonl_records(self.jsonl_path, offset):
+            for chunk in self._chunks_of(start, record):
+                yield chunk, start, end
+
+def iter_batches(chunk_stream, batch_size):
+    """
+    Group chunks into embedding batches.
+
+    Yields:
+        dict: 'chunks', plus 'resume_offset': where reading must restart so that
+            nothing after this batch is lost (the start of a record split across
+            this batch and the next, otherwise the end of the batch's last record)
+    """
+    batch = []
+    last = None
+    for chunk, start, end in chunk_stream:
+        if batch and len(batch) >= batch_size:
+            # The record of this chunk is not complete in the batch being closed
+            resume_offset = start if start == last[0] else last[1]
+            yield {'chunks': batch, 'resume_offset': resume_offset}
+            batch = []
+        batch.append(chunk)
+        last = (start, end)
+    if batch:
+        yield {'chunks': batch, 'resume_offset': last[1]}
+
+def embed_batch(embeddings, batch):
+    batch['vectors'] = embeddings.embed_documents([chunk.page_content for chunk in batch['chunks']])
+    return batch
+
+def upsert_batch(vector_store, batch):
+    chunks = batch['chunks']
+    vector_store._collection.upsert(
+        ids=[chunk.id for chunk in chunks],
+        embeddings=batch['vectors'],
+        metadatas=[chroma_metadata(chunk.metadata) for chunk in chunks],
+        documents=[chunk.page_content for chunk in chunks],
+    )
+
+def ingest_jsonl(jsonl_path, vector_store, embeddings, batch_size=EMBED_BATCH_SIZE,
+                 max_pending=MAX_PENDING_BATCHES, resume=True, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """
+    Stream one JSONL corpus into a Chroma collection.
+
+    Args:
+        jsonl_path (str): Chunk corpus (*_chunks.jsonl) or guid_text records
+        vector_store: langchain_chroma.Chroma store to upsert into
+        embeddings: LangChain Embeddings (e.g. CachedEmbeddings(OllamaEmbeddingPool(...)))
+        batch_size (int): Chunks per embedding batch
+        max_pending (int): Embedding batches in flight before reading pauses
+        resume (bool): Continue from the checkpoint of an earlier run
+
+    Returns:
+        dict: 'chunks' upserted in this run, 'batches', and 'resumed_from' (byte offset)
+    """
+    checkpoint_path = checkpoint_path_for(jsonl_path, vector_store._collection.name)
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    if checkpoint and checkpoint.get('size') == os.path.getsize(jsonl_path) and checkpoint.get('done'):
+        print(f"⏭️  {jsonl_path} already ingested")
+        return {'chunks': 0, 'batches': 0, 'resumed_from': checkpoint['offset']}
+    offset, source_offset = 0, None
+    if checkpoint:
+        offset, source_offset = checkpoint['offset'], checkpoint.get('source_offset')
+        print(f"🔄 Resuming {jsonl_path} at byte {offset}")
+
+    stream = ChunkStream(jsonl_path, chunk_size, chunk_overlap)
+    batches = iter_batches(stream.iter_chunks(offset, source_offset), batch_size)
+    stats = {'chunks': 0, 'batches': 0, 'resumed_from': offset}
+    pending = deque()
+
+    def finish_oldest():
+        batch = pending.popleft().result()
+        upsert_batch(vector_store, batch)
+        stats['chunks'] += len(batch['chunks'])
+        stats['batches'] += 1
+        save_checkpoint(checkpoint_path, {
+            'offset': batch['resume_offset'],
+            'source_offset': batch['source_offset'],
+            'chunks': stats['chunks'] + (checkpoint or {}).get('chunks', 0),
+        })
+        print(f"   🔄 {stats['chunks']} chunks upserted")
+
+    with ThreadPoolExecutor(max_workers=max_pending) as executor:
+        for batch in batches:
+            # Source run the resume point belongs to, for duplicate-suffix replay
+            batch['source_offset'] = stream.source_offset
+            if len(pending) >= max_pending:
+                # Backpressure: stop reading until the oldest batch is stored
+                finish_oldest()
+            pending.append(executor.submit(embed_batch, embeddings, batch))
+        while pending:
+            finish_oldest()
+
+    save_checkpoint(checkpoint_path, {
+        'offset': os.path.getsize(jsonl_path),
+        'size': os.path.getsize(jsonl_path),
+        'chunks': stats['chunks'] + (checkpoint or {}).get('chunks', 0),
+        'done': True,
+    })
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream chunk JSONL files into the Chroma collection')
+    parser.add_argument('jsonl', nargs='+', help='*_chunks.jsonl corpora')
+    parser.add_argument('--collection', default=COLLECTION_NAME, help='Chroma collection name')
+    parser.add_argument('--persist-directory', default=PERSIST_DIRECTORY, help='Chroma directory')
+    parser.add_argument('--model', default=EMBEDDING_MODEL, help='Ollama embedding model')
+    parser.add_argument('--endpoints', nargs='+',
+                        help='Ollama servers (OllamaEmbeddingPool); only for collections built with the pool')
+    parser.add_argument('--batch-size', type=int, default=EMBED_BATCH_SIZE, help='Chunks per embedding batch')
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING_BATCHES,
+                        help='Embedding batches in flight before reading pauses')
+    parser.add_argument('--restart', action='store_true', help='Ignore checkpoints and start over')
+    args = parser.parse_args()
+
+    try:
+        vector_store = open_vector_store(args.collection, args.persist_directory, args.model, args.endpoints)
+    except ValueError as e:
+        print(f"❌ {e}")
+        exit(1)
+    for jsonl_path in args.jsonl:
+        if not os.path.exists(jsonl_path):
+            print(f"❌ File not found: {jsonl_path}")
+            continue
+        stats = ingest_jsonl(jsonl_path, vector_store, vector_store.embeddings, args.batch_size,
+                             args.max_pending, resume=not args.restart)
+        print(f"✅ {os.path.basename(jsonl_path)}: {stats['chunks']} chunks in {stats['batches']} batches")
+
+if __name__ == "__main__":
+    main()
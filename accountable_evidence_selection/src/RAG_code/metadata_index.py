@@ -0,0 +1,146 @@
+"""
+Precomputed metadata bitsets for filtered retrieval.
+
+Leave-one-guideline-out and per-corpus runs filter every query on OPID,
+source or corpus. MetadataBitmaskIndex keeps, for each value of those
+fields, a packed bitset of the rows that carry it, so a Chroma-style filter
+is answered with a few bitwise operations instead of a scan over the
+metadata:
+
+    {"OPID": {"$ne": 50003}}
+    {"source": {"$in": ["a.grobid.tei.xml", "b.txt"]}}
+    {"$and": [{"corpus": "periop_pubmed_guidelines_chunks"}, {"OPID": {"$nin": [50001, 50002]}}]}
+
+Supported: {"field": value}, $eq, $ne, $in, $nin, $and, $or, and several
+fields in one dict (all must match). As before, $ne/$nin also match rows
+that lack the field. Fields other than INDEXED_FIELDS get their bitsets the
+first time they are used.
+
+The resulting masks are cached per filter as an additive score bias (0 for
+kept rows, -inf for filtered ones), so applying a filter inside vector
+scoring is one vector add, the same cost as an unfiltered search.
+"""
+
+import json
+from collections import OrderedDict
+
+import numpy as np
+
+INDEXED_FIELDS = ("OPID", "source", "corpus")
+
+# Distinct filters whose masks are kept
+MASK_CACHE_SIZE = 256
+
+class MetadataBitmaskIndex:
+    """Per-value packed bitsets over the rows of a vector index."""
+
+    def __init__(self, metadatas, fields=INDEXED_FIELDS):
+        self.metadatas = metadatas
+        self.rows = len(metadatas)
+        self.bitsets = {}
+        self._masks = OrderedDict()
+        for field in fields:
+            self._index_field(field)
+
+    def _index_field(self, field):
+        """Build the bitsets of one field: value -> packed rows, plus the rows that have it."""
+        values = {}
+        present = np.zeros(self.rows, dtype=bool)
+        for row, metadata in enumerate(self.metadatas):
+            if field in metadata:
+                present[row] = True
+                values.setdefault(self._value_key(metadata[field]), []).append(row)
+        bitsets = {}
+        for value, rows in values.items():
+            mask = np.zeros(self.rows, dtype=bool)
+            mask[rows] = True
+            bitsets[value] = np.packbits(mask)
+        self.bitsets[field] = (bitsets, np.packbits(present))
+
+    @staticmethod
+    def _value_key(value):
+        # Hashable key; lists in metadata are compared by value
+        return json.dumps(value, sort_keys=True) if isinstance(value, (list, dict)) else value
+
+    def _all(self):
+        return np.packbits(np.ones(self.rows, dtype=bool))
+
+    def _none(self):
+        return np.zeros((self.rows + 7) // 8, dtype=np.uint8)
+
+    def _equals(self, field, value):
+        if field not in self.bitsets:
+            self._index_field(field)
+        bitsets, _ = self.bitsets[field]
+        return bitsets.get(self._value_key(value), self._none())
+
+    def _field_condition(self, field, condition):
+        if not isinstance(condition, dict):
+            return self._equals(field, condition)
+        result = self._all()
+        for operator, value in condition.items():
+            if operator == '$eq':
+                bits = self._equals(field, value)
+            elif operator == '$ne':
+                bits = ~self._equals(field, value)
+            elif operator in ('$in', '$nin'):
+                bits = self._none()
+                for item in value:
+                    bits = bits | self._equals(field, item)
+                if operator == '$nin':
+                    bits = ~bits
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            result = result & bits
+        return result
+
+    def _evaluate(self, filter):
+        result = self._all()
+        for key, condition in filter.items():
+            if key == '$and':
+                for clause in condition:
+                    result = result & self._evaluate(clause)
+            elif key == '$or':
+                either = self._none()
+                for clause in condition:
+                    either = either | self._evaluate(clause)
+                result = result & either
+            else:
+                result = result & self._field_condition(key, condition)
+        return result
+
+    def mask(self, filter):
+        """
+        Boolean row mask of a filter (None when there is no filter).
+
+        Returns:
+            numpy.ndarray: bool, one entry per row
+        """
+        if not filter:
+            return None
+        return self._cached(filter)[0]
+
+    def score_bias(self, filter):
+        """
+        Additive score bias of a filter: 0 for matching rows, -inf otherwise.
+
+        Returns:
+            tuple: (bias float32 array or None, number of matching rows)
+        """
+        if not filter:
+            return None, self.rows
+        _, bias, count = self._cached(filter)
+        return bias, count
+
+    def _cached(self, filter):
+        key = json.dumps(filter, sort_keys=True, default=str)
+        if key in self._masks:
+            self._masks.move_to_end(key)
+            return self._masks[key]
+        mask = np.unpackbits(self._evaluate(filter), count=self.rows).astype(bool)
+        bias = np.where(mask, 0.0, -np.inf).astype(np.float32)
+        entry = (mask, bias, int(mask.sum()))
+        self._masks[key] = entry
+        if len(self._masks) > MASK_CACHE_SIZE:
+            self._masks.popitem(last=False)
+        return entry
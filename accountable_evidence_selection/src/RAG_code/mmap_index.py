@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+In-process exact vector index on a memory-mapped embedding matrix.
+
+The guideline and PubMed corpora total a few thousand chunks, small enough
+to search exactly with one matrix product instead of going through a Chroma
+client and its SQLite/HNSW layer. MmapVectorStore keeps:
+
+- vectors.npy   chunk embeddings, float32 or float16, opened with mmap
+- norms.npy     precomputed inverse L2 norms (float32)
+- chunks.jsonl  id, page_content and metadata of every row
+
+Loading maps the matrix without reading it, so it takes milliseconds.
+Queries are cosine similarity: one matrix product for any number of
+questions, then an argpartition top-k. A float32 matrix is multiplied
+straight from the mapping; a float16 one (half the disk and page cache) is
+converted block by block during the product.
+
+It is a LangChain VectorStore, so `as_retriever(search_type="similarity" or
+"mmr", search_kwargs={"k": ..., "filter": ...})` plugs into RetrievalQA
+unchanged. Filters ($eq/$ne/$in/$nin/$and/$or) are answered from the
+precomputed bitsets of metadata_index.py and applied inside the scoring.
+Scores are cosine similarities (higher is closer), not Chroma distances.
+
+For a whole question bank, `batch_max_marginal_relevance` runs MMR for all
+questions at once (vectorized over questions), and `precomputed_retriever`
+wraps the results in a retriever that RetrievalQA can use as before:
+
+    retriever = index.precomputed_retriever(questions, k=10, filter=...)
+    qa = RetrievalQA.from_chain_type(llm=llm, retriever=retriever, return_source_documents=True)
+
+Usage:
+    python mmap_index.py export [--collection geriatric_rag_test] [--index-dir DIR]
+    python mmap_index.py query "question" [--k 10]
+"""
+
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+from metadata_index import MetadataBitmaskIndex
+
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "results", "vector_index")
+INDEX_FORMAT = 1
+
+# float16 rows converted to float32 per step of a search
+SEARCH_BLOCK_ROWS = 4096
+
+def write_index(index_dir, ids, texts, metadatas, vectors, dtype='float32'):
+    """
+    Write an index directory (vectors, inverse norms, chunk records).
+
+    Args:
+        index_dir (str): Output directory
+        ids (list): Chunk IDs
+        texts (list): Chunk texts
+        metadatas (list): Chunk metadata dicts
+        vectors: (n, dim) embeddings
+        dtype (str): 'float32' or 'float16' storage
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    matrix = np.asarray(vectors, dtype=np.float32).astype(dtype)
+    # Norms of the stored (possibly rounded) vectors
+    norms = np.linalg.norm(matrix.astype(np.float32), axis=1)
+    inverse_norms = np.where(norms > 0, 1.0 / np.maximum(norms, 1e-12), 0.0).astype(np.float32)
+
+    np.save(os.path.join(index_dir, "vectors.npy"), matrix)
+    np.save(os.path.join(index_dir, "norms.npy"), inverse_norms)
+    with open(os.path.join(index_dir, "chunks.jsonl"), 'w', encoding='utf-8') as f:
+        for chunk_id, text, metadata in zip(ids, texts, metadatas):
+            f.write(json.dumps({'id': chunk_id, 'page_content': text, 'metadata': metadata or {}},
+                               ensure_ascii=False) + "\n")
+    with open(os.path.join(index_dir, "index.json"), 'w', encoding='utf-8') as f:
+        json.dump({'format': INDEX_FORMAT, 'count': int(matrix.shape[0]),
+                   'dim': int(matrix.shape[1]) if matrix.ndim == 2 else 0, 'dtype': dtype}, f, indent=2)
+
+def top_k_rows(scores, k):
+    """
+    Top-k rows of each column of a (n_rows, n_queries) score matrix.
+
+    Returns:
+        list: For each query, a list of (row index, score), best first
+    """
+    if k <= 0:
+        return [[] for _ in range(scores.shape[1])]
+    top = np.argpartition(-scores, k - 1, axis=0)[:k] if k < scores.shape[0] else \
+        np.tile(np.arange(scores.shape[0])[:, None], (1, scores.shape[1]))
+    results = []
+    for column in range(scores.shape[1]):
+        rows = top[:, column]
+        order = np.argsort(-scores[rows, column], kind='stable')
+        results.append([(int(rows[i]), float(scores[rows[i], column])) for i in order])
+    return results
+
+class MmapVectorStore(VectorStore):
+    """Exact cosine-similarity VectorStore over a memory-mapped matrix (see module docstring)."""
+
+    def __init__(self, index_dir=INDEX_DIR, embedding=None):
+        self.index_dir = index_dir
+        self.embedding = embedding
+        self.matrix = np.load(os.path.join(index_dir, "vectors.npy"), mmap_mode='r')
+        self.inverse_norms = np.load(os.path.join(index_dir, "norms.npy"))
+        self.ids, self.texts, self.metadatas = [], [], []
+        with open(os.path.join(index_dir, "chunks.jsonl"), 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                self.ids.append(record['id'])
+                self.texts.append(record['page_content'])
+                self.metadatas.append(record['metadata'])
+        self.metadata_index = MetadataBitmaskIndex(self.metadatas)
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, index_dir=INDEX_DIR, dtype='float32', **kwargs):
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(i) for i in range(len(texts))]
+        write_index(index_dir, ids, texts, metadatas, embedding.embed_documents(texts), dtype)
+        return cls(index_dir, embedding)
+
+    @classmethod
+    def from_chroma(cls, vector_store, index_dir=INDEX_DIR, dtype='float32'):
+        """
+        Export a Chroma collection (vectors included, nothing is re-embedded).
+
+        Args:
+            vector_store: langchain_chroma.Chroma store
+            index_dir (str): Output directory
+            dtype (str): 'float32' or 'float16' storage
+
+        Returns:
+            MmapVectorStore: The exported index, using the store's embedding function
+        """
+        stored = vector_store.get(include=['embeddings', 'documents', 'metadatas'])
+        write_index(index_dir, stored['ids'], stored['documents'], stored['metadatas'],
+                    stored['embeddings'], dtype)
+        return cls(index_dir, vector_store.embeddings)
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError("MmapVectorStore is read-only; rebuild it with from_chroma or from_texts")
+
+    def _scores(self, query_vectors, bias=None):
+        """
+        (n_rows, n_queries) cosine similarities of every row with every query.
+
+        bias (a filter's score_bias) is added per row, so filtered-out rows score -inf.
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1)
+        queries = queries / np.where(norms > 0, norms, 1.0)[:, None]
+        if self.matrix.dtype == np.float32:
+            scores = self.matrix @ queries.T
+        else:
+            scores = np.empty((self.matrix.shape[0], queries.shape[0]), dtype=np.float32)
+            for start in range(0, self.matrix.shape[0], SEARCH_BLOCK_ROWS):
+                block = np.asarray(self.matrix[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+                scores[start:start + len(block)] = block @ queries.T
+        scores *= self.inverse_norms[:, None]
+        if bias is not None:
+            scores += bias[:, None]
+        return scores
+
+    def search_vectors(self, query_vectors, k=4, filter=None):
+        """
+        Exact top-k for several query vectors at once.
+
+        Args:
+            query_vectors: (n_queries, dim) embeddings
+            k (int): Results per query
+            filter (dict): Metadata filter applied before ranking
+
+        Returns:
+            list: For each query, a list of (row index, cosine similarity), best first
+        """
+        bias, matching_rows = self.metadata_index.score_bias(filter)
+        return top_k_rows(self._scores(query_vectors, bias), min(k, matching_rows))
+
+    def _document(self, row):
+        return Document(id=self.ids[row], page_content=self.texts[row], metadata=dict(self.metadatas[row]))
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return [self._document(row) for row, _ in self.search_vectors([embedding], k, filter)[0]]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        hits = self.search_vectors([self.embedding.embed_query(query)], k, filter)[0]
+        return [(self._document(row), score) for row, score in hits]
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def batch_similarity_search(self, queries, k=4, filter=None):
+        """
+        Search many questions with a single matrix product.
+
+        Returns:
+            list: For each query, its top-k Documents
+        """
+        query_vectors = [self.embedding.embed_query(query) for query in queries]
+        return [[self._document(row) for row, _ in hits] for hits in self.search_vectors(query_vectors, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] -> relevance in [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    def max_marginal_relevance_search_by_vector(self, embedding, k=4, fetch_k=20, lambda_mult=0.5,
+                                                filter=None, **kwargs):
+        candidates = [row for row, _ in self.search_vectors([embedding], fetch_k, filter)[0]]
+        if not candidates:
+            return []
+        candidate_vectors = np.asarray(self.matrix[candidates], dtype=np.float32)
+        selected = maximal_marginal_relevance(np.asarray(embedding, dtype=np.float32), candidate_vectors,
+                                              lambda_mult=lambda_mult, k=k)
+        return [self._document(candidates[i]) for i in selected]
+
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5, filter=None, **kwargs):
+        return self.max_marginal_relevance_search_by_vector(self.embedding.embed_query(query), k, fetch_k,
+                                                            lambda_mult, filter)
+
+    def batch_max_marginal_relevance(self, query_vectors, k=4, fetch_k=20, lambda_mult=0.5, filter=None):
+        """
+        MMR for many queries at once.
+
+        Same selection as maximal_marginal_relevance per query (start from the
+        most similar candidate, then repeatedly take the candidate maximizing
+        lambda * similarity to the query - (1 - lambda) * max similarity to
+        the chunks already picked), but each greedy step is one NumPy update
+        over all queries instead of a Python loop per query and candidate.
+
+        Args:
+            query_vectors: (n_queries, dim) embeddings
+            k (int): Chunks selected per query
+            fetch_k (int): Candidates considered per query
+            lambda_mult (float): 1 = pure relevance, 0 = pure diversity
+            filter (dict): Metadata filter applied to the candidates
+
+        Returns:
+            list: For each query, the row indices of its selected chunks, in selection order
+        """
+        hits = self.search_vectors(query_vectors, fetch_k, filter)
+        n_candidates = len(hits[0]) if hits else 0
+        if n_candidates == 0:
+            return [[] for _ in hits]
+
+        rows = np.array([[row for row, _ in query_hits] for query_hits in hits])             # (q, f)
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1), 1e-12)[:, None]
+        candidates = np.asarray(self.matrix[rows.ravel()], dtype=np.float32).reshape(*rows.shape, -1)
+        candidates *= self.inverse_norms[rows][:, :, None]                                   # unit rows
+        query_similarity = np.einsum('qfd,qd->qf', candidates, queries)
+        pairwise = np.einsum('qfd,qgd->qfg', candidates, candidates)
+
+        n_queries = rows.shape[0]
+        steps = min(k, n_candidates)
+        selected = np.empty((n_queries, steps), dtype=np.int64)
+        taken = np.zeros(rows.shape, dtype=bool)
+        everyone = np.arange(n_queries)
+        redundancy = np.full(rows.shape, -np.inf, dtype=np.float32)
+        for step in range(steps):
+            if step == 0:
+                scores = query_similarity.copy()
+            else:
+                scores = lambda_mult * query_similarity - (1 - lambda_mult) * redundancy
+            scores[taken] = -np.inf
+            best = np.argmax(scores, axis=1)
+            selected[:, step] = best
+            taken[everyone, best] = True
+            redundancy = np.maximum(redundancy, pairwise[everyone, :, best])
+        return [[int(rows[q, i]) for i in selected[q]] for q in range(n_queries)]
+
+    def batch_max_marginal_relevance_search(self, queries, k=4, fetch_k=20, lambda_mult=0.5, filter=None):
+        """
+        Batch MMR from question texts.
+
+        Returns:
+            list: For each question, its selected Documents
+        """
+        query_vectors = [self.embedding.embed_query(query) for query in queries]
+        selections = self.batch_max_marginal_relevance(query_vectors, k, fetch_k, lambda_mult, filter)
+        return [[self._document(row) for row in rows] for rows in selections]
+
+    def precomputed_retriever(self, queries, k=4, fetch_k=20, lambda_mult=0.5, filter=None):
+        """
+        Retriever answering the given questions from one batch MMR run.
+
+        Questions it was not built for fall back to a regular MMR search.
+        """
+        queries = list(queries)
+        results = self.batch_max_marginal_relevance_search(queries, k, fetch_k, lambda_mult, filter)
+        fallback = self.as_retriever(search_type="mmr", search_kwargs={
+            'k': k, 'fetch_k': fetch_k, 'lambda_mult': lambda_mult, 'filter': filter})
+        return PrecomputedRetriever(results=dict(zip(queries, results)), fallback=fallback)
+
+class PrecomputedRetriever(BaseRetriever):
+    """Serves retrieval results computed ahead of time, keyed by the exact query text."""
+
+    results: dict
+    fallback: BaseRetriever
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        if query in self.results:
+            return [Document(id=doc.id, page_content=doc.page_content, metadata=dict(doc.metadata))
+                    for doc in self.results[query]]
+        return self.fallback.invoke(query)
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the Chroma collection to a memory-mapped index, or query it')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export = subparsers.add_parser('export', help='Copy vectors and chunks out of Chroma')
+    export.add_argument('--collection', default="geriatric_rag_test", help='Chroma collection name')
+    export.add_argument('--persist-directory', default="./chroma_dbs/", help='Chroma directory')
+    export.add_argument('--dtype', choices=['float32', 'float16'], default='float32', help='Matrix storage type')
+    query = subparsers.add_parser('query', help='Search the index')
+    query.add_argument('question', help='Question text')
+    query.add_argument('--k', type=int, default=10, help='Results')
+    for sub in (export, query):
+        sub.add_argument('--index-dir', default=INDEX_DIR, help='Index directory')
+        sub.add_argument('--model', default="qwen3-embedding:latest", help='Ollama embedding model')
+    args = parser.parse_args()
+
+    from chroma_sync import open_vector_store
+    if args.command == 'export':
+        vector_store = open_vector_store(args.collection, args.persist_directory, args.model)
+        index = MmapVectorStore.from_chroma(vector_store, args.index_dir, args.dtype)
+        print(f"✅ Exported {len(index)} chunks to {args.index_dir}")
+        return
+
+    from langchain_community.embeddings import OllamaEmbeddings
+    from embedding_cache import CachedEmbeddings
+    start = time.perf_counter()
+    index = MmapVectorStore(args.index_dir, CachedEmbeddings(OllamaEmbeddings(model=args.model)))
+    print(f"📂 Loaded {len(index)} chunks in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for rank, (doc, score) in enumerate(index.similarity_search_with_score(args.question, args.k), 1):
+        print(f"{rank:>2}. {score:.3f}  {doc.metadata.get('source', '')}: {doc.page_content[:80]!r}")
+
+if __name__ == "__main__":
+    main()
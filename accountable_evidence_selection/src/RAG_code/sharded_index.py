@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Sharded multi-corpus retrieval: one memory-mapped index per chunk corpus.
+
+The four chunk corpora (periop/painmg PubMed guidelines, the PDF guidelines
+retrieval corpus and its layout-aware variant) used to be merged into the
+single geriatric_rag_test collection, so changing one meant re-indexing all
+of them. Here each corpus is its own MmapVectorStore directory under
+results/shards/<corpus name>/, built from its JSONL file with build_shard.
+A rebuilt shard is written next to the old one and swapped in with a
+rename, so the others are never touched.
+
+ShardedVectorStore searches every shard for a query:
+
+1. the query is embedded once
+2. the shards are scored concurrently (the matrix products release the GIL)
+3. each shard's scores are normalized against that shard's own score
+   distribution for the query (over its rows that pass the filter):
+   'zscore' (default), 'minmax', or 'none' for raw cosine similarity
+4. the per-shard top-k lists are merged into a global top-k; a chunk that
+   appears in several shards (same ID, i.e. same source and text) is kept
+   once, with its best score
+
+Normalization keeps a shard whose scores run higher overall (a denser or
+more uniform corpus) from crowding out the others. Each shard records the
+embeddings it was built with (chroma_sync.embedder_id) in its index.json;
+shards built with different embeddings, or queried with other ones, are
+refused. It is a LangChain VectorStore, so as_retriever with "similarity"
+or "mmr" and a metadata filter works as with Chroma.
+
+Usage:
+    python sharded_index.py build ../../results/*_chunks*.jsonl [--endpoints URL ...]
+    python sharded_index.py list
+    python sharded_index.py query "question" [--k 10] [--normalization zscore]
+"""
+
+import os
+import json
+import heapq
+import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_core.vectorstores import VectorStore
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+from chroma_sync import embedder_id, get_embeddings, EMBEDDER_KEY, EMBEDDING_MODEL
+from ingest_pipeline import ChunkStream, EMBED_BATCH_SIZE
+from mmap_index import MmapVectorStore, top_k_rows, write_index
+
+SHARD_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "results", "shards")
+
+NORMALIZATIONS = ('zscore', 'minmax', 'none')
+
+def shard_name(jsonl_path):
+    """Shard of a corpus file: its name without .jsonl (the chunks' 'corpus' metadata)."""
+    return os.path.splitext(os.path.basename(jsonl_path))[0]
+
+def build_shard(jsonl_path, embeddings, shard_root=SHARD_ROOT, batch_size=EMBED_BATCH_SIZE, dtype='float32'):
+    """
+    Chunk, embed and index one corpus as its own shard.
+
+    Args:
+        jsonl_path (str): Chunk corpus (*_chunks.jsonl) or guid_text records
+        embeddings: LangChain Embeddings (e.g. get_embeddings())
+        shard_root (str): Directory holding the shards
+        batch_size (int): Chunks per embed_documents call
+        dtype (str): 'float32' or 'float16' storage
+
+    Returns:
+        str: The shard directory
+    """
+    ids, texts, metadatas, vectors = [], [], [], []
+    batch = []
+
+    def embed(batch):
+        vectors.extend(embeddings.embed_documents([chunk.page_content for chunk in batch]))
+        for chunk in batch:
+            ids.append(chunk.id)
+            texts.append(chunk.page_content)
+            metadatas.append(chunk.metadata)
+
+    for chunk, _, _ in ChunkStream(jsonl_path).iter_chunks():
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            embed(batch)
+            batch = []
+    if batch:
+        embed(batch)
+    if not ids:
+        raise ValueError(f"No chunks in {jsonl_path}")
+
+    # Write aside, then swap in with renames: readers never see a half-written shard
+    shard_dir = os.path.join(shard_root, shard_name(jsonl_path))
+    building_dir, old_dir = f"{shard_dir}.building", f"{shard_dir}.old"
+    shutil.rmtree(building_dir, ignore_errors=True)
+    write_index(building_dir, ids, texts, metadatas, vectors, dtype)
+    info_path = os.path.join(building_dir, "index.json")
+    with open(info_path, 'r', encoding='utf-8') as f:
+        info = json.load(f)
+    info[EMBEDDER_KEY] = embedder_id(embeddings)
+    with open(info_path, 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(shard_dir):
+        os.rename(shard_dir, old_dir)
+    os.rename(building_dir, shard_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return shard_dir
+
+def list_shards(shard_root=SHARD_ROOT):
+    """
+    Returns:
+        list: Sorted names of the complete shards under shard_root
+    """
+    if not os.path.isdir(shard_root):
+        return []
+    return sorted(name for name in os.listdir(shard_root)
+                  if not name.endswith(('.building', '.old'))
+                  and os.path.exists(os.path.join(shard_root, name, "index.json")))
+
+def shard_embedder(shard_dir):
+    """Embeddings a shard was built with (see chroma_sync.embedder_id), or None if not recorded."""
+    with open(os.path.join(shard_dir, "index.json"), 'r', encoding='utf-8') as f:
+        return json.load(f).get(EMBEDDER_KEY)
+
+def normalize_scores(scores, normalization):
+    """
+    Normalize one shard's scores for one query in place.
+
+    Args:
+        scores (numpy.ndarray): Scores of every row; filtered-out rows are -inf
+        normalization (str): 'zscore', 'minmax' or 'none'
+    """
+    if normalization == 'none':
+        return scores
+    kept = scores[np.isfinite(scores)]
+    if not len(kept):
+        return scores
+    if normalization == 'zscore':
+        center, scale = kept.mean(), kept.std()
+    elif normalization == 'minmax':
+        center, scale = kept.min(), kept.max() - kept.min()
+    else:
+        raise ValueError(f"Unknown normalization: {normalization} (expected one of {NORMALIZATIONS})")
+    scores -= center
+    if scale > 0:
+        scores /= scale
+    return scores
+
+class ShardedVectorStore(VectorStore):
+    """Fans queries out over per-corpus MmapVectorStore shards and merges the results."""
+
+    def __init__(self, shard_root=SHARD_ROOT, embedding=None, shards=None, normalization='zscore', max_workers=None):
+        if normalization not in NORMALIZATIONS:
+            raise ValueError(f"Unknown normalization: {normalization} (expected one of {NORMALIZATIONS})")
+        self.shard_root = shard_root
+        self.embedding = embedding
+        self.normalization = normalization
+        self.shards = {}
+        self._loaded_at = {}
+        self.refresh(shards)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or max(1, len(self.shards)))
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards.values())
+
+    def refresh(self, names=None):
+        """
+        Load new shards and reload rebuilt ones; shards that disappeared are dropped.
+
+        Returns:
+            list: Names of the shards (re)loaded
+        """
+        names = list_shards(self.shard_root) if names is None else list(names)
+        loaded = []
+        for name in names:
+            shard_dir = os.path.join(self.shard_root, name)
+            built_at = os.path.getmtime(os.path.join(shard_dir, "index.json"))
+            if self._loaded_at.get(name) != built_at:
+                self.shards[name] = MmapVectorStore(shard_dir, self.embedding)
+                self._loaded_at[name] = built_at
+                loaded.append(name)
+        for name in set(self.shards) - set(names):
+            del self.shards[name], self._loaded_at[name]
+        dims = {shard.matrix.shape[1] for shard in self.shards.values() if shard.matrix.ndim == 2}
+        if len(dims) > 1:
+            raise ValueError(f"Shards have different embedding dimensions {sorted(dims)}; "
+                             "they must be built with the same embedding model")
+        embedders = {shard_embedder(os.path.join(self.shard_root, name)) for name in self.shards} - {None}
+        if self.embedding is not None:
+            embedders.add(embedder_id(self.embedding))
+        if len(embedders) > 1:
+            raise ValueError(f"Shards and query embeddings differ ({', '.join(sorted(embedders))}); "
+                             "build and query all shards with the same embeddings")
+        return loaded
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("Build shards per corpus with build_shard")
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError("ShardedVectorStore is read-only; rebuild a shard with build_shard")
+
+    def _search_shard(self, name, query_vector, k, filter):
+        shard = self.shards[name]
+        bias, matching_rows = shard.metadata_index.score_bias(filter)
+        scores = shard._scores([query_vector], bias)
+        raw = scores[:, 0].copy()
+        normalize_scores(scores[:, 0], self.normalization)
+        return [(score, name, row, float(raw[row])) for row, score in top_k_rows(scores, min(k, matching_rows))[0]]
+
+    def search_vector(self, query_vector, k=4, filter=None):
+        """
+        Global top-k over all shards for one query vector.
+
+        Args:
+            query_vector: Query embedding
+            k (int): Results
+            filter (dict): Metadata filter, applied in every shard
+
+        Returns:
+            list: (normalized score, shard name, row, cosine similarity), best first
+        """
+        # Every shard returns its own top k, so the merged top k is exact
+        futures = [self._executor.submit(self._search_shard, name, query_vector, k, filter) for name in self.shards]
+        hits = heapq.merge(*(future.result() for future in futures), key=lambda hit: -hit[0])
+        results, seen = [], set()
+        for hit in hits:
+            chunk_id = self.shards[hit[1]].ids[hit[2]]
+            if chunk_id in seen:
+                continue
+            seen.add(chunk_id)
+            results.append(hit)
+            if len(results) == k:
+                break
+        return results
+
+    def _document(self, hit):
+        return self.shards[hit[1]]._document(hit[2])
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return [self._document(hit) for hit in self.search_vector(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        return [(self._document(hit), hit[0]) for hit in self.search_vector(self.embedding.embed_query(query), k, filter)]
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def max_marginal_relevance_search_by_vector(self, embedding, k=4, fetch_k=20, lambda_mult=0.5,
+                                                filter=None, **kwargs):
+        candidates = self.search_vector(embedding, fetch_k, filter)
+        if not candidates:
+            return []
+        candidate_vectors = np.array([self.shards[name].matrix[row] for _, name, row, _ in candidates],
+                                     dtype=np.float32)
+        selected = maximal_marginal_relevance(np.asarray(embedding, dtype=np.float32), candidate_vectors,
+                                              lambda_mult=lambda_mult, k=k)
+        return [self._document(candidates[i]) for i in selected]
+
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5, filter=None, **kwargs):
+        return self.max_marginal_relevance_search_by_vector(self.embedding.embed_query(query), k, fetch_k,
+                                                            lambda_mult, filter)
+
+    def close(self):
+        self._executor.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description='Build, list or query per-corpus index shards')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help='Index each corpus as its own shard')
+    build.add_argument('jsonl', nargs='+', help='Chunk corpora (*_chunks.jsonl)')
+    build.add_argument('--endpoints', nargs='+', help='Ollama servers (OllamaEmbeddingPool)')
+    build.add_argument('--batch-size', type=int, default=EMBED_BATCH_SIZE, help='Chunks per embedding batch')
+    build.add_argument('--dtype', choices=['float32', 'float16'], default='float32', help='Matrix storage type')
+    listing = subparsers.add_parser('list', help='Show the shards')
+    query = subparsers.add_parser('query', help='Search all shards')
+    query.add_argument('question', help='Question text')
+    query.add_argument('--k', type=int, default=10, help='Results')
+    query.add_argument('--normalization', choices=NORMALIZATIONS, default='zscore', help='Per-shard score normalization')
+    query.add_argument('--endpoints', nargs='+', help='Ollama servers, for shards built with --endpoints')
+    for sub in (build, listing, query):
+        sub.add_argument('--shard-root', default=SHARD_ROOT, help='Directory holding the shards')
+    for sub in (build, query):
+        sub.add_argument('--model', default=EMBEDDING_MODEL, help='Ollama embedding model')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for name in list_shards(args.shard_root):
+            with open(os.path.join(args.shard_root, name, "index.json"), 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            print(f"📂 {name}: {info['count']} chunks, dim {info['dim']}, {info['dtype']}, "
+                  f"{info.get(EMBEDDER_KEY, 'embeddings not recorded')}")
+        return
+
+    if args.command == 'build':
+        embeddings = get_embeddings(args.model, args.endpoints)
+        for jsonl_path in args.jsonl:
+            if not os.path.exists(jsonl_path):
+                print(f"❌ File not found: {jsonl_path}")
+                continue
+            shard_dir = build_shard(jsonl_path, embeddings, args.shard_root, args.batch_size, args.dtype)
+            print(f"✅ {shard_name(jsonl_path)} -> {shard_dir}")
+        return
+
+    try:
+        store = ShardedVectorStore(args.shard_root, get_embeddings(args.model, args.endpoints),
+                                   normalization=args.normalization)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    query_vector = store.embedding.embed_query(args.question)
+    for rank, hit in enumerate(store.search_vector(query_vector, args.k), 1):
+        score, name, _, similarity = hit
+        doc = store._document(hit)
+        print(f"{rank:>2}. {score:.3f} ({similarity:.3f})  [{name}] {doc.metadata.get('source', '')}: "
+              f"{doc.page_content[:80]!r}")
+    store.close()
+
+if __name__ == "__main__":
+    main()
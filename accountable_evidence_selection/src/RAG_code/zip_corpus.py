@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Read the RAG corpora straight from their zip archives.
+
+The guideline and PubMed corpora ship as RAG_code_guideline_input.zip and
+PubMed_periop_painmanagement.zip (zipped on macOS, so every file has a
+__MACOSX/._name resource-fork twin and folders carry .DS_Store files).
+Instead of extracting the archives, the members are read and parsed in
+memory, the same way the notebook's chunk_creation reads the extracted
+folder:
+- .xml members: GROBID TEI, text = abstract + body (grobid_tei_xml)
+- .txt members: structured text, runs of '=' become paragraph breaks
+
+Parsing runs in a process pool; every worker opens the archive itself and
+reads only the members it is given, so nothing is ever written to disk.
+
+Usage:
+    python zip_corpus.py [archive.zip ...] [--workers 4]
+"""
+
+import os
+import re
+import zipfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.documents import Document
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..")
+GUIDELINE_ZIP = os.path.join(REPO_ROOT, "RAG_code_guideline_input.zip")
+PUBMED_ZIP = os.path.join(REPO_ROOT, "PubMed_periop_painmanagement.zip")
+
+# Members handed to a worker at a time
+MEMBERS_PER_TASK = 4
+
+def is_junk_member(info):
+    """True for directories and macOS metadata (__MACOSX/, ._ resource forks, .DS_Store)."""
+    if info.is_dir():
+        return True
+    parts = info.filename.split('/')
+    name = parts[-1]
+    return parts[0] == '__MACOSX' or name.startswith('._') or name == '.DS_Store'
+
+def parse_tei_text(data):
+    """
+    Abstract and body of a GROBID TEI document, as chunk_creation builds them.
+
+    Args:
+        data (bytes): TEI XML
+
+    Returns:
+        str: Abstract and body joined by a blank line
+    """
+    import grobid_tei_xml
+    doc_extract = grobid_tei_xml.parse_document_xml(data.decode('utf-8'))
+    text_parts = []
+    if getattr(doc_extract, 'abstract', None):
+        text_parts.append(doc_extract.abstract)
+    if getattr(doc_extract, 'body', None):
+        text_parts.append(doc_extract.body)
+    return "\n\n".join(text_parts)
+
+def parse_structured_text(data):
+    """
+    Text of a .txt member with the '====' section rules turned into paragraph breaks.
+
+    Args:
+        data (bytes): UTF-8 text
+
+    Returns:
+        str: Cleaned text
+    """
+    return re.sub(r'={2,}', '\n\n', data.decode('utf-8'))
+
+# Member suffix -> parser
+MEMBER_PARSERS = {
+    '.xml': parse_tei_text,
+    '.txt': parse_structured_text,
+}
+
+def list_corpus_members(zip_path, suffixes=tuple(MEMBER_PARSERS)):
+    """
+    Names of the members to ingest, in archive order.
+
+    Args:
+        zip_path (str): Corpus archive
+        suffixes (tuple): Member suffixes to keep
+
+    Returns:
+        list: Member names, without directories and macOS metadata
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        return [info.filename for info in archive.infolist()
+                if not is_junk_member(info) and info.filename.lower().endswith(suffixes)]
+
+def parse_member(archive, member):
+    """
+    Read and parse one member of an open archive.
+
+    Returns:
+        tuple: (member name, text)
+    """
+    suffix = os.path.splitext(member)[1].lower()
+    return member, MEMBER_PARSERS[suffix](archive.read(member))
+
+def parse_member_batch(zip_path, members):
+    """
+    Process-pool task: parse a few members with an archive handle owned by this process.
+
+    Returns:
+        list: (member name, text) pairs, in the given order
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        return [parse_member(archive, member) for member in members]
+
+def iter_member_texts(zip_path, members, workers=1):
+    """
+    Parse archive members, in order.
+
+    Args:
+        zip_path (str): Corpus archive
+        members (list): Member names (see list_corpus_members)
+        workers (int): Worker processes; 1 parses in this process
+
+    Yields:
+        tuple: (member name, text)
+    """
+    if workers <= 1 or len(members) <= 1:
+        with zipfile.ZipFile(zip_path) as archive:
+            for member in members:
+                yield parse_member(archive, member)
+        return
+
+    batches = [members[i:i + MEMBERS_PER_TASK] for i in range(0, len(members), MEMBERS_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Futures are consumed in submission order, so output order is fixed
+        futures = [executor.submit(parse_member_batch, zip_path, batch) for batch in batches]
+        for future in futures:
+            yield from future.result()
+
+def iter_zip_documents(zip_path, workers=1, suffixes=tuple(MEMBER_PARSERS)):
+    """
+    Stream the documents of a corpus archive without extracting it.
+
+    Args:
+        zip_path (str): Corpus archive
+        workers (int): Worker processes used for parsing
+        suffixes (tuple): Member suffixes to ingest
+
+    Yields:
+        Document: One per member, with 'source' (file name, as chunk_creation
+            sets it), 'member' (path inside the archive) and 'archive' metadata
+    """
+    archive_name = os.path.basename(zip_path)
+    members = list_corpus_members(zip_path, suffixes)
+    for member, text in iter_member_texts(zip_path, members, workers):
+        if not text.strip():
+            print(f"⚠️  No text in {archive_name}:{member}")
+        yield Document(page_content=text, metadata={
+            'source': os.path.basename(member),
+            'member': member,
+            'archive': archive_name,
+        })
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse corpus archives without extracting them')
+    parser.add_argument('archives', nargs='*', default=[GUIDELINE_ZIP, PUBMED_ZIP], help='Corpus zip files')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    args = parser.parse_args()
+
+    for zip_path in args.archives:
+        if not os.path.exists(zip_path):
+            print(f"❌ Archive not found: {zip_path}")
+            continue
+        documents = 0
+        total_chars = 0
+        for doc in iter_zip_documents(zip_path, args.workers):
+            documents += 1
+            total_chars += len(doc.page_content)
+        print(f"✅ {os.path.basename(zip_path)}: {documents} documents, {total_chars} characters")
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,31 @@
 import pandas as pd
 import numpy as np
 import re
-import ollama
+import sys
 from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
 from rouge_score import rouge_scorer
 import os
 
+# Shared with the RAG notebooks: repeated texts are embedded only once, ever
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "RAG_code"))
+from embedding_cache import cached_ollama_embed, get_default_cache
+
 def _simple_tokenize(text: str):
     return re.findall(r"[A-Za-z0-9]+", text.lower())
 
 def _ollama_embed_text(text: str, model: str):
     # Ensure you have 'ollama' installed: pip install ollama
-    res = ollama.embed(model=model, input=text)
-    return np.array(res.embeddings, dtype=np.float32)
+    # Served from the on-disk embedding cache when this text was embedded before
+    return np.array(cached_ollama_embed([text], model), dtype=np.float32)
 
 def _token_embeddings(tokens, model: str, cache: dict):
-    embs = []
-    for tok in tokens:
-        if tok in cache:
-            emb = cache[tok]
-        else:
-            emb = _ollama_embed_text(tok, model)
-            cache[tok] = emb
-        embs.append(emb)
+    # Look up every new token in the on-disk cache at once; only the
+    # remaining ones are sent to Ollama
+    new_tokens = [tok for tok in dict.fromkeys(tokens) if tok not in cache]
+    if new_tokens:
+        for tok, emb in zip(new_tokens, cached_ollama_embed(new_tokens, model)):
+            cache[tok] = np.array([emb], dtype=np.float32)
+    embs = [cache[tok] for tok in tokens]
     return np.vstack(embs) if embs else np.empty((0, 0), dtype=np.float32)
 
 def _cosine_matrix(A: np.ndarray, B: np.ndarray):
@@ -111,6 +114,8 @@ def run_evaluation():
     # Save
     pd.DataFrame(results).to_csv("final_comparison_results.csv", index=False)
     print("\nDone! Results saved.")
+    stats = get_default_cache().stats()
+    print(f"📈 Embedding cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} stored")
 
 if __name__ == "__main__":
     run_evaluation()
\ No newline at end of file
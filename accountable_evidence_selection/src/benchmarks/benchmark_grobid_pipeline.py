@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the GROBID parser paths against the offline stub.
+
+Starts grobid_stub_server in the background, creates one placeholder PDF per
+recorded TEI file (the stub answers by file name) and runs every parser path
+over them in a fresh subprocess, so each path's peak RSS is its own:
+
+- fulltext_single       pdf_to_text_grobid_fulltext.process_single_pdf_to_xml (GrobidClient)
+- fulltext_batch        pdf_to_text_grobid_fulltext.process_pdf_batch
+- langchain_sequential  pdf_to_text_grobid_LangChain.extract_pdf_with_grobid_sequential
+- langchain_raw         pdf_to_text_grobid_LangChain_raw.extract_pdf_raw_langchain
+- tei_emit              tei_stream.emit_tei on the recorded TEI (no server)
+
+The TEI cache is disabled, so every document goes through the server.
+
+Usage:
+    python benchmark_grobid_pipeline.py [--latency 0.2] [--paths fulltext_batch tei_emit]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import resource
+import subprocess
+import contextlib
+
+from tei_fixtures import fixture_tei_files
+from grobid_stub_server import running_stub
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def make_placeholder_pdfs(pdf_dir):
+    """One small placeholder PDF per recorded TEI file, named like the original."""
+    pdf_paths = []
+    for tei_path in fixture_tei_files():
+        name = os.path.basename(tei_path).replace('.grobid.tei.xml', '.pdf')
+        pdf_path = os.path.join(pdf_dir, name)
+        with open(pdf_path, 'wb') as f:
+            f.write(b"%PDF-1.4\n% placeholder for " + name.encode('utf-8') + b"\n%%EOF\n")
+        pdf_paths.append(pdf_path)
+    return pdf_paths
+
+def run_fulltext_single(pdf_paths, work_dir, grobid_url):
+    from pdf_to_text_grobid_fulltext import process_single_pdf_to_xml
+    return sum(1 for pdf in pdf_paths
+               if process_single_pdf_to_xml(pdf, work_dir, use_cache=False, grobid_url=grobid_url))
+
+def run_fulltext_batch(pdf_paths, work_dir, grobid_url):
+    from pdf_to_text_grobid_fulltext import process_pdf_batch
+    manifest = os.path.join(work_dir, "batch.txt")
+    with open(manifest, 'w', encoding='utf-8') as f:
+        f.write("\n".join(pdf_paths))
+    results = process_pdf_batch(manifest, work_dir, grobid_url, force=True, use_cache=False)
+    return sum(1 for r in results if r['status'] == 'ok')
+
+def run_langchain_sequential(pdf_paths, work_dir, grobid_url):
+    from pdf_to_text_grobid_LangChain import extract_pdf_with_grobid_sequential
+    done = 0
+    for pdf in pdf_paths:
+        output = os.path.join(work_dir, os.path.basename(pdf) + ".txt")
+        extract_pdf_with_grobid_sequential(pdf, output, grobid_url, use_cache=False)
+        done += os.path.exists(output)
+    return done
+
+def run_langchain_raw(pdf_paths, work_dir, grobid_url):
+    from pdf_to_text_grobid_LangChain_raw import extract_pdf_raw_langchain
+    done = 0
+    for pdf in pdf_paths:
+        output = os.path.join(work_dir, os.path.basename(pdf) + ".raw.txt")
+        extract_pdf_raw_langchain(pdf, output, grobid_url, use_cache=False)
+        done += os.path.exists(output)
+    return done
+
+def run_tei_emit(pdf_paths, work_dir, grobid_url):
+    from tei_stream import emit_tei
+    for xml_path in fixture_tei_files():
+        emit_tei(xml_path)
+    return len(fixture_tei_files())
+
+PATHS = {
+    'fulltext_single': run_fulltext_single,
+    'fulltext_batch': run_fulltext_batch,
+    'langchain_sequential': run_langchain_sequential,
+    'langchain_raw': run_langchain_raw,
+    'tei_emit': run_tei_emit,
+}
+
+def run_path_in_child(name, pdf_dir, grobid_url):
+    """Child-process entry point: run one path and print its measurements as JSON."""
+    pdf_paths = sorted(os.path.join(pdf_dir, n) for n in os.listdir(pdf_dir) if n.endswith('.pdf'))
+    with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as work_dir:
+        start = time.perf_counter()
+        # The parsers report progress on stdout; keep it out of the measurements
+        with contextlib.redirect_stdout(io.StringIO()):
+            documents = PATHS[name](pdf_paths, work_dir, grobid_url)
+        seconds = time.perf_counter() - start
+    print(json.dumps({'path': name, 'documents': documents, 'seconds': seconds,
+                      'peak_rss_mb': peak_rss_mb()}))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the GROBID parser paths against the offline stub')
+    parser.add_argument('--paths', nargs='+', choices=list(PATHS), default=list(PATHS), help='Paths to run')
+    parser.add_argument('--port', type=int, default=0, help='Stub port (default: any free port)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Stub seconds per document')
+    parser.add_argument('--latency-per-mb', type=float, default=0.0, help='Stub extra seconds per MB of TEI')
+    parser.add_argument('--max-concurrent', type=int, default=10, help='Stub concurrent requests before 503')
+    parser.add_argument('--run-path', help=argparse.SUPPRESS)
+    parser.add_argument('--pdf-dir', help=argparse.SUPPRESS)
+    parser.add_argument('--grobid-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_path:
+        run_path_in_child(args.run_path, args.pdf_dir, args.grobid_url)
+        return
+
+    stub_options = dict(port=args.port, latency=args.latency, latency_per_mb=args.latency_per_mb,
+                        max_concurrent=args.max_concurrent)
+    with tempfile.TemporaryDirectory(prefix="bench_pdfs_") as pdf_dir, running_stub(**stub_options) as stub:
+        pdf_paths = make_placeholder_pdfs(pdf_dir)
+        print(f"📚 {len(pdf_paths)} documents, GROBID stub on {stub.url} "
+              f"(latency {args.latency}s + {args.latency_per_mb}s/MB)")
+
+        # Children must not touch the user's TEI cache
+        env = dict(os.environ, GROBID_TEI_CACHE_DIR=os.path.join(pdf_dir, "tei_cache"))
+        results = []
+        for name in args.paths:
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run-path', name,
+                 '--pdf-dir', pdf_dir, '--grobid-url', stub.url],
+                capture_output=True, text=True, env=env,
+            )
+            if completed.returncode != 0:
+                print(f"❌ {name} failed:\n{completed.stderr[-2000:]}")
+                continue
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    print(f"\n{'Path':<22} | {'Docs':>5} | {'Seconds':>8} | {'Docs/s':>7} | {'Peak RSS (MB)':>13}")
+    print("-" * 67)
+    for r in results:
+        rate = r['documents'] / r['seconds'] if r['seconds'] else 0.0
+        print(f"{r['path']:<22} | {r['documents']:>5} | {r['seconds']:>8.2f} | {rate:>7.2f} | "
+              f"{r['peak_rss_mb']:>13.1f}")
+
+    if any(r['documents'] == 0 for r in results) or len(results) != len(args.paths):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
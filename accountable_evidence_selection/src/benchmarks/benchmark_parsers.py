@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Cross-parser benchmark: throughput and token yield per document.
+
+Runs every parser over a fixture corpus and reports, per document, wall time,
+CPU time (including pandoc subprocesses), peak RSS, output characters and
+o200k_base tokens, then a per-parser summary with tokens per second.
+
+Parsers and their inputs:
+- pypdf2                 pdf_to_text_pyPDF.extract_pdf_to_text        PDFs (--pdf-dir)
+- grobid_langchain       extract_pdf_with_grobid_sequential           PDFs, against the GROBID stub
+- tei_structured         xml_to_structured_txt.extract_and_structure_xml   recorded TEI
+- tei_structured_stream  tei_stream.stream_structured_text            recorded TEI
+- tei_pseudo             pseudo_xml.extract_clean_pseudo_xml          recorded TEI
+- tei_pseudo_stream      tei_stream.stream_pseudo_xml                 recorded TEI
+- pandoc                 doc_to_structured.DocumentConverter (Markdown) DOCX (--docx-dir)
+
+Without --pdf-dir, GROBID+LangChain runs on placeholder PDFs named after the
+recorded TEI (the stub answers by name) and pypdf2 is skipped; pandoc is
+skipped without --docx-dir. Every document is parsed in a fresh subprocess so
+peak RSS is per document; tokens are counted afterwards, outside the timings.
+
+Usage:
+    python benchmark_parsers.py [--pdf-dir DIR] [--docx-dir DIR] [--parsers ...] [--limit N]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import resource
+import subprocess
+import contextlib
+
+from tei_fixtures import fixture_tei_files
+from grobid_stub_server import running_stub
+from benchmark_grobid_pipeline import make_placeholder_pdfs, peak_rss_mb
+
+# Same encoding as analysis/token_calculation.py
+ENCODING_MODEL = "o200k_base"
+
+# Each loader imports its parser and returns parse(input_path, output_path, grobid_url);
+# the import happens before the timed region
+
+def load_pypdf2():
+    from pdf_to_text_pyPDF import extract_pdf_to_text
+    return lambda input_path, output_path, grobid_url: extract_pdf_to_text(input_path, output_path, quiet=True)
+
+def load_grobid_langchain():
+    from pdf_to_text_grobid_LangChain import extract_pdf_with_grobid_sequential
+    return lambda input_path, output_path, grobid_url: extract_pdf_with_grobid_sequential(
+        input_path, output_path, grobid_url, use_cache=False)
+
+def write_text(output_path, text):
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def load_tei_structured():
+    from xml_to_structured_txt import extract_and_structure_xml
+    return lambda input_path, output_path, grobid_url: write_text(output_path, extract_and_structure_xml(input_path))
+
+def load_tei_structured_stream():
+    from tei_stream import stream_structured_text
+    return lambda input_path, output_path, grobid_url: stream_structured_text(input_path, output_path)
+
+def load_tei_pseudo():
+    from pseudo_xml import extract_clean_pseudo_xml
+    return lambda input_path, output_path, grobid_url: write_text(output_path, extract_clean_pseudo_xml(input_path))
+
+def load_tei_pseudo_stream():
+    from tei_stream import stream_pseudo_xml
+    return lambda input_path, output_path, grobid_url: stream_pseudo_xml(input_path, output_path)
+
+def load_pandoc():
+    from doc_to_structured import DocumentConverter
+    def parse(input_path, output_path, grobid_url):
+        markdown_path = DocumentConverter(input_path, os.path.dirname(output_path)).convert_to_markdown()
+        if markdown_path:
+            os.replace(markdown_path, output_path)
+    return parse
+
+# parser name -> (loader, input kind)
+PARSERS = {
+    'pypdf2': (load_pypdf2, 'pdf'),
+    'grobid_langchain': (load_grobid_langchain, 'pdf'),
+    'tei_structured': (load_tei_structured, 'tei'),
+    'tei_structured_stream': (load_tei_structured_stream, 'tei'),
+    'tei_pseudo': (load_tei_pseudo, 'tei'),
+    'tei_pseudo_stream': (load_tei_pseudo_stream, 'tei'),
+    'pandoc': (load_pandoc, 'docx'),
+}
+
+def cpu_seconds():
+    """CPU time of this process and its finished children (pandoc)."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def run_parser_in_child(name, input_path, output_path, grobid_url):
+    """Child-process entry point: parse one document and print the measurements as JSON."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        parse = PARSERS[name][0]()
+        cpu_start, wall_start = cpu_seconds(), time.perf_counter()
+        parse(input_path, output_path, grobid_url)
+    wall = time.perf_counter() - wall_start
+    cpu = cpu_seconds() - cpu_start
+    print(json.dumps({'wall': wall, 'cpu': cpu, 'peak_rss_mb': peak_rss_mb()}))
+
+def load_encoder():
+    """tiktoken encoder, or None when the encoding cannot be loaded (e.g. offline)."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(ENCODING_MODEL)
+    except Exception as e:
+        print(f"⚠️  {ENCODING_MODEL} unavailable, tokens not reported: {str(e).splitlines()[0][:120]}")
+        return None
+
+def corpus_inputs(pdf_dir, docx_dir, placeholder_dir):
+    """Input documents for each input kind."""
+    if pdf_dir:
+        pdfs = sorted(os.path.join(pdf_dir, n) for n in os.listdir(pdf_dir) if n.lower().endswith('.pdf'))
+    else:
+        pdfs = make_placeholder_pdfs(placeholder_dir)
+    docx = []
+    if docx_dir:
+        docx = sorted(os.path.join(docx_dir, n) for n in os.listdir(docx_dir)
+                      if n.lower().endswith('.docx') and not n.startswith('~$'))
+    return {'pdf': pdfs, 'tei': fixture_tei_files(), 'docx': docx}
+
+def short_name(path, width=34):
+    name = os.path.basename(path)
+    return name if len(name) <= width else name[:width - 1] + "…"
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every parser on a fixture corpus')
+    parser.add_argument('--pdf-dir', help='Real PDFs (enables pypdf2; GROBID otherwise uses placeholders)')
+    parser.add_argument('--docx-dir', help='DOCX guidelines (enables pandoc)')
+    parser.add_argument('--parsers', nargs='+', choices=list(PARSERS), default=list(PARSERS),
+                        help='Parsers to run')
+    parser.add_argument('--limit', type=int, help='At most N documents per parser')
+    parser.add_argument('--json', dest='json_path', help='Also write the per-document rows to this file')
+    parser.add_argument('--run-parser', nargs=4, metavar=('NAME', 'INPUT', 'OUTPUT', 'URL'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_parser:
+        run_parser_in_child(*args.run_parser)
+        return
+
+    encoder = load_encoder()
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="bench_parsers_") as work_dir, running_stub(port=0) as stub:
+        inputs = corpus_inputs(args.pdf_dir, args.docx_dir, work_dir)
+        env = dict(os.environ, GROBID_TEI_CACHE_DIR=os.path.join(work_dir, "tei_cache"))
+
+        for name in args.parsers:
+            kind = PARSERS[name][1]
+            if name == 'pypdf2' and not args.pdf_dir:
+                print(f"⏭️  {name}: needs --pdf-dir (real PDFs)")
+                continue
+            documents = inputs[kind][:args.limit]
+            if not documents:
+                print(f"⏭️  {name}: no {kind} inputs")
+                continue
+            print(f"🔄 {name}: {len(documents)} documents")
+
+            for index, input_path in enumerate(documents):
+                output_path = os.path.join(work_dir, name, f"{index:04d}.txt")
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                completed = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--run-parser',
+                     name, input_path, output_path, stub.url],
+                    capture_output=True, text=True, env=env,
+                )
+                if completed.returncode != 0 or not os.path.exists(output_path):
+                    print(f"   ❌ {os.path.basename(input_path)}: {completed.stderr.strip()[-300:] or 'no output'}")
+                    continue
+
+                row = json.loads(completed.stdout.strip().splitlines()[-1])
+                with open(output_path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                row.update(parser=name, document=input_path, chars=len(text),
+                           tokens=len(encoder.encode(text, disallowed_special=())) if encoder else None)
+                rows.append(row)
+
+    print(f"\n{'Parser':<22} | {'Document':<34} | {'Wall s':>7} | {'CPU s':>6} | {'RSS MB':>7} | "
+          f"{'Chars':>9} | {'Tokens':>8} | {'Tok/s':>9}")
+    print("-" * 121)
+    for r in rows:
+        tokens = f"{r['tokens']:>8}" if r['tokens'] is not None else f"{'n/a':>8}"
+        rate = f"{r['tokens'] / r['wall']:>9.0f}" if r['tokens'] is not None and r['wall'] else f"{'n/a':>9}"
+        print(f"{r['parser']:<22} | {short_name(r['document']):<34} | {r['wall']:>7.2f} | {r['cpu']:>6.2f} | "
+              f"{r['peak_rss_mb']:>7.1f} | {r['chars']:>9} | {tokens} | {rate}")
+
+    print(f"\n{'Parser':<22} | {'Docs':>5} | {'Wall s':>7} | {'CPU s':>6} | {'Max RSS MB':>10} | "
+          f"{'Chars':>10} | {'Tokens':>9} | {'Tok/s':>9}")
+    print("-" * 99)
+    for name in args.parsers:
+        parser_rows = [r for r in rows if r['parser'] == name]
+        if not parser_rows:
+            continue
+        wall = sum(r['wall'] for r in parser_rows)
+        cpu = sum(r['cpu'] for r in parser_rows)
+        chars = sum(r['chars'] for r in parser_rows)
+        if encoder:
+            tokens = sum(r['tokens'] for r in parser_rows)
+            token_cols = f"{tokens:>9} | {tokens / wall if wall else 0:>9.0f}"
+        else:
+            token_cols = f"{'n/a':>9} | {'n/a':>9}"
+        print(f"{name:<22} | {len(parser_rows):>5} | {wall:>7.2f} | {cpu:>6.2f} | "
+              f"{max(r['peak_rss_mb'] for r in parser_rows):>10.1f} | {chars:>10} | {token_cols}")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n📄 Rows saved to: {args.json_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: SectionClassifier vs the per-fragment classification functions.
+
+Runs both over the sentence fragments of every TEI file in results/grobid_xml,
+checks that they agree on every fragment, and reports the speedup for all
+fragments and for the untitled ones, which go through the table/figure checks.
+
+Usage:
+    python benchmark_section_classifier.py [--repeat 5]
+"""
+
+import time
+import argparse
+
+from tei_fixtures import fixture_tei_files, tei_fragments
+
+from pdf_to_text_grobid_LangChain import determine_section_type, should_include_content
+from section_classifier import SectionClassifier
+
+def classify_reference(fragments):
+    """Classification as done by process_sequential_sections before SectionClassifier."""
+    results = []
+    for metadata, content in fragments:
+        section_type = determine_section_type(metadata, content)
+        include = section_type == 'paragraph' or should_include_content(section_type, content)
+        results.append((section_type, include))
+    return results
+
+def classify_compiled(fragments):
+    return [tuple(c) for c in SectionClassifier().classify(fragments)]
+
+def best_time(fn, fragments, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(fragments)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark fragment classification')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions (best is reported)')
+    args = parser.parse_args()
+
+    fragments = []
+    for xml_path in fixture_tei_files():
+        for fragment in tei_fragments(xml_path):
+            # process_sequential_sections classifies stripped content
+            content = fragment['page_content'].strip()
+            if content:
+                fragments.append((fragment['metadata'], content))
+
+    reference = classify_reference(fragments)
+    compiled = classify_compiled(fragments)
+    mismatches = sum(1 for a, b in zip(reference, compiled) if a != b)
+
+    counts = {}
+    for section_type, _ in compiled:
+        counts[section_type] = counts.get(section_type, 0) + 1
+
+    untitled = [(m, c) for m, c in fragments if m.get('section_title', 'None') in ('', 'None')]
+
+    print(f"Fragments: {len(fragments)} from {len(fixture_tei_files())} TEI files")
+    print(f"Types: {', '.join(f'{k}={v}' for k, v in sorted(counts.items()))}")
+    print(f"Mismatches: {mismatches}")
+
+    for label, subset in (('all fragments', fragments), ('untitled fragments', untitled)):
+        reference_time = best_time(classify_reference, subset, args.repeat)
+        compiled_time = best_time(classify_compiled, subset, args.repeat)
+        print(f"\n{label} ({len(subset)})")
+        print(f"{'Implementation':<28} | {'Best time (ms)':>14} | {'Fragments/s':>12}")
+        print("-" * 62)
+        for name, elapsed in (('per-fragment functions', reference_time), ('SectionClassifier', compiled_time)):
+            print(f"{name:<28} | {elapsed * 1000:>14.2f} | {len(subset) / elapsed:>12.0f}")
+        print(f"Speedup: {reference_time / compiled_time:.1f}x")
+
+    if mismatches:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for a GROBID server, backed by the recorded TEI files.
+
+Serves the endpoints the parsing scripts use:
+- GET  /api/isalive                  -> "true"
+- GET  /api/version                  -> "stub"
+- POST /api/processFulltextDocument  -> recorded TEI for the uploaded PDF
+
+The uploaded PDF is matched to results/grobid_xml/**/<name>.grobid.tei.xml by
+file name; unknown PDFs get a recorded TEI chosen from a hash of their bytes,
+so any PDF works. When the request asks for segmentSentences=1 (LangChain's
+GrobidParser does) sentences are wrapped in <s coords=...> as GROBID would.
+
+Latency is configurable (fixed + per MB of TEI + random jitter), and requests
+beyond --max-concurrent get HTTP 503 like a saturated GROBID.
+
+Usage:
+    python grobid_stub_server.py [--port 8070] [--latency 0.5] [--max-concurrent 10]
+"""
+
+import os
+import time
+import random
+import hashlib
+import argparse
+import threading
+import email.policy
+from email.parser import BytesParser
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tei_fixtures import GROBID_XML_DIR, fixture_tei_files, segment_tei
+
+DEFAULT_PORT = 8070
+FULLTEXT_SERVICE = "processFulltextDocument"
+
+class RecordedTEI:
+    """Recorded TEI files indexed by PDF name, loaded and segmented on demand."""
+
+    def __init__(self, tei_dir=GROBID_XML_DIR):
+        self.paths = {}
+        for path in fixture_tei_files(tei_dir):
+            name = os.path.basename(path)
+            for suffix in ('.grobid.tei.xml', '.tei.xml', '.xml'):
+                if name.endswith(suffix):
+                    name = name[:-len(suffix)]
+                    break
+            self.paths[name] = path
+        if not self.paths:
+            raise FileNotFoundError(f"No recorded TEI files in {tei_dir}")
+        self._names = sorted(self.paths)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def name_for(self, filename, pdf_bytes):
+        """Recorded document served for an uploaded PDF."""
+        stem = os.path.splitext(os.path.basename(filename or ""))[0]
+        if stem in self.paths:
+            return stem
+        digest = hashlib.sha256(pdf_bytes).digest()
+        return self._names[int.from_bytes(digest[:4], 'big') % len(self._names)]
+
+    def get(self, name, segmented):
+        """TEI bytes for a recorded document (with <s> sentences if segmented)."""
+        key = (name, segmented)
+        with self._lock:
+            if key not in self._cache:
+                with open(self.paths[name], 'rb') as f:
+                    tei = f.read()
+                self._cache[key] = segment_tei(tei) if segmented else tei
+            return self._cache[key]
+
+def parse_multipart(content_type, body):
+    """
+    Split a multipart/form-data body into fields and the uploaded file.
+
+    Returns:
+        tuple: (fields dict of name -> list of values, filename, file bytes)
+    """
+    message = BytesParser(policy=email.policy.HTTP).parsebytes(
+        b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+    fields, filename, payload = {}, None, b''
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        data = part.get_payload(decode=True) or b''
+        if name == 'input':
+            filename, payload = part.get_filename(), data
+        else:
+            fields.setdefault(name, []).append(data.decode('utf-8', 'replace'))
+    return fields, filename, payload
+
+class GrobidStubHandler(BaseHTTPRequestHandler):
+    """Request handler; configuration lives on the server object."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status, body, content_type='text/plain'):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/api/isalive':
+            self._reply(200, 'true')
+        elif path == '/api/version':
+            self._reply(200, 'stub')
+        elif path == f'/api/{FULLTEXT_SERVICE}':
+            # GrobidParser.__init__ probes the service URL with a GET
+            self._reply(405, 'Method Not Allowed')
+        else:
+            self._reply(404, 'Not Found')
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.split('?', 1)[0] != f'/api/{FULLTEXT_SERVICE}':
+            self._reply(404, 'Not Found')
+            return
+
+        server = self.server
+        if not server.slots.acquire(blocking=False):
+            self._reply(503, 'All GROBID workers are busy')
+            return
+        try:
+            fields, filename, pdf_bytes = parse_multipart(self.headers.get('Content-Type', ''), body)
+            if not pdf_bytes:
+                self._reply(400, 'Missing input PDF')
+                return
+            segmented = fields.get('segmentSentences', ['0'])[0] == '1'
+            tei = server.recorded.get(server.recorded.name_for(filename, pdf_bytes), segmented)
+            time.sleep(server.delay_for(len(tei)))
+            with server.stats_lock:
+                server.served += 1
+            self._reply(200, tei, 'application/xml')
+        finally:
+            server.slots.release()
+
+class GrobidStubServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering like GROBID from recorded TEI."""
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, tei_dir=GROBID_XML_DIR, latency=0.0,
+                 latency_per_mb=0.0, jitter=0.0, max_concurrent=10, seed=0, verbose=False):
+        super().__init__((host, port), GrobidStubHandler)
+        self.recorded = RecordedTEI(tei_dir)
+        self.latency = latency
+        self.latency_per_mb = latency_per_mb
+        self.jitter = jitter
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.verbose = verbose
+        self.served = 0
+        self.stats_lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay_for(self, tei_bytes):
+        """Simulated processing time for a response of tei_bytes bytes."""
+        with self.stats_lock:
+            noise = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        return self.latency + self.latency_per_mb * tei_bytes / 1e6 + noise
+
+@contextmanager
+def running_stub(**kwargs):
+    """
+    Run a GrobidStubServer in a background thread for the duration of a block.
+
+    Yields:
+        GrobidStubServer: The running server (see its `url`)
+    """
+    server = GrobidStubServer(**kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline GROBID stand-in serving recorded TEI')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port (GROBID uses 8070)')
+    parser.add_argument('--tei-dir', default=GROBID_XML_DIR, help='Directory of recorded TEI files')
+    parser.add_argument('--latency', type=float, default=0.0, help='Fixed seconds per document')
+    parser.add_argument('--latency-per-mb', type=float, default=0.0, help='Extra seconds per MB of TEI')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random extra seconds (uniform 0..jitter)')
+    parser.add_argument('--max-concurrent', type=int, default=10,
+                        help='Requests processed at once; more get HTTP 503')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    server = GrobidStubServer(args.host, args.port, args.tei_dir, args.latency, args.latency_per_mb,
+                              args.jitter, args.max_concurrent, verbose=args.verbose)
+    print(f"✅ GROBID stub serving {len(server.recorded.paths)} recorded documents on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n📈 Served {server.served} documents")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Fixture helpers for the parsing benchmarks.
+
+The recorded GROBID TEI files in results/grobid_xml are the benchmark corpus.
+They were produced without sentence coordinates, so LangChain's GrobidParser
+would return no fragments for them; `tei_fragments` rebuilds the fragments
+GrobidParser(segment_sentences=True) would emit (one per sentence, same
+metadata keys and string formats) so the downstream code can be measured on
+real guideline text.
+"""
+
+import os
+import re
+import sys
+import glob
+
+from lxml import etree as ET
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+RESULTS_DIR = os.path.join(SRC_DIR, "..", "results")
+GROBID_XML_DIR = os.path.join(RESULTS_DIR, "grobid_xml")
+
+# The parsing scripts import each other by module name
+sys.path.insert(0, os.path.join(SRC_DIR, "parsing"))
+
+TEI = '{http://www.tei-c.org/ns/1.0}'
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9])')
+# Page advances every few paragraphs, roughly like a two-column guideline
+PARAGRAPHS_PER_PAGE = 4
+
+def fixture_tei_files(input_dir=GROBID_XML_DIR):
+    """All recorded TEI files, in a stable order."""
+    return sorted(glob.glob(os.path.join(input_dir, '**', '*.xml'), recursive=True))
+
+def _fragment(text, para, page, section_title, section_number, paper_title, file_path):
+    return {
+        'page_content': text,
+        'metadata': {
+            'text': text,
+            'para': str(para),
+            'bboxes': '[]',
+            'pages': str((str(page), str(page))),
+            'section_title': str(section_title),
+            'section_number': str(section_number),
+            'paper_title': paper_title,
+            'file_path': file_path,
+        },
+    }
+
+def tei_fragments(xml_path):
+    """
+    Sentence fragments shaped like GrobidParser(segment_sentences=True) output.
+
+    Besides body paragraphs, figure captions and table rows are emitted with a
+    'None' section title (what GrobidParser reports for a head without text),
+    so the table/figure classification paths are exercised as well.
+
+    Returns:
+        list: dicts with 'page_content' and 'metadata'
+    """
+    root = ET.parse(xml_path, ET.XMLParser(recover=True, huge_tree=True)).getroot()
+    title_element = root.find(f'.//{TEI}titleStmt/{TEI}title')
+    paper_title = (title_element.text or "No title found") if title_element is not None else "No title found"
+
+    fragments = []
+    paragraph_count = 0
+    for div in root.iter(f'{TEI}div'):
+        head = div.find(f'{TEI}head')
+        if head is None:
+            continue
+        for paragraph in div.findall(f'{TEI}p'):
+            page = 1 + paragraph_count // PARAGRAPHS_PER_PAGE
+            paragraph_count += 1
+            sentences = [''.join(s.itertext()) for s in paragraph.iter(f'{TEI}s')]
+            if not sentences:
+                sentences = SENTENCE_END.split(''.join(paragraph.itertext()).strip())
+            for i, sentence in enumerate(sentences):
+                if sentence.strip():
+                    fragments.append(_fragment(sentence, i, page, head.text, head.get('n'),
+                                               paper_title, xml_path))
+
+    for figure in root.iter(f'{TEI}figure'):
+        page = 1 + paragraph_count // PARAGRAPHS_PER_PAGE
+        caption = ' '.join(''.join(el.itertext()) for el in figure
+                           if el.tag in (f'{TEI}head', f'{TEI}label', f'{TEI}figDesc'))
+        if caption.strip():
+            fragments.append(_fragment(caption, 0, page, None, None, paper_title, xml_path))
+        rows = [' | '.join(''.join(cell.itertext()).strip() for cell in row.iter(f'{TEI}cell'))
+                for row in figure.iter(f'{TEI}row')]
+        if rows:
+            fragments.append(_fragment('\n'.join(rows), 1, page, None, None, paper_title, xml_path))
+
+    return fragments
+
+def segment_tei(xml_bytes):
+    """
+    Add the sentence markup GROBID returns for segmentSentences=1.
+
+    Each body paragraph under a titled div is split into <s> elements carrying
+    a 'coords' attribute, with the same sentence split and page numbering as
+    `tei_fragments`. LangChain's GrobidParser only emits sentences that have
+    coordinates, so this is what makes the recorded TEI usable for it.
+
+    Args:
+        xml_bytes (bytes): Recorded TEI
+
+    Returns:
+        bytes: TEI with <s coords="page,x,y,h,w"> sentences
+    """
+    root = ET.fromstring(xml_bytes, ET.XMLParser(recover=True, huge_tree=True))
+    paragraph_count = 0
+    for div in root.iter(f'{TEI}div'):
+        if div.find(f'{TEI}head') is None:
+            continue
+        for paragraph in div.findall(f'{TEI}p'):
+            page = 1 + paragraph_count // PARAGRAPHS_PER_PAGE
+            paragraph_count += 1
+            if paragraph.find(f'.//{TEI}s') is not None:
+                continue
+            text = ''.join(paragraph.itertext()).strip()
+            attrib, tail = dict(paragraph.attrib), paragraph.tail
+            paragraph.clear()
+            paragraph.attrib.update(attrib)
+            paragraph.tail = tail
+            for i, sentence in enumerate(s for s in SENTENCE_END.split(text) if s.strip()):
+                element = ET.SubElement(paragraph, f'{TEI}s')
+                element.set('coords', f'{page},72.00,{100 + 12 * i}.00,400.00,10.00')
+                element.text = sentence
+    return ET.tostring(root, encoding='utf-8', xml_declaration=True)
+
+def tei_documents(xml_path):
+    """`tei_fragments` as LangChain Documents."""
+    from langchain_core.documents import Document
+    return [Document(page_content=f['page_content'], metadata=f['metadata'])
+            for f in tei_fragments(xml_path)]
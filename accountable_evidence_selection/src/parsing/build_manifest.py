@@ -0,0 +1,142 @@
+"""
+Build manifest for incremental parsing runs.
+
+For every generated file the manifest records which input it was built from
+(SHA-256, size and mtime), which parser produced it and with which options.
+An output is current when the file still exists and all of those match, so a
+corpus rebuild only re-runs the parsers for new or changed guidelines.
+
+The manifest is a JSON file; output paths are stored relative to the folder
+that contains it, so results/ can be moved or checked out elsewhere. Deleting
+the manifest simply makes the next run rebuild everything.
+"""
+
+import os
+import json
+import threading
+
+from tei_cache import file_sha256
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "results")
+MANIFEST_FILE = os.path.join(RESULTS_DIR, "parsing_manifest.json")
+MANIFEST_FORMAT = 1
+
+# Bump a parser's version whenever a change alters its output, so every file
+# it produced is rebuilt on the next incremental run
+PARSER_VERSIONS = {
+    'grobid_fulltext': 1,       # pdf_to_text_grobid_fulltext -> results/grobid_xml
+    'tei_structured': 1,        # xml_to_structured_txt / tei_stream -> results/xml_to_txt_output
+    'tei_pseudo': 1,            # pseudo_xml / tei_stream -> results/pseudo_xml
+    'grobid_sequential': 1,     # pdf_to_text_grobid_LangChain
+    'pandoc': 1,                # doc_to_structured.DocumentConverter
+}
+
+class BuildManifest:
+    """Input/parser/options record of every generated output file."""
+
+    def __init__(self, manifest_path=MANIFEST_FILE):
+        self.manifest_path = manifest_path
+        self.root_dir = os.path.dirname(os.path.abspath(manifest_path))
+        self.entries = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') == MANIFEST_FORMAT:
+                self.entries = data.get('outputs', {})
+        # Input hashes computed during this run, keyed by (path, size, mtime)
+        self._input_hashes = {}
+        # Parsers may record outputs from several worker threads
+        self._lock = threading.Lock()
+
+    def _key(self, output_path):
+        """Manifest key of an output: its path relative to the manifest folder."""
+        return os.path.relpath(os.path.abspath(output_path), self.root_dir).replace(os.sep, '/')
+
+    def input_fingerprint(self, input_path, entry=None):
+        """
+        Describe an input file by size, mtime and SHA-256.
+
+        The hash is only recomputed when size or mtime differ from `entry`, so
+        checking an unchanged corpus costs one stat() per file.
+
+        Returns:
+            dict: 'sha256', 'size' and 'mtime_ns'
+        """
+        stat = os.stat(input_path)
+        if entry and entry.get('input_size') == stat.st_size and entry.get('input_mtime_ns') == stat.st_mtime_ns:
+            sha256 = entry['input_sha256']
+        else:
+            file_id = (os.path.abspath(input_path), stat.st_size, stat.st_mtime_ns)
+            if file_id not in self._input_hashes:
+                self._input_hashes[file_id] = file_sha256(input_path)
+            sha256 = self._input_hashes[file_id]
+        return {'sha256': sha256, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def is_current(self, output_path, input_path, parser, options=None):
+        """
+        Check whether an output is up to date.
+
+        Args:
+            output_path (str): Generated file
+            input_path (str): File it is built from
+            parser (str): Parser name (a key of PARSER_VERSIONS)
+            options (dict): Parser options that affect the output
+
+        Returns:
+            bool: True if the output exists and was built from the same input
+                bytes with the same parser version and options
+        """
+        entry = self.entries.get(self._key(output_path))
+        if entry is None or not os.path.exists(output_path) or not os.path.exists(input_path):
+            return False
+        if (entry.get('parser') != parser
+                or entry.get('parser_version') != PARSER_VERSIONS[parser]
+                or entry.get('options') != (options or {})):
+            return False
+        fingerprint = self.input_fingerprint(input_path, entry)
+        if fingerprint['sha256'] != entry['input_sha256']:
+            return False
+        # Same bytes under a new mtime (copy, checkout): remember the new stat
+        # so later runs take the stat() fast path again
+        entry['input_size'] = fingerprint['size']
+        entry['input_mtime_ns'] = fingerprint['mtime_ns']
+        return True
+
+    def record(self, output_path, input_path, parser, options=None):
+        """Record that output_path was just built from input_path."""
+        key = self._key(output_path)
+        fingerprint = self.input_fingerprint(input_path, self.entries.get(key))
+        entry = {
+            'input': os.path.relpath(os.path.abspath(input_path), self.root_dir).replace(os.sep, '/'),
+            'input_sha256': fingerprint['sha256'],
+            'input_size': fingerprint['size'],
+            'input_mtime_ns': fingerprint['mtime_ns'],
+            'parser': parser,
+            'parser_version': PARSER_VERSIONS[parser],
+            'options': options or {},
+        }
+        with self._lock:
+            self.entries[key] = entry
+
+    def prune(self):
+        """
+        Drop entries whose output file no longer exists.
+
+        Returns:
+            int: Number of entries removed
+        """
+        missing = [key for key in self.entries
+                   if not os.path.exists(os.path.join(self.root_dir, key))]
+        for key in missing:
+            del self.entries[key]
+        return len(missing)
+
+    def save(self):
+        """Write the manifest (write then rename, so it is never left truncated)."""
+        os.makedirs(self.root_dir, exist_ok=True)
+        partial_path = f"{self.manifest_path}.{os.getpid()}.part"
+        with self._lock:
+            with open(partial_path, 'w', encoding='utf-8') as f:
+                json.dump({'format': MANIFEST_FORMAT, 'outputs': self.entries}, f,
+                          indent=2, sort_keys=True, ensure_ascii=False)
+            os.replace(partial_path, self.manifest_path)
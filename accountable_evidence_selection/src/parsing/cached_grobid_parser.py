@@ -0,0 +1,82 @@
+"""
+LangChain GrobidParser backed by the shared TEI cache (see tei_cache.py).
+"""
+
+import logging
+
+import requests
+from langchain_community.document_loaders.parsers import GrobidParser
+
+from tei_cache import TEICache, LANGCHAIN_TEI_OPTIONS
+from grobid_paragraphs import iter_grobid_paragraphs
+
+logger = logging.getLogger(__name__)
+
+GROBID_SERVICE = "processFulltextDocument"
+
+class CachedGrobidParser(GrobidParser):
+    """
+    Drop-in replacement for GrobidParser that serves TEI from the cache.
+
+    The request sent on a cache miss is the same one GrobidParser sends, so the
+    Documents produced by `process_xml` are identical either way.
+    """
+
+    def __init__(self, segment_sentences, grobid_url="http://localhost:8070", cache=None):
+        # GrobidParser.__init__ probes the server; skip it so a warm cache
+        # works while GROBID is offline
+        self.segment_sentences = segment_sentences
+        self.grobid_server = f"{grobid_url}/api/{GROBID_SERVICE}"
+        self.cache = cache if cache is not None else TEICache()
+
+    def is_cached(self, pdf_path):
+        """Check whether the TEI for a PDF is already in the cache."""
+        return self.cache.has(pdf_path, GROBID_SERVICE, LANGCHAIN_TEI_OPTIONS)
+
+    def _request_tei(self, file_path):
+        with open(file_path, 'rb') as pdf:
+            files = {"input": (file_path, pdf, "application/pdf", {"Expires": "0"})}
+            response = requests.post(self.grobid_server, files=files,
+                                     data=LANGCHAIN_TEI_OPTIONS, timeout=60)
+        response.raise_for_status()
+        return response.text
+
+    def _fetch_tei(self, file_path):
+        xml_data, cache_hit = self.cache.fetch(
+            file_path, GROBID_SERVICE, LANGCHAIN_TEI_OPTIONS,
+            lambda: self._request_tei(file_path),
+        )
+        if cache_hit:
+            logger.info("TEI cache hit for %s", file_path)
+        return xml_data
+
+    def parse_paragraphs(self, file_path):
+        """
+        Paragraph-granularity alternative to lazy_parse.
+
+        Sends the same request (so the TEI cache entry is shared) but yields
+        one GrobidParagraph per paragraph, with sentence offsets, instead of
+        one Document per sentence.
+
+        Returns:
+            iterator: GrobidParagraph records in document order
+        """
+        try:
+            xml_data = self._fetch_tei(file_path)
+        except requests.exceptions.ReadTimeout:
+            logger.error("GROBID server timed out. Return None.")
+            return iter([])
+        return iter_grobid_paragraphs(xml_data, file_path)
+
+    def lazy_parse(self, blob):
+        file_path = blob.source
+        if file_path is None:
+            raise ValueError("blob.source cannot be None.")
+
+        try:
+            xml_data = self._fetch_tei(file_path)
+        except requests.exceptions.ReadTimeout:
+            logger.error("GROBID server timed out. Return None.")
+            return iter([])
+
+        return self.process_xml(file_path, xml_data, self.segment_sentences)
@@ -7,21 +7,56 @@ This is much more accurate than PDF conversion for clinical guidelines.
 
 import subprocess
 import os
+import json
+import tempfile
+import threading
 import xml.etree.ElementTree as ET
 from pathlib import Path
 import argparse
 from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+from build_manifest import BuildManifest
+
+# Manifest written next to the outputs by --incremental
+MANIFEST_NAME = "parsing_manifest.json"
+
+OUTPUT_FORMATS = ('markdown', 'xml', 'html')
+WORD_SUFFIXES = ('.docx', '.doc')
+
+# Where the Markdown output's images are extracted (and referenced from)
+MARKDOWN_MEDIA_DIR = './media'
 
 class DocumentConverter:
-    def __init__(self, input_path: str, output_dir: str = None):
+    def __init__(self, input_path: str, output_dir: str = None, manifest: BuildManifest = None):
         self.input_path = input_path
         self.output_dir = output_dir or os.path.dirname(input_path)
         self.base_name = Path(input_path).stem
+        # Optional build manifest: conversions whose output is current are skipped
+        self.manifest = manifest
+        # Pandoc JSON ASTs by media directory (None: no media extracted),
+        # decoded once and shared by the output formats that need them
+        self._asts = {}
+        self._ast_lock = threading.Lock()
         
         # Ensure output directory exists
         os.makedirs(self.output_dir, exist_ok=True)
+    
+    def _is_current(self, output_path: str, options: Dict) -> bool:
+        """Check the build manifest for an up-to-date output."""
+        if self.manifest is None or not self.manifest.is_current(output_path, self.input_path, 'pandoc', options):
+            return False
+        print(f"⏭️  {output_path} is up to date")
+        return True
+    
+    def _record(self, output_path: str, options: Dict):
+        """Record a finished conversion in the build manifest."""
+        if self.manifest is not None:
+            self.manifest.record(output_path, self.input_path, 'pandoc', options)
+            self.manifest.save()
         
-    def check_pandoc(self) -> bool:
+    @staticmethod
+    def check_pandoc() -> bool:
         """Check if Pandoc is installed and accessible."""
         try:
             result = subprocess.run(['pandoc', '--version'], 
@@ -37,6 +72,85 @@ class DocumentConverter:
             print("📥 Install with: brew install pandoc")
             return False
 
+    def _reader_format(self) -> str:
+        return 'docx' if self.input_path.endswith('.docx') else 'doc'
+    
+    def decode_ast(self, media_dir: str = None) -> str:
+        """
+        Decode the DOC/DOCX into Pandoc's JSON AST, once per media directory.
+        
+        Output formats are rendered from this AST, so the Word file is read
+        and parsed once for all formats that share a media setting.
+        
+        Args:
+            media_dir: Extract images/media there and reference them from the
+                AST; None extracts nothing (image paths stay as in the document)
+        
+        Returns:
+            str: The JSON AST, or None if Pandoc failed
+        """
+        with self._ast_lock:
+            if media_dir not in self._asts:
+                print(f"🔄 Decoding {self.input_path} to the Pandoc AST...")
+                command = ['pandoc', '-f', self._reader_format(), '-t', 'json']
+                if media_dir is not None:
+                    command.append(f'--extract-media={media_dir}')  # Extract images/media
+                command.append(self.input_path)
+                try:
+                    result = subprocess.run(command, check=True, capture_output=True, text=True)
+                    self._asts[media_dir] = result.stdout
+                except subprocess.CalledProcessError as e:
+                    print(f"❌ Error while decoding the document:")
+                    print(f"   Error: {e.stderr}")
+                    return None
+                except FileNotFoundError:
+                    print("❌ Pandoc not found. Please install it first.")
+                    return None
+            return self._asts[media_dir]
+    
+    def _render(self, label: str, writer_args: List[str], output_path: str, options: Dict,
+                untitled_args: List[str] = None, media_dir: str = None) -> str:
+        """
+        Render one output format from the decoded AST.
+        
+        Args:
+            label: Format name used in messages
+            writer_args: Pandoc writer arguments ('-t', format and options)
+            output_path: Output file
+            options: Options recorded in the build manifest
+            untitled_args: Extra writer arguments for documents without a title
+            media_dir: Media directory of the AST to render from (see decode_ast)
+        
+        Returns:
+            str: output_path, or None on failure
+        """
+        if self._is_current(output_path, options):
+            return output_path
+        
+        ast = self.decode_ast(media_dir)
+        if ast is None:
+            return None
+        
+        if untitled_args and 'title' not in json.loads(ast)['meta']:
+            writer_args = writer_args + untitled_args
+        
+        print(f"🔄 Rendering {label} from the AST...")
+        command = ['pandoc', '-f', 'json'] + writer_args + ['-o', output_path]
+        try:
+            subprocess.run(command, input=ast, check=True, capture_output=True, text=True)
+            print(f"✅ {label} conversion successful!")
+            print(f"📄 Output saved to: {output_path}")
+            self._record(output_path, options)
+            return output_path
+            
+        except subprocess.CalledProcessError as e:
+            print(f"❌ Error during {label} conversion:")
+            print(f"   Error: {e.stderr}")
+            return None
+        except FileNotFoundError:
+            print("❌ Pandoc not found. Please install it first.")
+            return None
+
     def convert_to_markdown(self, preserve_structure: bool = True) -> str:
         """
         Convert DOC/DOCX to Markdown using Pandoc.
@@ -45,21 +159,16 @@ class DocumentConverter:
             preserve_structure: If True, uses advanced Pandoc options for better structure preservation
         """
         output_path = os.path.join(self.output_dir, f"{self.base_name}_structured.md")
+        options = {'format': 'markdown', 'preserve_structure': preserve_structure}
         
-        print(f"🔄 Converting {self.input_path} to Markdown...")
-        
-        # Base Pandoc command
-        command = [
-            'pandoc',
-            '-f', 'docx' if self.input_path.endswith('.docx') else 'doc',
+        writer_args = [
             '-t', 'markdown',
             '--wrap=none',  # Prevent line wrapping
-            '--extract-media=./media',  # Extract images/media
         ]
         
         if preserve_structure:
             # Advanced options for better structure preservation
-            command.extend([
+            writer_args.extend([
                 '--standalone',  # Include document metadata
                 '--toc',  # Generate table of contents
                 '--toc-depth=3',  # Include up to 3 levels of headings
@@ -68,21 +177,7 @@ class DocumentConverter:
                 '--preserve-tabs',  # Preserve tab characters
             ])
         
-        command.extend([self.input_path, '-o', output_path])
-        
-        try:
-            result = subprocess.run(command, check=True, capture_output=True, text=True)
-            print(f"✅ Markdown conversion successful!")
-            print(f"📄 Output saved to: {output_path}")
-            return output_path
-            
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Error during Pandoc conversion:")
-            print(f"   Error: {e.stderr}")
-            return None
-        except FileNotFoundError:
-            print("❌ Pandoc not found. Please install it first.")
-            return None
+        return self._render('Markdown', writer_args, output_path, options, media_dir=MARKDOWN_MEDIA_DIR)
 
     def convert_to_xml(self) -> str:
         """
@@ -90,63 +185,143 @@ class DocumentConverter:
         This creates a more detailed XML structure than Markdown.
         """
         output_path = os.path.join(self.output_dir, f"{self.base_name}_structured.xml")
+        options = {'format': 'jats'}
         
-        print(f"🔄 Converting {self.input_path} to XML...")
-        
-        command = [
-            'pandoc',
-            '-f', 'docx' if self.input_path.endswith('.docx') else 'doc',
+        writer_args = [
             '-t', 'jats',  # Journal Article Tag Suite - good for academic documents
             '--standalone',
             '--toc',
             '--toc-depth=4',
-            self.input_path,
-            '-o', output_path
         ]
         
-        try:
-            result = subprocess.run(command, check=True, capture_output=True, text=True)
-            print(f"✅ XML conversion successful!")
-            print(f"📄 Output saved to: {output_path}")
-            return output_path
-            
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Error during XML conversion:")
-            print(f"   Error: {e.stderr}")
-            return None
+        return self._render('XML', writer_args, output_path, options)
 
-    def convert_to_html(self) -> str:
+    def convert_to_html(self, media_dir: str = None) -> str:
         """
         Convert DOC/DOCX to HTML with embedded CSS for structure.
         Useful for visual inspection of structure preservation.
+        
+        Images are embedded, so they only need to be on disk while rendering:
+        media_dir reuses an AST whose media are already extracted (the
+        Markdown one); otherwise they go to a temporary directory.
         """
         output_path = os.path.join(self.output_dir, f"{self.base_name}_structured.html")
+        options = {'format': 'html5'}
         
-        print(f"🔄 Converting {self.input_path} to HTML...")
-        
-        command = [
-            'pandoc',
-            '-f', 'docx' if self.input_path.endswith('.docx') else 'doc',
+        writer_args = [
             '-t', 'html5',
             '--standalone',
             '--toc',
             '--toc-depth=4',
             '--css=style.css',  # Reference to CSS file
             '--embed-resources',  # Embed images and CSS
-            self.input_path,
-            '-o', output_path
         ]
+        # Pandoc names untitled pages after the input file, which is stdin here
+        untitled_args = [f'--metadata=pagetitle:{self.base_name}']
         
-        try:
-            result = subprocess.run(command, check=True, capture_output=True, text=True)
-            print(f"✅ HTML conversion successful!")
-            print(f"📄 Output saved to: {output_path}")
+        if media_dir is not None:
+            return self._render('HTML', writer_args, output_path, options, untitled_args, media_dir)
+        if self._is_current(output_path, options):
             return output_path
+        with tempfile.TemporaryDirectory() as temp_media_dir:
+            try:
+                return self._render('HTML', writer_args, output_path, options, untitled_args, temp_media_dir)
+            finally:
+                # Its image paths point into the directory being removed
+                self._asts.pop(temp_media_dir, None)
+
+    def convert_all(self, formats: Tuple[str, ...] = OUTPUT_FORMATS) -> Dict[str, str]:
+        """
+        Decode the document and render the requested formats concurrently.
+        
+        Markdown and HTML share one decode (media extracted for the Markdown);
+        XML is rendered from a decode without media extraction, as before.
+        
+        Args:
+            formats: Any of 'markdown', 'xml' and 'html'
+        
+        Returns:
+            dict: format -> output path, for the formats that succeeded
+        """
+        formats = list(dict.fromkeys(formats))
+        html_media_dir = MARKDOWN_MEDIA_DIR if 'markdown' in formats else None
+        renderers = {
+            'markdown': self.convert_to_markdown,
+            'xml': self.convert_to_xml,
+            'html': lambda: self.convert_to_html(html_media_dir),
+        }
+        # Each render is a separate pandoc process reading a shared AST
+        with ThreadPoolExecutor(max_workers=len(formats) or 1) as executor:
+            futures = {fmt: executor.submit(renderers[fmt]) for fmt in formats}
+        return {fmt: future.result() for fmt, future in futures.items() if future.result()}
+
+    def analyze_ast(self) -> Dict[str, any]:
+        """
+        Structure statistics from one walk over the decoded AST.
+        
+        Counts structural elements directly (headings by level, list items,
+        tables, links, images, paragraphs) instead of pattern-matching the
+        rendered Markdown. Walks an AST already decoded for rendering if there
+        is one (media extraction does not change the structure), so analyzing
+        after convert_all does not decode the document again.
+        """
+        with self._ast_lock:
+            ast = next(iter(self._asts.values()), None)
+        if ast is None:
+            ast = self.decode_ast()
+        if ast is None:
+            return {"error": "Document could not be decoded"}
+        
+        heading_counts = {}
+        counts = {'bullet_lists': 0, 'bullet_items': 0, 'numbered_lists': 0, 'numbered_items': 0,
+                  'tables': 0, 'links': 0, 'images': 0, 'paragraphs': 0, 'words': 0}
+        has_toc = False
+        
+        stack = [json.loads(ast)['blocks']]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(node)
+                continue
+            if not isinstance(node, dict):
+                continue
             
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Error during HTML conversion:")
-            print(f"   Error: {e.stderr}")
-            return None
+            node_type = node.get('t')
+            content = node.get('c')
+            if node_type == 'Str':
+                counts['words'] += 1
+                if content == 'Contents':
+                    has_toc = True
+                continue
+            if node_type == 'Header':
+                level = f'H{content[0]}'
+                heading_counts[level] = heading_counts.get(level, 0) + 1
+                # Skip the attributes; only the heading text can hold inlines
+                stack.append(content[2])
+                continue
+            if node_type == 'BulletList':
+                counts['bullet_lists'] += 1
+                counts['bullet_items'] += len(content)
+            elif node_type == 'OrderedList':
+                counts['numbered_lists'] += 1
+                counts['numbered_items'] += len(content[1])
+            elif node_type == 'Table':
+                counts['tables'] += 1
+            elif node_type == 'Link':
+                counts['links'] += 1
+            elif node_type == 'Image':
+                counts['images'] += 1
+            elif node_type in ('Para', 'Plain'):
+                counts['paragraphs'] += 1
+            
+            if isinstance(content, list):
+                stack.append(content)
+        
+        return {
+            'heading_counts': dict(sorted(heading_counts.items())),
+            **counts,
+            'has_toc': has_toc,
+        }
 
     def analyze_structure(self, markdown_path: str) -> Dict[str, any]:
         """
@@ -159,17 +334,22 @@ class DocumentConverter:
         with open(markdown_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        # Count different heading levels
+        # One pass over the lines for all line-based counts
         heading_counts = {}
-        for i in range(1, 7):
-            pattern = f'^{"#" * i}\\s+'
-            count = len([line for line in content.split('\n') if line.strip().startswith('#' * i)])
-            if count > 0:
-                heading_counts[f'H{i}'] = count
-        
-        # Count lists
-        bullet_lists = len([line for line in content.split('\n') if line.strip().startswith('- ')])
-        numbered_lists = len([line for line in content.split('\n') if line.strip().startswith(('1. ', '2. ', '3. '))])
+        bullet_lists = 0
+        numbered_lists = 0
+        lines = content.split('\n')
+        for line in lines:
+            stripped = line.strip()
+            if stripped.startswith('#'):
+                # A line starting with n '#' counts for every level up to n
+                depth = min(len(stripped) - len(stripped.lstrip('#')), 6)
+                for i in range(1, depth + 1):
+                    heading_counts[f'H{i}'] = heading_counts.get(f'H{i}', 0) + 1
+            elif stripped.startswith('- '):
+                bullet_lists += 1
+            elif stripped.startswith(('1. ', '2. ', '3. ')):
+                numbered_lists += 1
         
         # Count tables
         tables = content.count('|')
@@ -178,7 +358,7 @@ class DocumentConverter:
         links = content.count('[') and content.count('](')
         
         structure_analysis = {
-            'total_lines': len(content.split('\n')),
+            'total_lines': len(lines),
             'total_characters': len(content),
             'heading_counts': heading_counts,
             'bullet_lists': bullet_lists,
@@ -215,15 +395,48 @@ class DocumentConverter:
         
         return comparison
 
+def convert_folder(input_dir: str, output_dir: str = None, formats: Tuple[str, ...] = OUTPUT_FORMATS,
+                   workers: int = None, manifest: BuildManifest = None) -> Dict[str, Dict[str, str]]:
+    """
+    Convert every DOC/DOCX guideline in a folder, several documents at a time.
+    
+    Args:
+        input_dir: Folder containing the Word documents
+        output_dir: Output directory (default: same as input)
+        formats: Any of 'markdown', 'xml' and 'html'
+        workers: Documents converted concurrently (default: CPU count)
+        manifest: Optional build manifest; up-to-date outputs are skipped
+    
+    Returns:
+        dict: input path -> {format: output path}
+    """
+    input_paths = sorted(
+        os.path.join(input_dir, name) for name in os.listdir(input_dir)
+        # Skip Word lock files (~$name.docx)
+        if name.lower().endswith(WORD_SUFFIXES) and not name.startswith('~$')
+    )
+    print(f"📚 Converting {len(input_paths)} documents with {workers or os.cpu_count()} workers")
+    
+    def convert_one(input_path):
+        return DocumentConverter(input_path, output_dir or input_dir, manifest).convert_all(formats)
+    
+    # The work happens in pandoc subprocesses, so threads are enough to use every core
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        return dict(zip(input_paths, executor.map(convert_one, input_paths)))
+
 def main():
     """Main function to run document conversion."""
     parser = argparse.ArgumentParser(description='Convert DOC/DOCX to structured formats')
-    parser.add_argument('input_file', help='Path to the DOC/DOCX file')
+    parser.add_argument('input_file', help='Path to the DOC/DOCX file, or a folder of them')
     parser.add_argument('--output-dir', help='Output directory (default: same as input)')
     parser.add_argument('--format', choices=['markdown', 'xml', 'html', 'all'], 
                        default='markdown', help='Output format')
     parser.add_argument('--analyze', action='store_true', 
                        help='Analyze structure after conversion')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Skip formats whose output is up to date with the input')
+    parser.add_argument('--workers', type=int,
+                       help='Documents converted concurrently in folder mode (default: CPU count)')
     
     args = parser.parse_args()
     
@@ -231,8 +444,25 @@ def main():
         print(f"❌ Input file not found: {args.input_file}")
         return
     
+    formats = OUTPUT_FORMATS if args.format == 'all' else (args.format,)
+    
     # Initialize converter
-    converter = DocumentConverter(args.input_file, args.output_dir)
+    if os.path.isdir(args.input_file):
+        output_dir = args.output_dir or args.input_file
+    else:
+        output_dir = args.output_dir or os.path.dirname(args.input_file)
+    manifest = BuildManifest(os.path.join(output_dir, MANIFEST_NAME)) if args.incremental else None
+    
+    if os.path.isdir(args.input_file):
+        if not DocumentConverter.check_pandoc():
+            return
+        folder_results = convert_folder(args.input_file, output_dir, formats, args.workers, manifest)
+        converted = sum(1 for outputs in folder_results.values() if len(outputs) == len(formats))
+        print(f"\n✅ Converted {converted}/{len(folder_results)} documents")
+        print(f"📁 Output directory: {output_dir}")
+        return
+    
+    converter = DocumentConverter(args.input_file, args.output_dir, manifest)
     
     # Check Pandoc availability
     if not converter.check_pandoc():
@@ -241,29 +471,14 @@ def main():
     print(f"\n🚀 Starting conversion of: {args.input_file}")
     print("=" * 60)
     
-    results = {}
-    
-    # Convert based on requested format
-    if args.format in ['markdown', 'all']:
-        md_path = converter.convert_to_markdown()
-        if md_path:
-            results['markdown'] = md_path
-            
-            if args.analyze:
-                print("\n📊 Structure Analysis:")
-                analysis = converter.analyze_structure(md_path)
-                for key, value in analysis.items():
-                    print(f"   {key}: {value}")
-    
-    if args.format in ['xml', 'all']:
-        xml_path = converter.convert_to_xml()
-        if xml_path:
-            results['xml'] = xml_path
+    # One decode, all requested formats rendered concurrently
+    results = converter.convert_all(formats)
     
-    if args.format in ['html', 'all']:
-        html_path = converter.convert_to_html()
-        if html_path:
-            results['html'] = html_path
+    if args.analyze and results:
+        print("\n📊 Structure Analysis:")
+        analysis = converter.analyze_ast()
+        for key, value in analysis.items():
+            print(f"   {key}: {value}")
     
     # Compare with GROBID if available
     grobid_path = "/Users/aristotle_co/Documents/Boussard Lab/Project/grobid_output/EASL-recommendations-on-treatment-of-hepatitis-C.grobid.tei.xml"
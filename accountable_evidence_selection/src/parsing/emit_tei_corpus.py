@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Rebuild the TEI-derived corpora with one parse per document.
+
+Walks results/grobid_xml/** and, for every GROBID TEI file, produces any
+subset of:
+- structured text (xml_to_structured_txt)  -> results/xml_to_txt_output/<name>.txt
+- pseudo-XML (pseudo_xml)                   -> results/pseudo_xml/<name>.txt
+- RAG chunks (chunk_creation in the notebook) -> one JSONL corpus file,
+  with the same OPIDs (corpus_loader.assign_opids) and chunk IDs
+  (chroma_sync.assign_chunk_ids) as the other exporters
+
+All requested outputs come out of the same streaming pass (see tei_stream.emit_tei).
+With --incremental, structured text and pseudo-XML are only regenerated for
+TEI files that are new or changed since the last run (see build_manifest).
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+
+from tei_stream import emit_tei, TEI_FORMATS
+from build_manifest import BuildManifest, MANIFEST_FILE
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "results")
+GROBID_XML_DIR = os.path.join(RESULTS_DIR, "grobid_xml")
+STRUCTURED_TXT_DIR = os.path.join(RESULTS_DIR, "xml_to_txt_output")
+PSEUDO_XML_DIR = os.path.join(RESULTS_DIR, "pseudo_xml")
+RAG_CHUNKS_FILE = os.path.join(RESULTS_DIR, "grobid_tei_rag_chunks.jsonl")
+
+RAG_CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "RAG_code")
+
+# Same splitter settings as chunk_creation in the notebook
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+
+# Manifest parser name of each per-document output format
+TEI_FORMAT_PARSERS = {'structured': 'tei_structured', 'pseudo': 'tei_pseudo'}
+
+def output_name(xml_path):
+    """'<name>.grobid.tei.xml' -> '<name>'"""
+    name = os.path.basename(xml_path)
+    for suffix in ('.grobid.tei.xml', '.tei.xml', '.xml'):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+def find_tei_files(input_dir):
+    """All TEI files below input_dir, in a stable (sorted) order."""
+    return sorted(glob.glob(os.path.join(input_dir, '**', '*.xml'), recursive=True))
+
+def emit_tei_corpus(input_dir=GROBID_XML_DIR, formats=tuple(TEI_FORMATS),
+                    structured_dir=STRUCTURED_TXT_DIR, pseudo_dir=PSEUDO_XML_DIR,
+                    rag_chunks_file=RAG_CHUNKS_FILE, manifest=None):
+    """
+    Convert every TEI file below input_dir into the requested formats.
+
+    Args:
+        input_dir (str): Directory searched recursively for TEI files
+        formats (iterable): Any subset of 'structured', 'pseudo' and 'rag'
+        structured_dir (str): Output directory for structured text
+        pseudo_dir (str): Output directory for pseudo-XML
+        rag_chunks_file (str): Output JSONL file for the RAG chunks
+        manifest: Optional BuildManifest; structured/pseudo outputs that are
+            current are skipped and regenerated ones are recorded. The RAG
+            corpus is a single file and is always rewritten in full.
+
+    Returns:
+        dict: Per-format totals (characters, or chunks for 'rag')
+    """
+    formats = list(dict.fromkeys(formats))
+    xml_files = find_tei_files(input_dir)
+    print(f"📚 Found {len(xml_files)} TEI files, emitting: {', '.join(formats)}")
+
+    text_splitter = None
+    rag_file = None
+    if 'rag' in formats:
+        from langchain_core.documents import Document
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        sys.path.insert(0, RAG_CODE_DIR)
+        from corpus_loader import assign_opids
+        from chroma_sync import assign_chunk_ids
+        # Known guidelines keep their published OPIDs; other files get new ones
+        opids = assign_opids([os.path.basename(xml_path) for xml_path in xml_files])
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            length_function=len,
+            is_separator_regex=False
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(rag_chunks_file)), exist_ok=True)
+        rag_file = open(rag_chunks_file, 'w', encoding='utf-8')
+
+    totals = dict.fromkeys(formats, 0)
+    up_to_date = 0
+    start = time.perf_counter()
+    try:
+        for xml_path in xml_files:
+            name = output_name(xml_path)
+            output_paths = {}
+            if 'structured' in formats:
+                output_paths['structured'] = os.path.join(structured_dir, f"{name}.txt")
+            if 'pseudo' in formats:
+                output_paths['pseudo'] = os.path.join(pseudo_dir, f"{name}.txt")
+
+            if manifest is not None:
+                output_paths = {fmt: path for fmt, path in output_paths.items()
+                                if not manifest.is_current(path, xml_path, TEI_FORMAT_PARSERS[fmt])}
+            file_formats = list(output_paths) + (['rag'] if rag_file is not None else [])
+            if not file_formats:
+                up_to_date += 1
+                print(f"   ⏭️  {name} (up to date)")
+                continue
+
+            outputs = emit_tei(xml_path, file_formats, output_paths)
+            for fmt in output_paths:
+                totals[fmt] += outputs[fmt]
+                if manifest is not None:
+                    manifest.record(output_paths[fmt], xml_path, TEI_FORMAT_PARSERS[fmt])
+
+            if rag_file is not None:
+                source = os.path.basename(xml_path)
+                metadata = {"source": source, "OPID": opids[source]}
+                chunks = assign_chunk_ids([Document(page_content=text, metadata=dict(metadata))
+                                           for text in text_splitter.split_text(outputs['rag'])])
+                for chunk in chunks:
+                    record = {"id": chunk.id, "metadata": chunk.metadata,
+                              "page_content": chunk.page_content, "type": "Document"}
+                    rag_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    totals['rag'] += 1
+
+            print(f"   ✅ {name}")
+    finally:
+        if rag_file is not None:
+            rag_file.close()
+        if manifest is not None:
+            manifest.save()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ Emitted {len(xml_files) - up_to_date} documents in {elapsed:.1f}s (one parse per document)")
+    if up_to_date:
+        print(f"   ⏭️  {up_to_date} documents already up to date")
+    for fmt, total in totals.items():
+        unit = "chunks" if fmt == 'rag' else "characters"
+        print(f"   {fmt}: {total} {unit}")
+    if rag_file is not None:
+        print(f"📄 RAG chunks saved to: {rag_chunks_file}")
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description='Emit structured text, pseudo-XML and RAG chunks from GROBID TEI')
+    parser.add_argument('--input-dir', default=GROBID_XML_DIR, help='Directory of GROBID TEI files')
+    parser.add_argument('--formats', nargs='+', choices=list(TEI_FORMATS), default=list(TEI_FORMATS),
+                        help='Output formats to produce')
+    parser.add_argument('--structured-dir', default=STRUCTURED_TXT_DIR, help='Structured text output directory')
+    parser.add_argument('--pseudo-dir', default=PSEUDO_XML_DIR, help='Pseudo-XML output directory')
+    parser.add_argument('--rag-chunks', default=RAG_CHUNKS_FILE, help='RAG chunk JSONL output file')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only regenerate outputs whose TEI changed since the last run')
+    parser.add_argument('--manifest', default=MANIFEST_FILE, help='Build manifest used by --incremental')
+    args = parser.parse_args()
+
+    manifest = BuildManifest(args.manifest) if args.incremental else None
+    emit_tei_corpus(args.input_dir, args.formats, args.structured_dir, args.pseudo_dir, args.rag_chunks,
+                    manifest)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Paragraph-granularity view of GROBID TEI for the LangChain scripts.
+
+GrobidParser(segment_sentences=True) turns every sentence into a LangChain
+Document with its own copy of the metadata (section title, paper title, file
+path, a repr of the bounding boxes, the text twice). `iter_grobid_paragraphs`
+reads the same TEI into one `GrobidParagraph` per paragraph instead: the
+paragraph text, the sentence boundaries as an offset array and the first/last
+page of every sentence, plus one metadata dict shared by the whole section.
+
+The sentences it describes are exactly the ones GrobidParser would emit (same
+divs, same <s> elements, only sentences with coordinates, same text), so
+`to_documents` reproduces GrobidParser's Documents when they are needed, minus
+the 'bboxes' repr.
+"""
+
+from array import array
+
+from lxml import etree as ET
+
+def _page_number(page_label):
+    """Page number of a coords page label (same rule as extract_page_number)."""
+    digits = ''
+    for char in page_label:
+        if char.isdigit():
+            digits += char
+        elif digits:
+            break
+    return int(digits) if digits else 0
+
+class GrobidParagraph:
+    """
+    One TEI paragraph with its sentences as offsets into a single string.
+
+    Attributes:
+        text: Sentences concatenated as GrobidParser does ("".join)
+        sentence_offsets: array of len(sentences) + 1 boundaries into text
+        sentence_indices: array with each sentence's position among the
+            paragraph's <s> elements (GrobidParser's 'para' value)
+        first_pages / last_pages: arrays with the first and last page of each sentence
+        metadata: Section metadata dict, shared by every paragraph of the section
+            ('section_title', 'section_number', 'paper_title', 'file_path')
+    """
+    __slots__ = ('text', 'sentence_offsets', 'sentence_indices', 'first_pages', 'last_pages', 'metadata')
+
+    def __init__(self, text, sentence_offsets, sentence_indices, first_pages, last_pages, metadata):
+        self.text = text
+        self.sentence_offsets = sentence_offsets
+        self.sentence_indices = sentence_indices
+        self.first_pages = first_pages
+        self.last_pages = last_pages
+        self.metadata = metadata
+
+    def __len__(self):
+        return len(self.sentence_offsets) - 1
+
+    def sentence(self, position):
+        """Text of the position-th sentence (a slice of the paragraph text)."""
+        return self.text[self.sentence_offsets[position]:self.sentence_offsets[position + 1]]
+
+    def iter_sentences(self):
+        """
+        Yields:
+            tuple: (sentence index, first page, sentence text), where the index
+                is the 'para' value GrobidParser reports for the sentence
+        """
+        offsets = self.sentence_offsets
+        text = self.text
+        for position, index in enumerate(self.sentence_indices):
+            yield index, self.first_pages[position], text[offsets[position]:offsets[position + 1]]
+
+    def to_documents(self):
+        """The sentence Documents GrobidParser(segment_sentences=True) returns for this paragraph."""
+        from langchain_core.documents import Document
+        documents = []
+        for position, (index, first_page, sentence) in enumerate(self.iter_sentences()):
+            metadata = {
+                'text': sentence,
+                'para': str(index),
+                'pages': str((str(first_page), str(self.last_pages[position]))),
+                'section_title': self.metadata['section_title'],
+                'section_number': self.metadata['section_number'],
+                'paper_title': self.metadata['paper_title'],
+                'file_path': self.metadata['file_path'],
+            }
+            documents.append(Document(page_content=sentence, metadata=metadata))
+        return documents
+
+def iter_grobid_paragraphs(xml_data, file_path):
+    """
+    Read GROBID TEI (requested with segmentSentences=1 and teiCoordinates=s)
+    into paragraph records.
+
+    Mirrors GrobidParser.process_xml: every <div> that contains a <head>
+    contributes its <p> descendants, and a sentence counts only if it has
+    coordinates. Paragraphs without such sentences are skipped.
+
+    Args:
+        xml_data (str): TEI XML returned by GROBID
+        file_path (str): Source PDF path, stored in the metadata
+
+    Yields:
+        GrobidParagraph: In document order
+    """
+    parser = ET.XMLParser(recover=True, huge_tree=True, remove_comments=True, remove_pis=True)
+    if isinstance(xml_data, str):
+        xml_data = xml_data.encode('utf-8')
+    root = ET.fromstring(xml_data, parser)
+
+    title = next(root.iter('{*}title'), None)
+    paper_title = ''.join(title.itertext()) if title is not None else "No title found"
+    file_path = str(file_path)
+    page_numbers = {}
+
+    for div in root.iter('{*}div'):
+        head = div.find('.//{*}head')
+        if head is None:
+            continue
+        section = {
+            'section_title': ''.join(head.itertext()),
+            'section_number': str(head.get('n')),
+            'paper_title': paper_title,
+            'file_path': file_path,
+        }
+        for paragraph in div.iter('{*}p'):
+            parts = []
+            offsets = array('I', [0])
+            indices = array('I')
+            first_pages = array('I')
+            last_pages = array('I')
+            length = 0
+            for index, sentence in enumerate(paragraph.iter('{*}s')):
+                coords = sentence.get('coords')
+                if not coords:
+                    continue
+                boxes = coords.split(';')
+                first_label = boxes[0].split(',', 1)[0]
+                last_label = boxes[-1].split(',', 1)[0]
+                for label in (first_label, last_label):
+                    if label not in page_numbers:
+                        page_numbers[label] = _page_number(label)
+                text = ''.join(sentence.itertext())
+                parts.append(text)
+                length += len(text)
+                offsets.append(length)
+                indices.append(index)
+                first_pages.append(page_numbers[first_label])
+                last_pages.append(page_numbers[last_label])
+            if parts:
+                yield GrobidParagraph(''.join(parts), offsets, indices, first_pages, last_pages, section)
@@ -8,12 +8,20 @@ Improved GROBID LangChain Parser for Clinical Guidelines
 """
 
 import os
+from itertools import chain
 from langchain_community.document_loaders.generic import GenericLoader
-from langchain_community.document_loaders.parsers import GrobidParser
-from collections import defaultdict
+from cached_grobid_parser import CachedGrobidParser
+from grobid_paragraphs import GrobidParagraph
+from tei_cache import TEICache
+from functools import lru_cache
+from operator import attrgetter
 import re
 
-def extract_pdf_with_grobid_sequential(pdf_path, output_path, grobid_url="http://localhost:8070"):
+from text_writer import write_text_stream
+from section_classifier import SectionClassifier
+
+def extract_pdf_with_grobid_sequential(pdf_path, output_path, grobid_url="http://localhost:8070", use_cache=True,
+                                       manifest=None, granularity='paragraph'):
     """
     Extract text from PDF using GROBID with sequential section processing.
     
@@ -21,72 +29,120 @@ def extract_pdf_with_grobid_sequential(pdf_path, output_path, grobid_url="http:/
         pdf_path (str): Path to the input PDF file
         output_path (str): Path to the output text file
         grobid_url (str): URL of the GROBID server
+        use_cache (bool): Reuse TEI from the shared cache instead of calling GROBID again
+        manifest: Optional BuildManifest; the extraction is skipped when output_path
+            was already built from the same PDF bytes, and recorded otherwise
+        granularity (str): 'paragraph' reads one record per paragraph with sentence
+            offsets; 'sentence' loads one LangChain Document per sentence.
+            Both produce the same output text.
     """
+    if manifest is not None and manifest.is_current(output_path, pdf_path, 'grobid_sequential'):
+        print(f"⏭️  {output_path} is up to date with {pdf_path}")
+        return
+    
     try:
         print(f"Starting sequential GROBID extraction for: {pdf_path}")
         print(f"GROBID server URL: {grobid_url}")
         
-        # Create GROBID parser with sentence segmentation enabled for better paragraph handling
-        parser = GrobidParser(segment_sentences=True)
-        
-        # Create loader for the PDF file
-        loader = GenericLoader.from_filesystem(
-            os.path.dirname(pdf_path),
-            glob=os.path.basename(pdf_path),
-            suffixes=[".pdf"],
-            parser=parser,
-        )
+        # Create GROBID parser with sentence segmentation enabled for better paragraph handling;
+        # TEI already fetched for this PDF is served from the shared cache
+        parser = CachedGrobidParser(segment_sentences=True, grobid_url=grobid_url,
+                                    cache=TEICache(enabled=use_cache))
         
-        # Load documents
         print("Processing PDF with GROBID...")
-        docs = loader.load()
+        if granularity == 'paragraph':
+            # One record per paragraph; sentences stay offsets into its text
+            docs = parser.parse_paragraphs(pdf_path)
+        else:
+            # Create loader for the PDF file
+            loader = GenericLoader.from_filesystem(
+                os.path.dirname(pdf_path),
+                glob=os.path.basename(pdf_path),
+                suffixes=[".pdf"],
+                parser=parser,
+            )
+            
+            # Stream documents instead of loading them all up front
+            docs = loader.lazy_load()
         
-        if not docs:
+        first_doc = next(docs, None)
+        if first_doc is None:
             print("No documents were extracted.")
             return
         
-        print(f"Successfully extracted {len(docs)} document sections")
+        # Fragments flow through classification, paragraph stitching and
+        # writing one page at a time; the formatted text is streamed to the
+        # output file as each section is produced
+        stats = {'sections': 0, 'documents': 0}
+        counted_docs = count_items(chain([first_doc], docs), stats)
+        sequential_sections = iter_sequential_sections(counted_docs, streaming=True)
+        total_chars = write_text_stream(iter_formatted_sections(sequential_sections, stats), output_path)
         
-        # Process sections sequentially without merging
-        sequential_sections = process_sequential_sections(docs)
+        unit = 'paragraphs' if granularity == 'paragraph' else 'document sections'
+        print(f"✅ Sequential extraction completed successfully!")
+        print(f"📄 Text saved to: {output_path}")
+        print(f"📚 Extracted {stats['documents']} {unit}")
+        print(f"📈 Total sections: {stats['sections']}")
+        print(f"📝 Total characters: {total_chars}")
         
-        # Format the sequential content with de-duplicated headers
-        formatted_content = ""
+        if manifest is not None:
+            manifest.record(output_path, pdf_path, 'grobid_sequential')
+            manifest.save()
         
-        current_title = None
-        section_index = 0
+    except Exception as e:
+        print(f"❌ Error during GROBID processing: {str(e)}")
+
+def iter_formatted_sections(sequential_sections, stats=None):
+    """
+    Format sequential sections with de-duplicated headers, one piece at a time.
+    
+    Args:
+        sequential_sections: Iterable of section dicts (see iter_sequential_sections)
+        stats (dict): Optional dict whose 'sections' count is updated on the fly
         
-        for section_data in sequential_sections:
-            title = section_data['title']
-            content = section_data['content']
-            
-            # If this is a new section title, open a new section block
-            if title != current_title:
-                section_index += 1
-                current_title = title
-                
-                # Create section header once per contiguous title
-                section_header = f"\n{'='*80}\n"
-                section_header += f"SECTION {section_index}: {title}\n"
-                section_header += f"{'='*80}\n"
-                section_header += f"Page: {section_data['page']}\n"
-                section_header += f"{'='*80}\n\n"
-                formatted_content += section_header
-            
-            # Append content under the current section without repeating header
-            formatted_content += content + "\n\n"
+    Yields:
+        str: Section headers and section content, in output order
+    """
+    current_title = None
+    section_index = 0
+    
+    for section_data in sequential_sections:
+        title = section_data['title']
         
-        # Save formatted text
-        with open(output_path, 'w', encoding='utf-8') as output_file:
-            output_file.write(formatted_content)
+        # If this is a new section title, open a new section block
+        if title != current_title:
+            section_index += 1
+            current_title = title
+            if stats is not None:
+                stats['sections'] = section_index
+            
+            # Create section header once per contiguous title
+            yield (
+                f"\n{'='*80}\n"
+                f"SECTION {section_index}: {title}\n"
+                f"{'='*80}\n"
+                f"Page: {section_data['page']}\n"
+                f"{'='*80}\n\n"
+            )
         
-        print(f"✅ Sequential extraction completed successfully!")
-        print(f"📄 Text saved to: {output_path}")
-        print(f"📈 Total sections: {section_index}")
-        print(f"📝 Total characters: {len(formatted_content)}")
+        # Append content under the current section without repeating header
+        yield section_data['content'] + "\n\n"
+
+def count_items(items, stats, key='documents'):
+    """
+    Pass items through unchanged while counting them in stats[key].
+    
+    Args:
+        items: Any iterable
+        stats (dict): Counter dict updated on the fly
+        key (str): Counter name
         
-    except Exception as e:
-        print(f"❌ Error during GROBID processing: {str(e)}")
+    Yields:
+        Each item of items
+    """
+    for item in items:
+        stats[key] += 1
+        yield item
 
 def process_sequential_sections(docs):
     """
@@ -98,78 +154,224 @@ def process_sequential_sections(docs):
     Returns:
         list: Sequential sections with improved content handling
     """
-    # Sort documents by page and paragraph number
-    sorted_docs = sorted(docs, key=lambda x: (
-        extract_page_number(x.metadata.get('pages', '0')),
-        int(x.metadata.get('para', '0'))
-    ))
+    return list(iter_sequential_sections(docs))
+
+class Fragment:
+    """
+    A GROBID fragment normalized once for process_sequential_sections.
+
+    The page number, paragraph number and duplicate key are parsed when the
+    record is built, so sorting, duplicate detection and paragraph continuity
+    compare ints instead of re-reading the metadata strings.
+    """
+    __slots__ = ('page', 'para', 'para_label', 'content', 'metadata', 'dedup_key')
+
+    def __init__(self, page, para_label, content, metadata):
+        self.page = page
+        self.para = int(para_label)
+        self.para_label = para_label
+        self.content = content
+        self.metadata = metadata
+        # Same identity as the former f"{page}_{para}_{content[:50]}" key; the
+        # tuple itself is kept (not its hash) so distinct fragments never collide
+        self.dedup_key = (page, para_label, content[:50])
+
+FRAGMENT_ORDER = attrgetter('page', 'para')
+
+def build_fragments(docs):
+    """
+    Normalize and sort GROBID documents for sequential processing.
     
-    sequential_sections = []
-    current_paragraph = None
-    paragraph_buffer = []
-    seen_sections = set()  # Track seen sections to avoid duplicates
+    Args:
+        docs: List of document objects from GROBID, or GrobidParagraph records
+            (each contributes its sentences, as the sentence Documents would)
+        
+    Returns:
+        list: Non-empty Fragment records sorted by page and paragraph number
+    """
+    fragments = list(iter_fragments(docs))
+    fragments.sort(key=FRAGMENT_ORDER)
+    return fragments
+
+def iter_page_ordered_fragments(docs):
+    """
+    Streaming counterpart of build_fragments: fragments are buffered one page
+    at a time and released, sorted, once a fragment from a later page arrives.
     
-    for i, doc in enumerate(sorted_docs):
-        metadata = doc.metadata
-        content = doc.page_content.strip()
+    GROBID reports the body in reading order, so pages arrive in non-decreasing
+    order and the result matches build_fragments while only one page is held in
+    memory. A fragment that arrives after its page was released (e.g. a
+    late caption) is sorted into the page being buffered instead.
+    
+    Args:
+        docs: Iterable of GROBID documents or GrobidParagraph records
+        
+    Yields:
+        Fragment: Non-empty fragments in page and paragraph order
+    """
+    page_buffer = []
+    current_page = None
+    for fragment in iter_fragments(docs):
+        if current_page is None or fragment.page > current_page:
+            if page_buffer:
+                page_buffer.sort(key=FRAGMENT_ORDER)
+                yield from page_buffer
+                page_buffer = []
+            current_page = fragment.page
+        page_buffer.append(fragment)
+    
+    page_buffer.sort(key=FRAGMENT_ORDER)
+    yield from page_buffer
+
+def iter_fragments(docs):
+    """
+    Normalize GROBID documents into Fragment records, in arrival order.
+    
+    Args:
+        docs: Iterable of GROBID documents or GrobidParagraph records
+        
+    Yields:
+        Fragment: One per non-empty sentence or document
+    """
+    # Many fragments share a pages string; parse each distinct one once
+    page_numbers = {}
+    para_labels = {}
+    for doc in docs:
+        if isinstance(doc, GrobidParagraph):
+            metadata = doc.metadata
+            for index, page, sentence in doc.iter_sentences():
+                content = sentence.strip()
+                if not content:
+                    continue
+                label = para_labels.get(index)
+                if label is None:
+                    label = para_labels[index] = str(index)
+                yield Fragment(page, label, content, metadata)
+            continue
         
+        content = doc.page_content.strip()
         if not content:
             continue
+        metadata = doc.metadata
+        pages = metadata.get('pages', '0')
+        try:
+            page = page_numbers[pages]
+        except KeyError:
+            page = page_numbers[pages] = extract_page_number(pages)
+        except TypeError:
+            page = extract_page_number(pages)
+        yield Fragment(page, metadata.get('para', '0'), content, metadata)
+
+def iter_sequential_sections(docs, streaming=False):
+    """
+    Generator version of process_sequential_sections: sections are yielded as
+    soon as they are complete instead of being collected in a list.
+    
+    Args:
+        docs: List of document objects from GROBID
+        streaming (bool): Order fragments page by page (iter_page_ordered_fragments)
+            so docs can be a lazy iterator that is never held in full
         
-        # Determine section type
-        section_type = determine_section_type(metadata, content)
+    Yields:
+        dict: Sequential sections with improved content handling
+    """
+    previous = None  # Last fragment of the open paragraph
+    paragraph_buffer = []
+    seen_sections = set()  # Track seen sections to avoid duplicates
+    
+    # Precompiled equivalent of determine_section_type/should_include_content
+    classifier = SectionClassifier()
+    
+    fragments = iter_page_ordered_fragments(docs) if streaming else build_fragments(docs)
+    for fragment in fragments:
+        metadata = fragment.metadata
+        content = fragment.content
         
-        # Create section identifier to check for duplicates
-        section_id = f"{extract_page_number(metadata.get('pages', '0'))}_{metadata.get('para', '0')}_{content[:50]}"
+        # Determine section type (and whether non-paragraph content is kept)
+        section_type, include = classifier.classify_one(metadata, content)
         
         # Skip duplicate sections
-        if section_id in seen_sections:
+        if fragment.dedup_key in seen_sections:
             continue
-        seen_sections.add(section_id)
+        seen_sections.add(fragment.dedup_key)
         
         # Handle paragraph continuity
         if section_type == 'paragraph':
-            if should_continue_paragraph(metadata, current_paragraph):
+            if fragment_continues_paragraph(fragment, previous):
                 # Continue current paragraph
                 paragraph_buffer.append(content)
-                current_paragraph = {
-                    'metadata': metadata,
-                    'content_parts': paragraph_buffer
-                }
             else:
                 # Save previous paragraph if exists
-                if current_paragraph:
-                    sequential_sections.append(create_paragraph_section(current_paragraph))
+                if previous is not None:
+                    yield fragment_paragraph_section(previous, paragraph_buffer)
                 
                 # Start new paragraph
                 paragraph_buffer = [content]
-                current_paragraph = {
-                    'metadata': metadata,
-                    'content_parts': paragraph_buffer
-                }
+            previous = fragment
         else:
             # Save current paragraph before processing non-paragraph content
-            if current_paragraph:
-                sequential_sections.append(create_paragraph_section(current_paragraph))
-                current_paragraph = None
+            if previous is not None:
+                yield fragment_paragraph_section(previous, paragraph_buffer)
+                previous = None
                 paragraph_buffer = []
             
             # Process non-paragraph content (headers, tables, etc.)
-            if should_include_content(section_type, content):
-                sequential_sections.append({
-                    'title': clean_section_title(metadata.get('section_title', 'Unknown')),
+            if include:
+                yield {
+                    'title': cached_section_title(metadata.get('section_title', 'Unknown')),
                     'content': content,
-                    'page': extract_page_number(metadata.get('pages', '0')),
-                    'paragraph': metadata.get('para', '0'),
+                    'page': fragment.page,
+                    'paragraph': fragment.para_label,
                     'content_length': len(content),
                     'type': section_type
-                })
+                }
     
     # Save final paragraph if exists
-    if current_paragraph:
-        sequential_sections.append(create_paragraph_section(current_paragraph))
+    if previous is not None:
+        yield fragment_paragraph_section(previous, paragraph_buffer)
+
+def fragment_continues_paragraph(fragment, previous):
+    """
+    Determine if a fragment continues the open paragraph.
+    
+    Args:
+        fragment: Current Fragment
+        previous: Last Fragment of the open paragraph, or None
+        
+    Returns:
+        bool: True if should continue paragraph
+    """
+    if previous is None:
+        return False
+    
+    # Continue if same page and consecutive paragraphs
+    if fragment.page == previous.page and fragment.para == previous.para + 1:
+        return True
+    
+    # Continue if next page and first paragraph (might be continuation)
+    return fragment.page == previous.page + 1 and fragment.para == 1
+
+def fragment_paragraph_section(last_fragment, content_parts):
+    """
+    Create a section from the fragments of one paragraph.
+    
+    Args:
+        last_fragment: Last Fragment of the paragraph (its metadata is reported)
+        content_parts: Content of every fragment in the paragraph
+        
+    Returns:
+        dict: Formatted section data
+    """
+    content = ' '.join(content_parts)
     
-    return sequential_sections
+    return {
+        'title': cached_section_title(last_fragment.metadata.get('section_title', 'Paragraph')),
+        'content': content,
+        'page': last_fragment.page,
+        'paragraph': last_fragment.para_label,
+        'content_length': len(content),
+        'type': 'paragraph'
+    }
 
 def determine_section_type(metadata, content):
     """
@@ -261,39 +463,6 @@ def is_figure_content(content):
     
     return False
 
-def should_continue_paragraph(current_metadata, previous_paragraph):
-    """
-    Determine if current content should continue the previous paragraph.
-    
-    Args:
-        current_metadata: Current document metadata
-        previous_paragraph: Previous paragraph data
-        
-    Returns:
-        bool: True if should continue paragraph
-    """
-    if not previous_paragraph:
-        return False
-    
-    prev_metadata = previous_paragraph['metadata']
-    
-    # Check if same page and consecutive paragraphs
-    current_page = extract_page_number(current_metadata.get('pages', '0'))
-    prev_page = extract_page_number(prev_metadata.get('pages', '0'))
-    
-    current_para = int(current_metadata.get('para', '0'))
-    prev_para = int(prev_metadata.get('para', '0'))
-    
-    # Continue if same page and consecutive paragraphs
-    if current_page == prev_page and current_para == prev_para + 1:
-        return True
-    
-    # Continue if next page and first paragraph (might be continuation)
-    if current_page == prev_page + 1 and current_para == 1:
-        return True
-    
-    return False
-
 def should_include_content(section_type, content):
     """
     Determine if content should be included in output.
@@ -342,31 +511,6 @@ def is_purely_tabular(content):
     tabular_ratio = (pipe_lines + number_lines) / total_lines
     return tabular_ratio > 0.7
 
-def create_paragraph_section(paragraph_data):
-    """
-    Create a section from paragraph data.
-    
-    Args:
-        paragraph_data: Dictionary containing paragraph information
-        
-    Returns:
-        dict: Formatted section data
-    """
-    metadata = paragraph_data['metadata']
-    content_parts = paragraph_data['content_parts']
-    
-    # Join content parts with proper spacing
-    content = ' '.join(content_parts)
-    
-    return {
-        'title': clean_section_title(metadata.get('section_title', 'Paragraph')),
-        'content': content,
-        'page': extract_page_number(metadata.get('pages', '0')),
-        'paragraph': metadata.get('para', '0'),
-        'content_length': len(content),
-        'type': 'paragraph'
-    }
-
 def clean_section_title(title):
     """
     Clean section title without merging similar titles.
@@ -388,6 +532,9 @@ def clean_section_title(title):
     
     return title
 
+# A document has a handful of distinct section titles across thousands of fragments
+cached_section_title = lru_cache(maxsize=1024)(clean_section_title)
+
 def extract_page_number(pages_str):
     """
     Extract page number from pages string.
@@ -435,8 +582,8 @@ if __name__ == "__main__":
     
     print(f"📁 Found PDF file: {pdf_file}")
     
-    # Check GROBID server
-    if not check_grobid_server():
+    # Check GROBID server (not needed when the TEI is already cached)
+    if not CachedGrobidParser(segment_sentences=True).is_cached(pdf_file) and not check_grobid_server():
         print("\n⚠️  Please start GROBID server first.")
         exit(1)
     
@@ -6,10 +6,12 @@ This script shows the raw output from LangChain's GrobidParser without any custo
 
 import os
 import json
+from itertools import chain
 from langchain_community.document_loaders.generic import GenericLoader
-from langchain_community.document_loaders.parsers import GrobidParser
+from cached_grobid_parser import CachedGrobidParser
+from tei_cache import TEICache
 
-def extract_pdf_raw_langchain(pdf_path, output_path, grobid_url="http://localhost:8070"):
+def extract_pdf_raw_langchain(pdf_path, output_path, grobid_url="http://localhost:8070", use_cache=True):
     """
     Extract text from PDF using GROBID with LangChain - RAW OUTPUT ONLY.
     Shows what LangChain's GrobidParser actually returns without custom formatting.
@@ -18,13 +20,23 @@ def extract_pdf_raw_langchain(pdf_path, output_path, grobid_url="http://localhos
         pdf_path (str): Path to the input PDF file
         output_path (str): Path to the output text file
         grobid_url (str): URL of the GROBID server
+        use_cache (bool): Reuse TEI from the shared cache instead of calling GROBID again
     """
+    # The JSONL dump (one document per line, for easier inspection) is
+    # written next to the text output, in the same pass
+    jsonl_output_path = os.path.splitext(output_path)[0] + '_raw.jsonl'
+    if os.path.abspath(jsonl_output_path) == os.path.abspath(output_path):
+        print(f"❌ Output path {output_path} would also be the JSONL output path")
+        return
+    
     try:
         print(f"Starting raw GROBID extraction for: {pdf_path}")
         print(f"GROBID server URL: {grobid_url}")
         
-        # Create GROBID parser with sentence segmentation enabled
-        parser = GrobidParser(segment_sentences=True)
+        # Create GROBID parser with sentence segmentation enabled;
+        # TEI already fetched for this PDF is served from the shared cache
+        parser = CachedGrobidParser(segment_sentences=True, grobid_url=grobid_url,
+                                    cache=TEICache(enabled=use_cache))
         
         # Create loader for the PDF file
         loader = GenericLoader.from_filesystem(
@@ -34,29 +46,32 @@ def extract_pdf_raw_langchain(pdf_path, output_path, grobid_url="http://localhos
             parser=parser,
         )
         
-        # Load documents - this returns Document objects
+        # Stream Document objects - each one is written as soon as it arrives
         print("Processing PDF with GROBID...")
-        docs = loader.load()
+        docs = loader.lazy_load()
         
-        if not docs:
+        first_doc = next(docs, None)
+        if first_doc is None:
             print("No documents were extracted.")
             return
         
-        print(f"Successfully extracted {len(docs)} document sections")
         print(f"\n📊 Raw Document Structure:")
-        print(f"   - Type: {type(docs[0])}")
-        print(f"   - Has 'page_content': {hasattr(docs[0], 'page_content')}")
-        print(f"   - Has 'metadata': {hasattr(docs[0], 'metadata')}")
+        print(f"   - Type: {type(first_doc)}")
+        print(f"   - Has 'page_content': {hasattr(first_doc, 'page_content')}")
+        print(f"   - Has 'metadata': {hasattr(first_doc, 'metadata')}")
         
-        # Output raw content - just dump what LangChain gives us
-        with open(output_path, 'w', encoding='utf-8') as output_file:
+        total_docs = 0
+        with open(output_path, 'w', encoding='utf-8') as output_file, \
+                open(jsonl_output_path, 'w', encoding='utf-8') as jsonl_file:
+            # Output raw content - just dump what LangChain gives us
             output_file.write("=" * 80 + "\n")
             output_file.write("RAW LANGCHAIN GROBID OUTPUT (No Custom Formatting)\n")
             output_file.write("=" * 80 + "\n\n")
             
-            for i, doc in enumerate(docs):
+            for doc in chain([first_doc], docs):
+                total_docs += 1
                 output_file.write(f"\n{'='*80}\n")
-                output_file.write(f"DOCUMENT {i+1} of {len(docs)}\n")
+                output_file.write(f"DOCUMENT {total_docs}\n")
                 output_file.write(f"{'='*80}\n\n")
                 
                 # Write the page content (text)
@@ -70,22 +85,16 @@ def extract_pdf_raw_langchain(pdf_path, output_path, grobid_url="http://localhos
                 output_file.write("-" * 80 + "\n")
                 output_file.write(json.dumps(doc.metadata, indent=2))
                 output_file.write("\n\n")
-        
-        # Also create a JSON file with all documents for easier inspection
-        json_output_path = output_path.replace('.txt', '_raw.json')
-        with open(json_output_path, 'w', encoding='utf-8') as json_file:
-            json_data = []
-            for doc in docs:
-                json_data.append({
+                
+                jsonl_file.write(json.dumps({
                     'page_content': doc.page_content,
                     'metadata': doc.metadata
-                })
-            json.dump(json_data, json_file, indent=2, ensure_ascii=False)
+                }, ensure_ascii=False) + "\n")
         
         print(f"\n✅ Raw extraction completed!")
         print(f"📄 Text output saved to: {output_path}")
-        print(f"📄 JSON output saved to: {json_output_path}")
-        print(f"📈 Total documents: {len(docs)}")
+        print(f"📄 JSONL output saved to: {jsonl_output_path}")
+        print(f"📈 Total documents: {total_docs}")
         print(f"\n💡 Note: LangChain's GrobidParser returns TEXT (not XML).")
         print(f"   It internally calls GROBID, parses the XML, and extracts text content.")
 
@@ -121,8 +130,8 @@ if __name__ == "__main__":
     
     print(f"📁 Found PDF file: {pdf_file}")
     
-    # Check GROBID server
-    if not check_grobid_server():
+    # Check GROBID server (not needed when the TEI is already cached)
+    if not CachedGrobidParser(segment_sentences=True).is_cached(pdf_file) and not check_grobid_server():
         print("\n⚠️  Please start GROBID server first.")
         exit(1)
     
@@ -1,8 +1,18 @@
 import os
+import json
+import time
 import shutil
+import argparse
 import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
 from grobid_client.grobid_client import GrobidClient
 
+from tei_cache import TEICache
+from build_manifest import BuildManifest
+
 # --- Configuration ---
 # The PDF file you want to process (can be relative or absolute path)
 PDF_FILE_PATH = "/Users/aristotle_co/Documents/Boussard Lab/Project/adult-care-guidelines/2014DeliriumGuidelineEvidence.pdf"
@@ -10,14 +20,24 @@ PDF_FILE_PATH = "/Users/aristotle_co/Documents/Boussard Lab/Project/adult-care-g
 SERVICE_NAME = "processFulltextDocument" 
 # The directory to save the structured output
 OUTPUT_DIRECTORY = "/Users/aristotle_co/Documents/Boussard Lab/Project/adult-care-guideline-output"
+# The GROBID server used by the batch mode
+GROBID_URL = "http://localhost:8070"
+# Number of PDFs in flight at once; keep it at or below the server's concurrency setting
+BATCH_CONCURRENCY = 4
+# Per-request timeout (seconds) and retries when GROBID answers 503 (all workers busy)
+REQUEST_TIMEOUT = 300
+MAX_RETRIES = 5
+RETRY_WAIT = 2.0
 
-def process_single_pdf_to_xml(pdf_path, output_dir):
+def process_single_pdf_to_xml(pdf_path, output_dir, use_cache=True, grobid_url=GROBID_URL):
     """
     Processes a single PDF file using GROBID's fulltext service and outputs XML.
     
     Args:
         pdf_path (str): Full path to the PDF file to process
         output_dir (str): Directory where the XML output should be saved
+        use_cache (bool): Reuse TEI from the shared cache instead of calling GROBID again
+        grobid_url (str): URL of the GROBID server
     """
     print("Starting GROBID processing...")
     
@@ -34,20 +54,31 @@ def process_single_pdf_to_xml(pdf_path, output_dir):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
-    # 3. Initialize the GROBID client
+    pdf_filename = os.path.basename(pdf_path)
+    expected_xml_filename = pdf_filename.replace('.pdf', '.grobid.tei.xml')
+    final_output_path = os.path.join(output_dir, expected_xml_filename)
+    
+    # 3. Serve the TEI from the shared cache when this PDF was already processed
+    tei_cache = TEICache(enabled=use_cache)
+    cached_tei = tei_cache.get(pdf_path, SERVICE_NAME, fulltext_tei_options())
+    if cached_tei is not None:
+        with open(final_output_path, 'w', encoding='utf-8') as f:
+            f.write(cached_tei)
+        print(f"\n✅ TEI cache hit, GROBID not contacted.")
+        print(f"📄 XML output saved to: {final_output_path}")
+        return final_output_path
+    
+    # 4. Initialize the GROBID client
     try:
-        client = GrobidClient(config_path=None) 
+        client = GrobidClient(grobid_server=grobid_url, config_path=None) 
     except Exception as e:
-        print(f"❌ Error initializing GrobidClient. Ensure the server is running on http://localhost:8070.")
+        print(f"❌ Error initializing GrobidClient. Ensure the server is running on {grobid_url}.")
         print(f"   Details: {e}")
         return None
     
-    # 4. Create a temporary directory with only the PDF file we want to process
+    # 5. Create a temporary directory with only the PDF file we want to process
     # This ensures GROBID only processes the specific file
     temp_dir = None
-    pdf_filename = os.path.basename(pdf_path)
-    expected_xml_filename = pdf_filename.replace('.pdf', '.grobid.tei.xml')
-    final_output_path = os.path.join(output_dir, expected_xml_filename)
     
     try:
         temp_dir = tempfile.mkdtemp(prefix="grobid_single_file_")
@@ -57,7 +88,7 @@ def process_single_pdf_to_xml(pdf_path, output_dir):
         print(f"📋 Creating temporary directory for single-file processing...")
         shutil.copy2(pdf_path, temp_pdf_path)
         
-        # 5. Process the document from the temporary directory
+        # 6. Process the document from the temporary directory
         print(f"🔄 Processing PDF with GROBID fulltext service...")
         client.process(
             service=SERVICE_NAME,
@@ -69,7 +100,7 @@ def process_single_pdf_to_xml(pdf_path, output_dir):
             verbose=True  # More detailed processing information
         )
         
-        # 6. Find the output XML file
+        # 7. Find the output XML file
         # GROBID might create it in a subdirectory, so we need to search for it
         actual_output = None
         for root, dirs, files in os.walk(output_dir):
@@ -96,6 +127,9 @@ def process_single_pdf_to_xml(pdf_path, output_dir):
                 except:
                     pass  # Directory not empty or doesn't exist
             
+            with open(final_output_path, 'r', encoding='utf-8') as f:
+                tei_cache.put(pdf_path, SERVICE_NAME, fulltext_tei_options(), f.read())
+            
             print(f"\n✅ Processing complete!")
             print(f"📄 XML output saved to: {final_output_path}")
             return final_output_path
@@ -120,16 +154,231 @@ def process_single_pdf_to_xml(pdf_path, output_dir):
         return None
         
     finally:
-        # 7. Clean up temporary directory
+        # 8. Clean up temporary directory
         if temp_dir and os.path.exists(temp_dir):
             print(f"🧹 Cleaning up temporary directory...")
             shutil.rmtree(temp_dir)
 
+def collect_pdf_paths(input_path):
+    """
+    Resolve the PDFs of a batch from a directory or a manifest file.
+    
+    Args:
+        input_path (str): Directory containing PDFs, or a text manifest with one
+            PDF path per line (blank lines and lines starting with '#' are ignored)
+        
+    Returns:
+        list: Sorted list of PDF paths
+    """
+    if os.path.isdir(input_path):
+        return sorted(
+            os.path.join(input_path, name)
+            for name in os.listdir(input_path)
+            if name.lower().endswith('.pdf')
+        )
+    
+    base_dir = os.path.dirname(os.path.abspath(input_path))
+    pdf_paths = []
+    with open(input_path, 'r', encoding='utf-8') as manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            # Relative manifest entries are resolved against the manifest location
+            pdf_paths.append(line if os.path.isabs(line) else os.path.join(base_dir, line))
+    return pdf_paths
+
+def tei_output_path(pdf_path, output_dir):
+    """Deterministic TEI output path for a PDF: <output_dir>/<stem>.grobid.tei.xml"""
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(output_dir, f"{stem}.grobid.tei.xml")
+
+def fulltext_tei_options(consolidate_header=True):
+    """Form fields sent to GROBID; also part of the TEI cache key."""
+    return {'consolidateHeader': '1' if consolidate_header else '0'}
+
+def request_fulltext_tei(pdf_path, grobid_url=GROBID_URL, service=SERVICE_NAME,
+                         consolidate_header=True, timeout=REQUEST_TIMEOUT,
+                         max_retries=MAX_RETRIES, retry_wait=RETRY_WAIT, session=None):
+    """
+    Send one PDF to the GROBID REST API and return the TEI XML text.
+    
+    GROBID answers 503 when all of its workers are busy; those requests are
+    retried with a linear back-off instead of being reported as failures.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        grobid_url (str): URL of the GROBID server
+        service (str): GROBID service name
+        consolidate_header (bool): Ask GROBID to consolidate header metadata
+        timeout (int): Per-request timeout in seconds
+        max_retries (int): Maximum number of retries on 503
+        retry_wait (float): Base wait between retries in seconds
+        session: Optional requests.Session to reuse connections
+        
+    Returns:
+        str: TEI XML returned by GROBID
+    """
+    http = session or requests
+    url = f"{grobid_url}/api/{service}"
+    data = fulltext_tei_options(consolidate_header)
+    
+    for attempt in range(max_retries + 1):
+        with open(pdf_path, 'rb') as pdf:
+            files = {'input': (os.path.basename(pdf_path), pdf, 'application/pdf')}
+            response = http.post(url, files=files, data=data, timeout=timeout)
+        
+        if response.status_code == 200:
+            return response.text
+        if response.status_code == 503 and attempt < max_retries:
+            time.sleep(retry_wait * (attempt + 1))
+            continue
+        raise RuntimeError(f"GROBID returned HTTP {response.status_code}: {response.text[:200]}")
+
+def _process_batch_item(pdf_path, output_path, grobid_url, session, consolidate_header, tei_cache):
+    """Process one PDF of a batch and write its TEI to the final output path."""
+    start = time.perf_counter()
+    tei_xml, cache_hit = tei_cache.fetch(
+        pdf_path, SERVICE_NAME, fulltext_tei_options(consolidate_header),
+        lambda: request_fulltext_tei(pdf_path, grobid_url, consolidate_header=consolidate_header,
+                                     session=session),
+    )
+    
+    # Write next to the final file and rename, so an interrupted batch never
+    # leaves a truncated TEI at a path that a later run would skip
+    partial_path = output_path + ".part"
+    with open(partial_path, 'w', encoding='utf-8') as f:
+        f.write(tei_xml)
+    os.replace(partial_path, output_path)
+    return time.perf_counter() - start, cache_hit
+
+def process_pdf_batch(input_path, output_dir, grobid_url=GROBID_URL, concurrency=BATCH_CONCURRENCY,
+                      force=False, consolidate_header=True, use_cache=True, manifest=None):
+    """
+    Processes a directory or manifest of PDFs with GROBID's fulltext service.
+    
+    Up to `concurrency` requests are kept in flight against the server, and each
+    TEI result is written directly to its deterministic output path (see
+    `tei_output_path`), so no temporary copies or output directory scans are needed.
+    
+    Args:
+        input_path (str): Directory of PDFs or manifest file (see `collect_pdf_paths`)
+        output_dir (str): Directory where the XML outputs should be saved
+        grobid_url (str): URL of the GROBID server
+        concurrency (int): Maximum number of concurrent GROBID requests
+        force (bool): Re-process PDFs whose output already exists
+        consolidate_header (bool): Ask GROBID to consolidate header metadata
+        use_cache (bool): Reuse TEI from the shared cache instead of calling GROBID again
+        manifest: Optional BuildManifest; an existing output is then only skipped
+            when it was built from the same PDF bytes and options, and every
+            new output is recorded in it
+        
+    Returns:
+        list: One dict per PDF with 'pdf', 'output', 'status' ('ok', 'skipped'
+            or 'failed'), 'seconds', 'cached' and 'error'
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    pdf_paths = collect_pdf_paths(input_path)
+    print(f"📚 Batch of {len(pdf_paths)} PDFs, {concurrency} concurrent requests to {grobid_url}")
+    
+    options = fulltext_tei_options(consolidate_header)
+    results = []
+    pending = {}
+    claimed_outputs = set()
+    
+    for pdf_path in pdf_paths:
+        output_path = tei_output_path(pdf_path, output_dir)
+        result = {'pdf': pdf_path, 'output': output_path, 'status': None, 'seconds': 0.0,
+                  'cached': False, 'error': None}
+        results.append(result)
+        
+        if not os.path.exists(pdf_path):
+            result.update(status='failed', error='PDF file not found')
+        elif output_path in claimed_outputs:
+            result.update(status='failed', error='Another PDF in the batch has the same output name')
+        elif not force and (manifest.is_current(output_path, pdf_path, 'grobid_fulltext', options)
+                            if manifest is not None else os.path.exists(output_path)):
+            result['status'] = 'skipped'
+            claimed_outputs.add(output_path)
+        else:
+            pending[pdf_path] = result
+            claimed_outputs.add(output_path)
+    
+    tei_cache = TEICache(enabled=use_cache)
+    batch_start = time.perf_counter()
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # One pooled connection per worker (urllib3 keeps 10 by default)
+        adapter = HTTPAdapter(pool_maxsize=concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        futures = {
+            executor.submit(_process_batch_item, pdf_path, result['output'], grobid_url,
+                            session, consolidate_header, tei_cache): result
+            for pdf_path, result in pending.items()
+        }
+        for future in as_completed(futures):
+            result = futures[future]
+            try:
+                result['seconds'], result['cached'] = future.result()
+                result['status'] = 'ok'
+                if manifest is not None:
+                    manifest.record(result['output'], result['pdf'], 'grobid_fulltext', options)
+                source = "cache" if result['cached'] else f"{result['seconds']:.1f}s"
+                print(f"   ✅ {os.path.basename(result['pdf'])} ({source})")
+            except Exception as e:
+                result['status'] = 'failed'
+                result['error'] = str(e)
+                print(f"   ❌ {os.path.basename(result['pdf'])}: {e}")
+    wall_time = time.perf_counter() - batch_start
+    if manifest is not None:
+        manifest.save()
+    
+    processed = sum(1 for r in results if r['status'] == 'ok')
+    skipped = sum(1 for r in results if r['status'] == 'skipped')
+    failed = [r for r in results if r['status'] == 'failed']
+    
+    cached = sum(1 for r in results if r['cached'])
+    print(f"\n📈 Processed: {processed} ({cached} from TEI cache), skipped (up to date): {skipped}, "
+          f"failed: {len(failed)}")
+    if processed:
+        print(f"⏱️  Wall time: {wall_time:.1f}s ({processed / wall_time:.2f} PDFs/s)")
+    for r in failed:
+        print(f"   ❌ {r['pdf']}: {r['error']}")
+    
+    report_path = os.path.join(output_dir, "grobid_batch_report.json")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({'grobid_url': grobid_url, 'concurrency': concurrency,
+                   'wall_seconds': wall_time, 'files': results}, f, indent=2, ensure_ascii=False)
+    print(f"📄 Batch report saved to: {report_path}")
+    
+    return results
+
 if __name__ == "__main__":
-    result = process_single_pdf_to_xml(PDF_FILE_PATH, OUTPUT_DIRECTORY)
+    arg_parser = argparse.ArgumentParser(description='Convert PDFs to TEI XML with GROBID')
+    arg_parser.add_argument('--batch', metavar='INPUT',
+                            help='Directory of PDFs or manifest file (one PDF path per line)')
+    arg_parser.add_argument('--output-dir', default=OUTPUT_DIRECTORY, help='Output directory')
+    arg_parser.add_argument('--grobid-url', default=GROBID_URL, help='GROBID server URL')
+    arg_parser.add_argument('--concurrency', type=int, default=BATCH_CONCURRENCY,
+                            help='Maximum number of concurrent GROBID requests')
+    arg_parser.add_argument('--force', action='store_true', help='Re-process existing outputs')
+    arg_parser.add_argument('--no-cache', action='store_true', help='Always call GROBID, ignoring the TEI cache')
+    arg_parser.add_argument('--manifest', metavar='PATH',
+                            help='Build manifest: only re-process PDFs that are new or changed since the last run')
+    args = arg_parser.parse_args()
     
-    if result:
-        print("\n✅ Success! You can now use an XML parsing library (like ElementTree or BeautifulSoup)")
-        print("   to extract the text and formatting from the XML file.")
+    if args.batch:
+        batch_results = process_pdf_batch(args.batch, args.output_dir, args.grobid_url,
+                                          args.concurrency, args.force,
+                                          use_cache=not args.no_cache,
+                                          manifest=BuildManifest(args.manifest) if args.manifest else None)
+        if any(r['status'] == 'failed' for r in batch_results):
+            exit(1)
     else:
-        print("\n❌ Processing failed. Please check the error messages above.")
+        result = process_single_pdf_to_xml(PDF_FILE_PATH, args.output_dir, use_cache=not args.no_cache)
+        
+        if result:
+            print("\n✅ Success! You can now use an XML parsing library (like ElementTree or BeautifulSoup)")
+            print("   to extract the text and formatting from the XML file.")
+        else:
+            print("\n❌ Processing failed. Please check the error messages above.")
@@ -1,13 +1,99 @@
 import PyPDF2
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
-def extract_pdf_to_text(pdf_path, output_path):
+from text_writer import write_text_stream
+
+# Page ranges handed to each worker in parallel mode: several per worker so a
+# few slow (image-heavy) pages do not leave the other workers idle
+TASKS_PER_WORKER = 4
+
+def page_separator(page_num):
+    """Separator written after the text of page page_num."""
+    return "\n\n" + "="*50 + f" PAGE {page_num} " + "="*50 + "\n\n"
+
+def iter_page_texts(reader, quiet=False):
+    """
+    Extract the text of every page, one page at a time.
+    
+    Args:
+        reader: PyPDF2.PdfReader of the input PDF
+        quiet (bool): Skip the per-page progress lines
+        
+    Yields:
+        str: Page text followed by its PAGE n separator
+    """
+    total_pages = len(reader.pages)
+    for page_num, page in enumerate(reader.pages, 1):
+        if not quiet:
+            print(f"Processing page {page_num}/{total_pages}...")
+        page_text = page.extract_text()
+        yield page_text + page_separator(page_num)
+
+def page_ranges(total_pages, workers):
+    """
+    Split pages into contiguous (start, stop) ranges for the process pool.
+    
+    Args:
+        total_pages (int): Number of pages in the PDF
+        workers (int): Number of worker processes
+        
+    Returns:
+        list: (start, stop) 0-based page index ranges, in page order
+    """
+    size = max(1, -(-total_pages // (workers * TASKS_PER_WORKER)))
+    return [(start, min(start + size, total_pages)) for start in range(0, total_pages, size)]
+
+def extract_page_range(pdf_path, start, stop):
+    """
+    Extract pages [start, stop) with a PdfReader owned by this process.
+    
+    Args:
+        pdf_path (str): Path to the input PDF file
+        start (int): First page index (0-based)
+        stop (int): Page index after the last page
+        
+    Returns:
+        list: Page texts followed by their PAGE n separators
+    """
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [reader.pages[i].extract_text() + page_separator(i + 1) for i in range(start, stop)]
+
+def iter_page_texts_parallel(pdf_path, total_pages, workers, quiet=False):
+    """
+    Extract pages in a process pool, yielding them in page order.
+    
+    Args:
+        pdf_path (str): Path to the input PDF file
+        total_pages (int): Number of pages in the PDF
+        workers (int): Number of worker processes
+        quiet (bool): Skip the per-range progress lines
+        
+    Yields:
+        str: Page text followed by its PAGE n separator
+    """
+    ranges = page_ranges(total_pages, workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(extract_page_range, pdf_path, start, stop) for start, stop in ranges]
+        # Ranges are consumed in submission order, so pages come out in order
+        # while later ranges are still being extracted
+        for (start, stop), future in zip(ranges, futures):
+            page_texts = future.result()
+            if not quiet:
+                print(f"Processed pages {start + 1}-{stop}/{total_pages}")
+            yield from page_texts
+
+def extract_pdf_to_text(pdf_path, output_path, workers=1, quiet=False):
     """
     Extract text from a PDF file and save it to a text file.
     
     Args:
         pdf_path (str): Path to the input PDF file
         output_path (str): Path to the output text file
+        workers (int): Worker processes for page extraction (1 = serial)
+        quiet (bool): Skip the per-page progress lines
     """
     try:
         # Open the PDF file in binary read mode
@@ -15,26 +101,20 @@ def extract_pdf_to_text(pdf_path, output_path):
             # Create a PDF reader object
             reader = PyPDF2.PdfReader(file)
             
-            # Initialize empty string to store extracted text
-            raw_text = ""
-            
             # Get total number of pages
             total_pages = len(reader.pages)
             print(f"Total pages in PDF: {total_pages}")
             
-            # Iterate through every page and extract text
-            for page_num, page in enumerate(reader.pages, 1):
-                print(f"Processing page {page_num}/{total_pages}...")
-                page_text = page.extract_text()
-                raw_text += page_text + "\n\n" + "="*50 + f" PAGE {page_num} " + "="*50 + "\n\n"
-            
-            # Save the aggregated text to a new file with UTF-8 encoding
-            with open(output_path, 'w', encoding='utf-8') as output_file:
-                output_file.write(raw_text)
+            # Extract every page and stream it to the output file (UTF-8)
+            if workers > 1 and total_pages > 1:
+                pages = iter_page_texts_parallel(pdf_path, total_pages, min(workers, total_pages), quiet)
+            else:
+                pages = iter_page_texts(reader, quiet)
+            total_chars = write_text_stream(pages, output_path)
             
             print(f"Text extraction completed successfully!")
             print(f"Output saved to: {output_path}")
-            print(f"Total characters extracted: {len(raw_text)}")
+            print(f"Total characters extracted: {total_chars}")
             
     except FileNotFoundError:
         print(f"Error: PDF file '{pdf_path}' not found.")
@@ -43,14 +123,22 @@ def extract_pdf_to_text(pdf_path, output_path):
 
 
 if __name__ == "__main__":
-    # Define file paths
-    pdf_file = "EASL-recommendations-on-treatment-of-hepatitis-C.pdf"
-    output_file = "raw_guideline.txt"
+    parser = argparse.ArgumentParser(description='Extract PDF text with PyPDF2')
+    parser.add_argument('pdf_file', nargs='?', default="EASL-recommendations-on-treatment-of-hepatitis-C.pdf",
+                        help='Input PDF file')
+    parser.add_argument('output_file', nargs='?', default="raw_guideline.txt", help='Output text file')
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f'Worker processes for page extraction (this machine has {os.cpu_count()} cores)')
+    parser.add_argument('--quiet', action='store_true', help='No per-page progress lines')
+    args = parser.parse_args()
+    
+    pdf_file = args.pdf_file
+    output_file = args.output_file
     
     # Check if PDF file exists
     if os.path.exists(pdf_file):
         print(f"Found PDF file: {pdf_file}")
-        extract_pdf_to_text(pdf_file, output_file)
+        extract_pdf_to_text(pdf_file, output_file, workers=args.workers, quiet=args.quiet)
     else:
         print(f"PDF file '{pdf_file}' not found in current directory.")
         print("Available files:")
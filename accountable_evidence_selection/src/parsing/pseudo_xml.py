@@ -1,6 +1,8 @@
 import os
 from lxml import etree as ET
 
+from tei_stream import should_stream, stream_pseudo_xml
+
 # --- Configuration ---
 INPUT_XML_FILE = "data/grobid_xml/adult_care/surgery-and-opioids-2021_4.grobid.tei.xml"
 OUTPUT_TEXT_FILE = "data/pseudo_xml/surgery-and-opioids-2021_4.txt"
@@ -76,8 +78,15 @@ def save_file(content, output_path):
 if __name__ == "__main__":
     # Update this path to where your XML file lives
     xml_input_path = os.path.join(os.getcwd(), INPUT_XML_FILE) 
-    final_content = extract_clean_pseudo_xml(xml_input_path)
-    if final_content and not final_content.startswith("Error:"):
-        save_file(final_content, OUTPUT_TEXT_FILE)
+    if should_stream(xml_input_path):
+        # Large TEI: single streaming pass, noisy subtrees are skipped while
+        # parsing (same output as extract_clean_pseudo_xml, flat memory)
+        total_chars = stream_pseudo_xml(xml_input_path, OUTPUT_TEXT_FILE)
+        if total_chars is not None:
+            print(f"✅ Saved cleaned pseudo-XML to: {OUTPUT_TEXT_FILE}")
     else:
-        print(final_content)
\ No newline at end of file
+        final_content = extract_clean_pseudo_xml(xml_input_path)
+        if final_content and not final_content.startswith("Error:"):
+            save_file(final_content, OUTPUT_TEXT_FILE)
+        else:
+            print(final_content)
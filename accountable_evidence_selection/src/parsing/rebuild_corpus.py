@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Incremental rebuild of the parsed guideline corpus.
+
+1. (optional) PDFs -> results/grobid_xml/<subdir>/ with the GROBID batch client
+2. results/grobid_xml/** -> results/xml_to_txt_output and results/pseudo_xml
+
+Both steps consult results/parsing_manifest.json (see build_manifest), so only
+guidelines whose PDF or TEI is new or changed are reprocessed; adding one
+guideline to the corpus touches only that guideline's outputs.
+
+Usage:
+    python rebuild_corpus.py
+    python rebuild_corpus.py --pdfs ~/guidelines/adult_care --tei-subdir adult_care
+"""
+
+import os
+import time
+import argparse
+
+from build_manifest import BuildManifest, MANIFEST_FILE
+from emit_tei_corpus import emit_tei_corpus, GROBID_XML_DIR, STRUCTURED_TXT_DIR, PSEUDO_XML_DIR, RAG_CHUNKS_FILE
+
+def rebuild_corpus(pdf_input=None, tei_subdir="", formats=('structured', 'pseudo'),
+                   manifest_path=MANIFEST_FILE, grobid_url=None, force=False):
+    """
+    Bring the TEI and text outputs up to date with their inputs.
+
+    Args:
+        pdf_input (str): Directory or manifest of PDFs to run through GROBID
+            (None to only refresh the TEI-derived outputs)
+        tei_subdir (str): Subfolder of results/grobid_xml for the new TEI files
+        formats (iterable): TEI-derived formats to refresh ('structured', 'pseudo', 'rag')
+        manifest_path (str): Build manifest file
+        grobid_url (str): GROBID server URL (default: the batch client's)
+        force (bool): Rebuild everything, ignoring the manifest
+
+    Returns:
+        dict: 'grobid' (batch results or None) and 'tei' (per-format totals)
+    """
+    manifest = BuildManifest(manifest_path)
+    if force:
+        manifest.entries.clear()
+    start = time.perf_counter()
+
+    grobid_results = None
+    if pdf_input:
+        # Imported here so refreshing the text outputs does not need the GROBID client
+        from pdf_to_text_grobid_fulltext import process_pdf_batch, GROBID_URL
+        print("🔄 Step 1: PDFs -> GROBID TEI")
+        grobid_results = process_pdf_batch(pdf_input, os.path.join(GROBID_XML_DIR, tei_subdir),
+                                           grobid_url or GROBID_URL, manifest=manifest)
+
+    print("\n🔄 Step 2: GROBID TEI -> structured text / pseudo-XML")
+    tei_totals = emit_tei_corpus(GROBID_XML_DIR, formats, STRUCTURED_TXT_DIR, PSEUDO_XML_DIR,
+                                 RAG_CHUNKS_FILE, manifest)
+
+    removed = manifest.prune()
+    manifest.save()
+    if removed:
+        print(f"🧹 Dropped {removed} manifest entries for deleted outputs")
+    print(f"\n✅ Corpus rebuild finished in {time.perf_counter() - start:.1f}s")
+    print(f"📄 Manifest: {manifest_path}")
+    return {'grobid': grobid_results, 'tei': tei_totals}
+
+def main():
+    parser = argparse.ArgumentParser(description='Reprocess only new or changed guidelines')
+    parser.add_argument('--pdfs', metavar='INPUT', help='Directory or manifest of PDFs to (re)run through GROBID')
+    parser.add_argument('--tei-subdir', default="", help='Subfolder of results/grobid_xml for the TEI output')
+    parser.add_argument('--formats', nargs='+', choices=['structured', 'pseudo', 'rag'],
+                        default=['structured', 'pseudo'], help='TEI-derived outputs to refresh')
+    parser.add_argument('--manifest', default=MANIFEST_FILE, help='Build manifest file')
+    parser.add_argument('--grobid-url', help='GROBID server URL')
+    parser.add_argument('--force', action='store_true', help='Rebuild everything')
+    args = parser.parse_args()
+
+    results = rebuild_corpus(args.pdfs, args.tei_subdir, args.formats, args.manifest,
+                             args.grobid_url, args.force)
+    if results['grobid'] and any(r['status'] == 'failed' for r in results['grobid']):
+        exit(1)
+
+if __name__ == "__main__":
+    main()
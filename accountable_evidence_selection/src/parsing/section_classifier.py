@@ -0,0 +1,156 @@
+"""
+Compiled, batched section classification for GROBID/LangChain fragments.
+
+`SectionClassifier` gives the same answers as `determine_section_type`,
+`should_include_content`, `is_table_content`, `is_figure_content` and
+`is_purely_tabular` in pdf_to_text_grobid_LangChain.py, but:
+- the table and figure indicators are each one precompiled alternation
+  instead of a loop of uncompiled re.search calls,
+- line statistics are only computed for table/figure fragments, and then in a
+  single pass over the lines,
+- cheap substring checks ('|', 'fig', '[') settle most fragments before any
+  regex runs,
+- lowercased section titles are memoized (thousands of sentence fragments
+  share a handful of titles), and fragments longer than their title are
+  classified without lowercasing them at all.
+
+See benchmarks/benchmark_section_classifier.py for the speedup on the TEI
+files in results/grobid_xml.
+"""
+
+import re
+from collections import namedtuple
+
+# (section_type, include): include mirrors should_include_content
+FragmentClass = namedtuple('FragmentClass', ['section_type', 'include'])
+
+# Any of the is_table_content indicators. r'\|\s*' matches every '|', which
+# also covers r'\s+\|\s+' and the "more than 30% of lines have pipes" check.
+TABLE_PATTERN = re.compile(
+    r'\|'
+    r'|Table\s+\d+'
+    r'|^\s*\d+\s+\d+\s+\d+'
+    r'|^\s*[A-Z]\s+[A-Z]\s+[A-Z]',
+    re.MULTILINE,
+)
+
+FIGURE_PATTERN = re.compile(
+    r'Figure\s+\d+'
+    r'|Fig\.\s+\d+'
+    r'|\[(?:Figure|Image|Graph|Chart)',
+    re.IGNORECASE,
+)
+
+LEADING_DIGIT_PATTERN = re.compile(r'\s*\d')
+
+HEADER = FragmentClass('header', True)
+PARAGRAPH = FragmentClass('paragraph', True)
+
+class SectionClassifier:
+    """Classify LangChain GROBID fragments into header/paragraph/table/figure."""
+
+    def __init__(self, min_table_chars=50, tabular_ratio=0.7):
+        self.min_table_chars = min_table_chars
+        self.tabular_ratio = tabular_ratio
+        self._lowered_titles = {}
+
+    def _lower_title(self, section_title):
+        lowered = self._lowered_titles.get(section_title)
+        if lowered is None:
+            lowered = self._lowered_titles[section_title] = section_title.lower()
+        return lowered
+
+    def _is_header(self, section_title, content):
+        stripped = content.strip()
+        if len(stripped) >= 200:
+            return False
+        lowered_title = self._lower_title(section_title)
+        # An ASCII fragment keeps its length when lowercased, so one longer
+        # than the title cannot be a substring of it
+        if len(stripped) > len(lowered_title) and stripped.isascii():
+            return False
+        return stripped.lower() in lowered_title
+
+    def section_type(self, metadata, content):
+        """Same result as determine_section_type(metadata, content)."""
+        section_title = metadata.get('section_title', '')
+        if section_title and section_title != 'None':
+            return 'header' if self._is_header(section_title, content) else 'paragraph'
+
+        if self.is_table(content):
+            return 'table'
+        if self.is_figure(content):
+            return 'figure'
+        return 'paragraph'
+
+    @staticmethod
+    def is_table(content):
+        """Same result as is_table_content(content)."""
+        return '|' in content or TABLE_PATTERN.search(content) is not None
+
+    @staticmethod
+    def is_figure(content):
+        """Same result as is_figure_content(content)."""
+        # Every indicator contains 'fig' or '['; the shortcut is only taken for
+        # ASCII text, where lower() and IGNORECASE agree
+        if content.isascii() and '[' not in content and 'fig' not in content.lower():
+            return False
+        return FIGURE_PATTERN.search(content) is not None
+
+    def is_purely_tabular(self, content):
+        """Same result as is_purely_tabular(content), in one pass over the lines."""
+        tabular_lines = 0
+        total_lines = 0
+        for line in content.split('\n'):
+            if '|' in line:
+                tabular_lines += 1
+            if LEADING_DIGIT_PATTERN.match(line):
+                tabular_lines += 1
+            if line and not line.isspace():
+                total_lines += 1
+
+        if total_lines == 0:
+            return True
+        return tabular_lines / total_lines > self.tabular_ratio
+
+    def classify_one(self, metadata, content):
+        """
+        Classify a single fragment.
+
+        Args:
+            metadata: Fragment metadata (dict)
+            content: Fragment text
+
+        Returns:
+            FragmentClass: (section_type, include)
+        """
+        section_title = metadata.get('section_title', '')
+        if section_title and section_title != 'None':
+            return HEADER if self._is_header(section_title, content) else PARAGRAPH
+
+        section_type = self.section_type(metadata, content)
+        if section_type == 'paragraph':
+            return PARAGRAPH
+        include = (len(content.strip()) > self.min_table_chars
+                   and not self.is_purely_tabular(content))
+        return FragmentClass(section_type, include)
+
+    def classify(self, fragments):
+        """
+        Classify a batch of fragments.
+
+        Args:
+            fragments: Iterable of LangChain Documents or (metadata, content) pairs
+
+        Returns:
+            list: One FragmentClass per fragment, in input order
+        """
+        classify_one = self.classify_one
+        results = []
+        for fragment in fragments:
+            if isinstance(fragment, tuple):
+                metadata, content = fragment
+            else:
+                metadata, content = fragment.metadata, fragment.page_content
+            results.append(classify_one(metadata, content))
+        return results
@@ -0,0 +1,139 @@
+"""
+Content-addressed cache for GROBID TEI output.
+
+Every GROBID-based parser in this folder (the full-text client and both
+LangChain scripts) consults this cache before contacting the server. Entries
+are keyed by the SHA-256 of the PDF bytes plus the GROBID service and request
+options, so re-running a parser on an unchanged PDF returns the TEI from disk
+and a changed PDF (or a different set of options) always goes back to GROBID.
+
+The cache lives in ~/.cache/grobid_tei by default; set GROBID_TEI_CACHE_DIR to
+move it. Deleting the directory is always safe.
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+TEI_CACHE_DIR = os.environ.get(
+    "GROBID_TEI_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "grobid_tei"),
+)
+
+# Form fields sent by LangChain's GrobidParser (see CachedGrobidParser)
+LANGCHAIN_TEI_OPTIONS = {
+    'generateIDs': '1',
+    'consolidateHeader': '1',
+    'segmentSentences': '1',
+    'teiCoordinates': ['head', 's'],
+}
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Return the hex SHA-256 digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def tei_cache_key(pdf_sha256, service, options):
+    """
+    Build the cache key for one PDF and one set of GROBID options.
+
+    Args:
+        pdf_sha256 (str): SHA-256 of the PDF bytes
+        service (str): GROBID service name (e.g. 'processFulltextDocument')
+        options (dict): Form fields sent to GROBID
+
+    Returns:
+        str: Hex digest identifying the TEI output
+    """
+    payload = json.dumps(
+        {'pdf': pdf_sha256, 'service': service, 'options': options},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class TEICache:
+    """On-disk TEI store shared by all GROBID-based parsers."""
+
+    def __init__(self, cache_dir=TEI_CACHE_DIR, enabled=True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        # PDF hashes computed during this run, keyed by (path, size, mtime)
+        self._pdf_hashes = {}
+
+    def key_for(self, pdf_path, service, options):
+        """Return the cache key of a PDF for the given service and options."""
+        stat = os.stat(pdf_path)
+        file_id = (os.path.abspath(pdf_path), stat.st_size, stat.st_mtime_ns)
+        if file_id not in self._pdf_hashes:
+            self._pdf_hashes[file_id] = file_sha256(pdf_path)
+        return tei_cache_key(self._pdf_hashes[file_id], service, options)
+
+    def path_for(self, key):
+        """Return the file path of a cache entry (two-level fan-out)."""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.tei.xml")
+
+    def has(self, pdf_path, service, options):
+        """Check whether the TEI for a PDF is already cached."""
+        if not self.enabled:
+            return False
+        return os.path.exists(self.path_for(self.key_for(pdf_path, service, options)))
+
+    def get(self, pdf_path, service, options):
+        """
+        Look up the TEI for a PDF.
+
+        Returns:
+            str: Cached TEI XML, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        entry_path = self.path_for(self.key_for(pdf_path, service, options))
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, pdf_path, service, options, tei_xml):
+        """
+        Store the TEI returned by GROBID for a PDF.
+
+        Returns:
+            str: Path of the cache entry, or None if the cache is disabled
+        """
+        if not self.enabled:
+            return None
+        entry_path = self.path_for(self.key_for(pdf_path, service, options))
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+
+        # Write then rename so concurrent readers never see a partial entry;
+        # the temp name is unique per process and thread
+        partial_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.part"
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            f.write(tei_xml)
+        os.replace(partial_path, entry_path)
+        return entry_path
+
+    def fetch(self, pdf_path, service, options, request_fn):
+        """
+        Return the TEI for a PDF, calling `request_fn()` only on a cache miss.
+
+        Args:
+            pdf_path (str): Path to the PDF file
+            service (str): GROBID service name
+            options (dict): Form fields sent to GROBID
+            request_fn: Zero-argument callable returning the TEI XML from GROBID
+
+        Returns:
+            tuple: (tei_xml, cache_hit)
+        """
+        tei_xml = self.get(pdf_path, service, options)
+        if tei_xml is not None:
+            return tei_xml, True
+        tei_xml = request_fn()
+        self.put(pdf_path, service, options, tei_xml)
+        return tei_xml, False
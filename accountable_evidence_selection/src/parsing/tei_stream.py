@@ -0,0 +1,479 @@
+"""
+Streaming (iterparse-based) TEI conversion.
+
+Single-pass counterparts of `xml_to_structured_txt.extract_and_structure_xml`,
+`pseudo_xml.extract_clean_pseudo_xml` and the `grobid_tei_xml.parse_document_xml`
+text used by the RAG notebook's `chunk_creation`. The TEI file is read once
+with lxml's iterparse and turned into a flat event stream (start tag, text
+piece, end tag) that small handler objects consume; `emit_tei` runs any subset
+of the handlers over the same pass. Each element is cleared as soon
+as its tail text has been delivered, so memory stays flat regardless of the
+document size; only the open ancestors of the current element and the text of
+the paragraph/table being assembled are held at any time.
+
+Output is the same as the tree-based scripts, with one exception: the tail text
+of a <div> is written after the div's content (the tree-based script writes it
+before, at the div's position in document order). GROBID only puts whitespace
+there, so real documents are unaffected.
+
+The event loop runs in Python, so on ordinary guideline TEI (well under a
+megabyte) it is 2-3x slower than lxml's tree parse. The conversion scripts
+therefore stream only files of at least STREAMING_THRESHOLD_BYTES (see
+`should_stream`), where the tree would cost about eight times the file size in
+memory.
+"""
+
+import os
+from lxml import etree as ET
+
+from text_writer import write_text_stream
+
+# Subtrees dropped by the pseudo-XML output (same as pseudo_xml.TAGS_TO_REMOVE)
+PSEUDO_XML_SKIP_TAGS = ('biblStruct', 'note', 'ref')
+
+# TEI files at least this large are converted by streaming instead of a full tree
+STREAMING_THRESHOLD_BYTES = 4 * 1024 * 1024
+
+# '{namespace}name' -> 'name'; a document only uses a few dozen distinct tags
+_LOCAL_NAMES = {}
+
+def _local_name(tag):
+    name = _LOCAL_NAMES.get(tag)
+    if name is None:
+        name = _LOCAL_NAMES[tag] = tag.rsplit('}', 1)[-1]
+    return name
+
+def should_stream(xml_path, threshold=STREAMING_THRESHOLD_BYTES):
+    """True if a TEI file is large enough to be worth the streaming converter."""
+    return os.path.exists(xml_path) and os.path.getsize(xml_path) >= threshold
+
+def iter_tei_events(xml_path):
+    """
+    Stream a TEI file as a flat sequence of events.
+
+    Yields:
+        tuple: ('start', local_name, attrib), ('text', text, None) or
+            ('end', local_name, None), in document order. Text pieces are the
+            same strings `itertext()` would return, including tails.
+    """
+    context = ET.iterparse(xml_path, events=('start', 'end', 'comment', 'pi'),
+                           recover=True, huge_tree=True)
+    prev_event, prev_node = None, None
+
+    for event, node in context:
+        # The text that ends at this event is either the .text of the element
+        # started last or the .tail of the node that ended last
+        if prev_node is not None:
+            piece = prev_node.text if prev_event == 'start' else prev_node.tail
+            if piece:
+                yield 'text', piece, None
+            if prev_event == 'end':
+                # Its tail has been delivered, nothing refers to it any more
+                prev_node.clear()
+                while prev_node.getprevious() is not None:
+                    del prev_node.getparent()[0]
+
+        if event == 'start':
+            yield 'start', _local_name(node.tag), node.attrib
+        elif event == 'end':
+            yield 'end', _local_name(node.tag), None
+        prev_event, prev_node = event, node
+
+    del context
+
+class _TEIHandler:
+    """
+    Base class for event handlers.
+
+    Subclasses implement start/text/end/close and put finished output parts in
+    `self.ready`; the driver drains that list after every event.
+    """
+
+    def __init__(self):
+        self.ready = []
+        self._path = []
+        # Element whose .text would be the next text piece (set on start only)
+        self._direct_text_owner = None
+        self._title_found = False
+        self._body_depth = None  # depth of the first <body>, None before it
+        self._body_seen = False
+
+    def _enter(self, tag):
+        self._path.append(tag)
+        self._direct_text_owner = len(self._path)
+        if tag == 'body' and not self._body_seen:
+            self._body_seen = True
+            self._body_depth = len(self._path)
+
+    def _leave(self, tag):
+        if self._body_depth == len(self._path):
+            self._body_depth = -1  # first body closed; later bodies are ignored
+        self._path.pop()
+        self._direct_text_owner = None
+
+    def _in_body(self):
+        """True for descendants of the first <body> (not the body itself)."""
+        return self._body_depth is not None and self._body_depth > 0 and len(self._path) > self._body_depth
+
+    def _is_title(self):
+        """True for the first titleStmt/title element (like root.find)."""
+        return (not self._title_found and len(self._path) >= 2
+                and self._path[-1] == 'title' and self._path[-2] == 'titleStmt')
+
+    def _take_direct_text(self, text):
+        """Return `text` if it is the .text of the innermost open element."""
+        owner = self._direct_text_owner
+        self._direct_text_owner = None
+        return text if owner == len(self._path) else None
+
+class StructuredTextHandler(_TEIHandler):
+    """Streaming equivalent of xml_to_structured_txt.extract_and_structure_xml."""
+
+    CAPTURE_TAGS = ('head', 'p', 'item', 'table')
+
+    def __init__(self):
+        super().__init__()
+        # Output slots reserved in document order, filled when the element ends
+        self._slots = []
+        self._open = []      # [tag, slot_index, depth, direct_text, text_pieces]
+        self._tables = []    # open tables: list of row dicts
+        self._rows = []      # open rows: {'label': bool, 'cells': [...]}
+        self._cells = []     # open cells: list of text pieces
+        self._div_tail_pending = False
+        self._open_title = False
+
+    def start(self, tag, attrib):
+        self._div_tail_pending = False
+        self._enter(tag)
+        if self._is_title():
+            self._title_found = True
+            self._open_title = True
+        if not self._in_body():
+            return
+
+        if tag in self.CAPTURE_TAGS:
+            self._slots.append(None)
+            self._open.append([tag, len(self._slots) - 1, len(self._path), None, []])
+        elif tag == 'row':
+            row = {'label': attrib.get('role') == 'label', 'cells': []}
+            for table in self._tables:
+                table.append(row)
+            self._rows.append(row)
+        elif tag == 'cell':
+            cell = []
+            for row in self._rows:
+                row['cells'].append(cell)
+            self._cells.append(cell)
+        if tag == 'table':
+            self._tables.append([])
+
+    def text(self, text):
+        direct = self._take_direct_text(text)
+        if self._div_tail_pending:
+            self._div_tail_pending = False
+            if text.strip():
+                self._emit(["\n" + text.strip() + "\n"])
+        if self._open_title:
+            if direct is not None and direct.strip():
+                self._emit([f"# DOCUMENT TITLE: {direct.strip()}\n"])
+            self._open_title = False
+
+        if direct is not None and self._open and self._open[-1][2] == len(self._path):
+            self._open[-1][3] = direct
+        for capture in self._open:
+            capture[4].append(text)
+        for cell in self._cells:
+            cell.append(text)
+
+    def end(self, tag):
+        self._open_title = False
+        self._div_tail_pending = False
+        if self._in_body():
+            if tag in self.CAPTURE_TAGS:
+                self._close_capture(tag)
+            elif tag == 'row':
+                self._rows.pop()
+            elif tag == 'cell':
+                self._cells.pop()
+            elif tag == 'div':
+                self._div_tail_pending = True
+        self._leave(tag)
+
+    def close(self):
+        if not self._body_seen:
+            self._emit(["\nERROR: Could not find main document body (<tei:body>)."])
+
+    def _close_capture(self, tag):
+        _, slot, _, direct, pieces = self._open.pop()
+        direct = (direct or "").strip()
+
+        if tag == 'head':
+            parts = [f"\n\n## SECTION: {direct.upper()}\n"] if direct else []
+        elif tag == 'p':
+            parts = [f"PARAGRAPH: {''.join(pieces).strip()}\n"] if direct else []
+        elif tag == 'item':
+            grade = ""  # Placeholder, as in extract_and_structure_xml
+            parts = [f"* RECOMMENDATION [GRADE {grade}]: {''.join(pieces).strip()}\n"]
+        else:
+            parts = ["\n--- TABLE ---\n", self._format_table(self._tables.pop()), "--- END TABLE ---\n\n"]
+
+        self._slots[slot] = parts
+        if not self._open:
+            for parts in self._slots:
+                self.ready.extend(parts)
+            self._slots = []
+
+    def _emit(self, parts):
+        if self._open:
+            self._slots.append(parts)
+        else:
+            self.ready.extend(parts)
+
+    @staticmethod
+    def _format_table(rows):
+        """Same layout as xml_to_structured_txt.extract_table_content."""
+        header_row = next((row for row in rows if row['label']), rows[0] if rows else None)
+        table_content = []
+
+        if header_row is not None and header_row['cells']:
+            header_text = " | ".join("".join(cell).strip() for cell in header_row['cells'])
+            table_content.append(f"HEADER: {header_text}\n")
+            table_content.append("-" * 80 + "\n")
+
+        for row in rows:
+            if row is header_row or not row['cells']:
+                continue
+            row_text = " | ".join("".join(cell).strip() for cell in row['cells'])
+            if row_text.strip():
+                table_content.append(f"ROW: {row_text}\n")
+
+        return "".join(table_content)
+
+class PseudoXmlHandler(_TEIHandler):
+    """Streaming equivalent of pseudo_xml.extract_clean_pseudo_xml."""
+
+    TAG_LABELS = {
+        'head': ("\n<sectionHeader>", "</sectionHeader>\n"),
+        'p': ("<paragraph>", "</paragraph>\n"),
+        'item': ("<recommendationItem>", "</recommendationItem>\n"),
+        'row': ("<tableRow>", "</tableRow>\n"),
+    }
+
+    def __init__(self, skip_tags=PSEUDO_XML_SKIP_TAGS):
+        super().__init__()
+        self.skip_tags = frozenset(skip_tags)
+        self._skip_depth = 0
+        self._open_title = False
+
+    def start(self, tag, attrib):
+        if self._skip_depth or tag in self.skip_tags:
+            # Skipped subtrees are dropped on the fly (the tree-based script
+            # removes them from the parsed tree first)
+            self._skip_depth += 1
+            self._direct_text_owner = None
+            return
+        self._enter(tag)
+        if self._is_title():
+            self._title_found = True
+            self._open_title = True
+
+    def text(self, text):
+        if self._skip_depth:
+            return
+        direct = self._take_direct_text(text)
+        if direct is None:
+            return
+
+        if self._open_title:
+            self._open_title = False
+            self.ready.append(f"<docTitle>{direct.strip()}</docTitle>\n")
+        elif self._in_body() and self._path[-1] in self.TAG_LABELS and direct.strip():
+            opening, closing = self.TAG_LABELS[self._path[-1]]
+            self.ready.append(f"{opening}{direct.strip()}{closing}")
+
+    def end(self, tag):
+        if self._skip_depth:
+            self._skip_depth -= 1
+            return
+        self._open_title = False
+        self._leave(tag)
+
+    def close(self):
+        pass
+
+class RagTextHandler(_TEIHandler):
+    """
+    Document text used for RAG chunking.
+
+    Same text as the notebook's `chunk_creation` builds from
+    grobid_tei_xml.parse_document_xml: the abstract and the body, each
+    flattened with " ".join(itertext()), separated by a blank line. The whole
+    text is produced as a single part when the document ends.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._abstract = None
+        self._body = None
+        self._capture = None   # pieces of the element being captured
+        self._capture_depth = None
+
+    def start(self, tag, attrib):
+        self._enter(tag)
+        if self._capture is not None or len(self._path) < 2:
+            return
+        parent = self._path[-2]
+        if (tag == 'abstract' and parent == 'profileDesc' and self._abstract is None) or \
+                (tag == 'body' and parent == 'text' and self._body is None):
+            self._capture = []
+            self._capture_depth = len(self._path)
+
+    def text(self, text):
+        if self._capture is not None:
+            self._capture.append(text)
+
+    def end(self, tag):
+        if self._capture is not None and len(self._path) == self._capture_depth:
+            flattened = " ".join(self._capture).strip()
+            if tag == 'abstract':
+                self._abstract = flattened
+            else:
+                self._body = flattened
+            self._capture = None
+        self._leave(tag)
+
+    def close(self):
+        text_parts = [part for part in (self._abstract, self._body) if part]
+        self.ready.append("\n\n".join(text_parts))
+
+def iter_tei_outputs(xml_path, handlers):
+    """
+    Run one or more handlers over a single streaming pass of a TEI file.
+
+    Yields:
+        tuple: (handler_index, output_part) as soon as each part is final
+    """
+    dispatch = [(index, handler, handler.start, handler.text, handler.end, handler.ready)
+                for index, handler in enumerate(handlers)]
+    for event, name, value in iter_tei_events(xml_path):
+        for index, handler, start, text, end, ready in dispatch:
+            if event == 'text':
+                text(name)
+            elif event == 'start':
+                start(name, value)
+            else:
+                end(name)
+            if ready:
+                for part in ready:
+                    yield index, part
+                ready.clear()
+
+    for index, handler in enumerate(handlers):
+        handler.close()
+        for part in handler.ready:
+            yield index, part
+        handler.ready.clear()
+
+def iter_structured_text(xml_path):
+    """Yield the parts of the structured text; join them with "\\n"."""
+    for _, part in iter_tei_outputs(xml_path, [StructuredTextHandler()]):
+        yield part
+
+def iter_pseudo_xml(xml_path, skip_tags=PSEUDO_XML_SKIP_TAGS):
+    """Yield the parts of the pseudo-XML; join them with ""."""
+    for _, part in iter_tei_outputs(xml_path, [PseudoXmlHandler(skip_tags)]):
+        yield part
+
+def stream_structured_text(xml_path, output_path):
+    """
+    Convert a GROBID TEI file to structured text, writing it as it is produced.
+
+    Args:
+        xml_path (str): Path to the TEI XML file
+        output_path (str): Path to the output text file
+
+    Returns:
+        int: Number of characters written, or None if the input is missing
+    """
+    if not os.path.exists(xml_path):
+        print(f"Error: Input file not found at {xml_path}")
+        return None
+    return write_text_stream(iter_structured_text(xml_path), output_path, "\n")
+
+def stream_pseudo_xml(xml_path, output_path, skip_tags=PSEUDO_XML_SKIP_TAGS):
+    """
+    Convert a GROBID TEI file to pseudo-XML, writing it as it is produced.
+
+    Args:
+        xml_path (str): Path to the TEI XML file
+        output_path (str): Path to the output text file
+        skip_tags (tuple): Local names of the subtrees to drop
+
+    Returns:
+        int: Number of characters written, or None if the input is missing
+    """
+    if not os.path.exists(xml_path):
+        print("Error: File not found.")
+        return None
+    return write_text_stream(iter_pseudo_xml(xml_path, skip_tags), output_path, "")
+
+# Output formats of emit_tei: handler factory and separator between parts
+TEI_FORMATS = {
+    'structured': (StructuredTextHandler, "\n"),
+    'pseudo': (PseudoXmlHandler, ""),
+    'rag': (RagTextHandler, ""),
+}
+
+def emit_tei(xml_path, formats=tuple(TEI_FORMATS), output_paths=None):
+    """
+    Produce several output formats from one streaming pass over a TEI file.
+
+    Args:
+        xml_path (str): Path to the TEI XML file
+        formats (iterable): Any subset of 'structured', 'pseudo' and 'rag'
+        output_paths (dict): Optional format -> file path; those formats are
+            written incrementally instead of being returned as strings
+
+    Returns:
+        dict: format -> output text, or number of characters written for the
+            formats that have an output path
+    """
+    formats = list(dict.fromkeys(formats))
+    unknown = [name for name in formats if name not in TEI_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown TEI output format(s): {', '.join(unknown)}")
+    output_paths = output_paths or {}
+
+    handlers = [TEI_FORMATS[name][0]() for name in formats]
+    separators = [TEI_FORMATS[name][1] for name in formats]
+    collected = [[] for _ in formats]
+    files = [None] * len(formats)
+    written = [0] * len(formats)
+    started = [False] * len(formats)
+
+    try:
+        for index, name in enumerate(formats):
+            if name in output_paths:
+                output_dir = os.path.dirname(output_paths[name])
+                if output_dir:
+                    os.makedirs(output_dir, exist_ok=True)
+                files[index] = open(output_paths[name], 'w', encoding='utf-8')
+
+        for index, part in iter_tei_outputs(xml_path, handlers):
+            if started[index] and separators[index]:
+                part = separators[index] + part
+            started[index] = True
+            if files[index] is None:
+                collected[index].append(part)
+            else:
+                files[index].write(part)
+                written[index] += len(part)
+    finally:
+        for f in files:
+            if f is not None:
+                f.close()
+
+    return {
+        name: written[index] if files[index] is not None else "".join(collected[index])
+        for index, name in enumerate(formats)
+    }
@@ -0,0 +1,43 @@
+"""
+Incremental text writer shared by the parsing scripts.
+
+Producers yield the output piece by piece (a page, a section, a TEI element)
+and `write_text_stream` writes each piece as it arrives, so neither the
+producer nor the writer ever holds the whole document. The output is written
+to a temporary file next to the target and renamed at the end, so a failed
+run never leaves a truncated output behind.
+"""
+
+import os
+
+def write_text_stream(parts, output_path, separator=""):
+    """
+    Write an iterable of text pieces to a UTF-8 file.
+
+    Args:
+        parts (iterable): Text pieces, in output order
+        output_path (str): Path to the output text file
+        separator (str): Written between consecutive pieces
+
+    Returns:
+        int: Number of characters written
+    """
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    partial_path = f"{output_path}.{os.getpid()}.part"
+    total_chars = 0
+    try:
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            for i, part in enumerate(parts):
+                if i and separator:
+                    f.write(separator)
+                    total_chars += len(separator)
+                f.write(part)
+                total_chars += len(part)
+        os.replace(partial_path, output_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return total_chars
@@ -1,6 +1,8 @@
 import os
 from lxml import etree as ET
 
+from tei_stream import should_stream, stream_structured_text
+
 # --- Configuration ---
 # IMPORTANT: Replace these paths with your actual file locations
 # Ensure your XML file generated by Grobid is here.
@@ -149,11 +151,17 @@ if __name__ == "__main__":
     # Update this path if the XML file is not in the same directory as this script.
     xml_input_path = os.path.join(os.getcwd(), INPUT_XML_FILE) 
     
-    # Run the extraction
-    final_content = extract_and_structure_xml(xml_input_path)
-    
-    if final_content and not final_content.startswith("Error:"):
-        # Save the content for the LLM prompt
-        save_structured_text(final_content, OUTPUT_TEXT_FILE)
-    elif final_content:
-        print(final_content) # Print the error message
+    if should_stream(xml_input_path):
+        # Large TEI: streaming converter (same output, flat memory)
+        total_chars = stream_structured_text(xml_input_path, OUTPUT_TEXT_FILE)
+        if total_chars is not None:
+            print(f"\n✅ Successfully saved structured context to: {OUTPUT_TEXT_FILE}")
+    else:
+        # Run the extraction
+        final_content = extract_and_structure_xml(xml_input_path)
+
+        if final_content and not final_content.startswith("Error:"):
+            # Save the content for the LLM prompt
+            save_structured_text(final_content, OUTPUT_TEXT_FILE)
+        elif final_content:
+            print(final_content) # Print the error message